@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+OCPP 충전소 시뮬레이터 - 아두이노 에뮬레이터 (Linux PTY)
+
+가상 시리얼 포트(PTY)를 열고 아두이노처럼 측정 프레임을 보낸다.
+- 프레임: ASCII '!v1 i1 v2 i2 ...@' (F,1 명령을 받으면 바이너리 프레임)
+- 명령: 'P,포트번호,상태' (1=전력 공급, 0=차단), 'F,1' / 'F,0' (바이너리 / ASCII 프레임)
+        'S,순번,포트,상태[,포트,상태...]' (여러 포트 전력 제어, 처리 후 릴레이 상태를 담은 응답 전송)
+전압은 케이블이 연결된 EVSE에만, 전류는 케이블이 연결되고 전력 공급 중인 EVSE에만 나온다.
+
+사용법: python arduino_emulator.py [--evse N] [--rate Hz] [--noise 비율] [--plugged 1,2] [--binary]
+출력된 가상 포트 경로를 GUI의 시리얼 포트에 입력하면 된다.
+"""
+
+import argparse
+import os
+import random
+import select
+import threading
+import time
+import tty
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from serial_link import MAX_BINARY_VALUES, encode_binary_frame, encode_power_ack
+
+COMMAND_HISTORY = 100  # 보관할 최근 명령 수 (부하 시험에서도 메모리가 늘지 않도록)
+
+class ArduinoEmulator:
+    """PTY 기반 아두이노 에뮬레이터 (별도 스레드에서 동작)"""
+
+    def __init__(self, num_evse: int = 3, rate: float = 1.0, noise: float = 0.01,
+                 plugged: Optional[List[int]] = None, voltage: float = 220.0,
+                 load_current: float = 13.6, binary: bool = False, acks: bool = True, ack_delay: float = 0.0):
+        if not 0 < num_evse * 2 <= MAX_BINARY_VALUES:
+            raise ValueError(f"EVSE 수는 1~{MAX_BINARY_VALUES // 2}개: {num_evse}")
+        self.num_evse = num_evse
+        self.rate = rate  # 초당 프레임 수
+        self.noise = noise  # 측정값 잡음 (표준편차, 값 대비 비율)
+        self.voltage = voltage
+        self.load_current = load_current  # 전력 공급 중인 EVSE의 전류(A)
+        self.binary = binary
+        plugged = range(1, num_evse + 1) if plugged is None else plugged
+        self.plugged = [i + 1 in plugged for i in range(num_evse)]  # 케이블 연결 여부
+        self.relay = [False] * num_evse  # 전력 공급 여부 (P 명령으로 변경)
+
+        # 에뮬레이터는 master 쪽을, 클라이언트는 port(slave) 경로를 사용
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+
+        self.seq = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0  # 클라이언트가 읽지 않아 PTY 버퍼가 가득 차서 버린 프레임 수
+        self.acks = acks  # False면 S 명령에 응답하지 않음 (응답을 지원하지 않는 펌웨어 흉내)
+        self.ack_delay = ack_delay  # S 명령 처리 후 응답까지 지연(초, 릴레이 동작 시간)
+        self.pending_acks: Deque[Tuple[float, bytes]] = deque()  # (보낼 시각, 응답) - 지연 중에도 프레임은 계속 전송
+        self.acks_sent = 0
+        self.commands: Deque[str] = deque(maxlen=COMMAND_HISTORY)  # 최근에 받은 명령 (순서대로)
+        self.commands_received = 0
+        self.running = False
+        self.thread = None
+
+    def measure(self) -> List[float]:
+        """현재 상태의 측정값 (EVSE 순서대로 전압, 전류)"""
+        values = []
+        for i in range(self.num_evse):
+            voltage = self.voltage * (1 + random.gauss(0, self.noise)) if self.plugged[i] else 0.0
+            current = self.load_current * (1 + random.gauss(0, self.noise)) if self.plugged[i] and self.relay[i] else 0.0
+            values += [voltage, max(0.0, current)]
+        return values
+
+    def encode(self, values: List[float]) -> bytes:
+        """현재 형식으로 프레임 인코딩"""
+        if self.binary:
+            frame = encode_binary_frame(self.seq, values)
+            self.seq = (self.seq + 1) & 0xFF
+            return frame
+        return ("!" + " ".join(f"{v:.2f}" for v in values) + "@").encode("ascii")
+
+    def relay_mask(self) -> int:
+        """릴레이 상태 비트 (포트 n은 n-1번 비트)"""
+        return sum(1 << i for i, on in enumerate(self.relay) if on)
+
+    def handle_command(self, line: str) -> bytes:
+        """명령 한 줄 처리 (보낼 응답 반환)"""
+        self.commands.append(line)
+        self.commands_received += 1
+        parts = line.split(",")
+        try:
+            if parts[0] == "P" and len(parts) == 3:
+                port = int(parts[1])
+                if 1 <= port <= self.num_evse:
+                    self.relay[port - 1] = parts[2] == "1"
+            elif parts[0] == "F" and len(parts) == 2:
+                self.binary = parts[1] == "1"
+            elif parts[0] == "S" and len(parts) >= 2 and len(parts) % 2 == 0:
+                seq = int(parts[1])
+                for port, state in zip(parts[2::2], parts[3::2]):
+                    port = int(port)
+                    if 1 <= port <= self.num_evse:
+                        self.relay[port - 1] = state == "1"
+                if self.acks:
+                    ack = encode_power_ack(seq, self.relay_mask())
+                    if self.ack_delay:
+                        # 프레임 전송을 멈추지 않도록 잠들지 않고 보낼 시각만 기록 (_run에서 전송)
+                        self.pending_acks.append((time.monotonic() + self.ack_delay, ack))
+                        return b""
+                    self.acks_sent += 1
+                    return ack
+        except ValueError:
+            pass
+        return b""
+
+    def start(self):
+        """에뮬레이터 스레드 시작"""
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="arduino-emulator", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """프레임 전송 및 명령 수신 루프"""
+        pending = b""
+        next_frame = time.monotonic()
+        while self.running:
+            deadline = min(next_frame, self.pending_acks[0][0]) if self.pending_acks else next_frame
+            timeout = max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            if readable:
+                try:
+                    pending += os.read(self.master, 4096)
+                except (BlockingIOError, OSError):
+                    pass
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    reply = self.handle_command(line.decode("ascii", errors="ignore").strip())
+                    if reply:
+                        self._write(reply)
+
+            now = time.monotonic()
+            # 지연 시간이 지난 응답 전송 (지연이 모두 같으므로 들어온 순서대로)
+            while self.pending_acks and self.pending_acks[0][0] <= now:
+                _, ack = self.pending_acks.popleft()
+                if self._write(ack):
+                    self.acks_sent += 1
+            if now < next_frame:
+                continue
+            # 늦어진 만큼 몰아서 보내지 않고 다음 주기부터 다시 맞춤
+            next_frame = max(next_frame + 1 / self.rate, now)
+            if self._write(self.encode(self.measure())):
+                self.frames_sent += 1
+            else:
+                self.frames_dropped += 1
+
+    def _write(self, data: bytes) -> bool:
+        """PTY에 쓰기 (버퍼가 가득 차면 버리고 False)"""
+        try:
+            os.write(self.master, data)
+            return True
+        except BlockingIOError:
+            return False
+
+    def stop(self):
+        """에뮬레이터 중지 및 PTY 닫기"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(2.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+def main():
+    parser = argparse.ArgumentParser(description="아두이노 에뮬레이터 (Linux PTY)")
+    parser.add_argument("--evse", type=int, default=3, help="EVSE 수")
+    parser.add_argument("--rate", type=float, default=1.0, help="초당 프레임 수")
+    parser.add_argument("--noise", type=float, default=0.01, help="측정값 잡음 (값 대비 표준편차)")
+    parser.add_argument("--plugged", default=None, help="케이블이 연결된 EVSE 번호 (예: 1,3, 기본값: 전체)")
+    parser.add_argument("--binary", action="store_true", help="처음부터 바이너리 프레임 전송")
+    parser.add_argument("--no-ack", action="store_true", help="S 명령에 응답하지 않음 (기존 펌웨어 흉내)")
+    parser.add_argument("--ack-delay", type=float, default=0.0, help="S 명령 응답 지연(초)")
+    args = parser.parse_args()
+
+    plugged = [int(n) for n in args.plugged.split(",") if n] if args.plugged is not None else None
+    emulator = ArduinoEmulator(args.evse, args.rate, args.noise, plugged, binary=args.binary,
+                               acks=not args.no_ack, ack_delay=args.ack_delay)
+    emulator.start()
+    print(f"가상 시리얼 포트: {emulator.port} (EVSE {args.evse}개, {args.rate}Hz)")
+
+    try:
+        while True:
+            time.sleep(5)
+            relay = "".join("1" if on else "0" for on in emulator.relay)
+            print(f"전송 {emulator.frames_sent}개, 버림 {emulator.frames_dropped}개, "
+                  f"형식 {'바이너리' if emulator.binary else 'ASCII'}, 전력 공급 {relay}, 명령 {emulator.commands_received}개, 응답 {emulator.acks_sent}개")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+
+if __name__ == "__main__":
+    main()
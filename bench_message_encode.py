@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+OCPP 충전소 시뮬레이터 - 메시지 인코딩 마이크로벤치마크
+
+TransactionEvent(Updated) 한 건을 만드는 비용을 비교한다.
+- 기존 방식: 매번 중첩 dict 전체를 만들고 json.dumps(ensure_ascii=False)로 프레임 인코딩
+- 템플릿 방식: CallTemplate.build()로 가변 필드만 인코딩하고 encode_call()로 프레임 구성
+
+사용법: python bench_message_encode.py [반복 횟수]
+"""
+
+import json
+import sys
+import timeit
+
+import ocpp_message
+from ocpp_message import generate_message_id, generate_transaction_id, CallTemplate, encode_call
+
+TIMESTAMP = "2025-05-10T11:48:57.000"
+METER_VALUES = [
+    {
+        "timestamp": TIMESTAMP,
+        "sampledValue": [
+            {"value": 3000, "measurand": "Power.Active.Import", "unitOfMeasure": {"unit": "W"}},
+            {"value": 220.0, "measurand": "Voltage", "unitOfMeasure": {"unit": "V"}},
+            {"value": 13.636, "measurand": "Current.Import", "unitOfMeasure": {"unit": "A"}}
+        ]
+    }
+]
+
+def encode_legacy(seq_no: int) -> str:
+    """기존 방식 - dict 전체 생성 후 json.dumps"""
+    message = {
+        "messageTypeId": 2,
+        "messageId": generate_message_id(),
+        "action": "TransactionEvent",
+        "payload": {
+            "eventType": "Updated",
+            "timestamp": TIMESTAMP,
+            "triggerReason": "MeterValuePeriodic",
+            "seqNo": seq_no,
+            "transactionInfo": {
+                "transactionId": generate_transaction_id(1)
+            },
+            "evse": {
+                "id": 1
+            },
+            "idToken": {
+                "idToken": "token001",
+                "type": "Central"
+            },
+            "meterValue": METER_VALUES
+        }
+    }
+    return json.dumps([
+        message["messageTypeId"],
+        message["messageId"],
+        message["action"],
+        message["payload"]
+    ], ensure_ascii=False)
+
+TEMPLATE = CallTemplate("TransactionEvent", {
+    "eventType": "Updated",
+    "triggerReason": "MeterValuePeriodic",
+    "transactionInfo": {"transactionId": generate_transaction_id(1)},
+    "evse": {"id": 1},
+    "idToken": {"idToken": "token001", "type": "Central"}
+})
+
+def encode_template(seq_no: int) -> str:
+    """템플릿 방식 - 가변 필드만 인코딩"""
+    message = TEMPLATE.build(timestamp=TIMESTAMP, seqNo=seq_no, meterValue=METER_VALUES)
+    return encode_call(message)
+
+def measure(func, number: int) -> float:
+    """메시지 1건당 평균 시간(µs)"""
+    best = min(timeit.repeat(lambda: func(1), number=number, repeat=5))
+    return best / number * 1e6
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    # 두 방식이 같은 메시지를 만드는지 확인
+    assert json.loads(encode_legacy(7))[3] == json.loads(encode_template(7))[3]
+
+    backend = "orjson" if ocpp_message.orjson is not None else "json"
+    legacy = measure(encode_legacy, number)
+    template = measure(encode_template, number)
+
+    print(f"반복 횟수: {number}, JSON 백엔드: {backend}")
+    print(f"기존 방식 (dict + json.dumps): {legacy:7.2f} µs/건")
+    print(f"템플릿 방식 (CallTemplate)   : {template:7.2f} µs/건  ({legacy / template:.1f}배)")
+
+if __name__ == "__main__":
+    main()
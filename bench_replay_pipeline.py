@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+OCPP 충전소 시뮬레이터 - 캡처 재생 파이프라인 벤치마크
+
+시리얼 캡처 파일을 최대 속도로 재생하여 파싱 → 측정 반영 → 보고 구간 처리를
+WebSocket 없이 실행하고, 실제 시간 대비 몇 배로 처리되는지 측정한다.
+캡처 파일을 지정하지 않으면 합성 캡처(ASCII 프레임)를 만들어 사용한다.
+
+사용법: python bench_replay_pipeline.py [캡처 파일 또는 ""] [합성 시간(초)] [합성 프레임 간격(초)] [EVSE 수]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from gui_client import GuiOcppClient, METER_SAMPLE_INTERVAL
+from station_state import DEFAULT_NUM_EVSE
+from serial_capture import CaptureWriter, ReplaySerial
+from serial_link import FrameParser
+
+class HeadlessApp:
+    """GUI 없이 실행하기 위한 앱 (로그와 화면 갱신은 무시)"""
+
+    def log(self, message):
+        pass
+
+    def update_charger_status(self, evse_id, status):
+        pass
+
+    def update_power_display(self, evse_id, power):
+        pass
+
+def make_synthetic_capture(path: str, seconds: float, period: float, num_evse: int):
+    """충전 중인 EVSE의 ASCII 프레임으로 합성 캡처 생성"""
+    clock = [0.0]
+    writer = CaptureWriter(path, clock=lambda: clock[0])
+    while clock[0] < seconds:
+        values = []
+        for i in range(num_evse):
+            current = 13.6 + random.uniform(-0.5, 0.5) if i % 2 == 0 else 0.0
+            values += [220.0 + random.uniform(-1, 1), current]
+        writer.write(("!" + " ".join(f"{v:.2f}" for v in values) + "@").encode("ascii"))
+        clock[0] += period
+    writer.close()
+
+def run_pipeline(path: str, num_evse: int) -> dict:
+    """캡처를 최대 속도로 재생하며 파이프라인 실행"""
+    client = GuiOcppClient(HeadlessApp(), "", num_evse=num_evse)
+    for i in range(0, num_evse, 2):
+        client.station.charging_active[i] = True
+
+    conn = ReplaySerial(path, speed=0)
+    parser = FrameParser()
+    frames = 0
+    reports = 0
+    next_report = None
+    started = time.perf_counter()
+    while True:
+        try:
+            data = conn.read(4096)
+        except EOFError:
+            break
+        for frame in parser.feed(data, conn.now()):
+            client.apply_serial_frame(frame)
+            load_w = client.measure_load_sensor(num_evse)
+            for i in range(num_evse):
+                client.station.power_data[i] = load_w[i]
+            frames += 1
+
+            # 보고 구간 처리 (재생 시계 기준)
+            if next_report is None:
+                next_report = frame.received_at + METER_SAMPLE_INTERVAL
+            if frame.received_at >= next_report:
+                next_report += METER_SAMPLE_INTERVAL
+                for i in range(num_evse):
+                    client.collect_interval(i + 1, frame.received_at)
+                    reports += len(client.meter_batcher.flush(i + 1))
+    elapsed = time.perf_counter() - started
+    conn.close()
+
+    return {
+        "frames": frames,
+        "reports": reports,
+        "captured": conn.offset,
+        "elapsed": elapsed,
+        "energy": [client.energy.register(i + 1) for i in range(num_evse)],
+    }
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] else None
+    num_evse = int(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_NUM_EVSE
+    temp_path = None
+    if path is None:
+        seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3600.0
+        period = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+        fd, temp_path = tempfile.mkstemp(suffix=".cap")
+        os.close(fd)
+        make_synthetic_capture(temp_path, seconds, period, num_evse)
+        path = temp_path
+        print(f"합성 캡처: {seconds:.0f}초, 프레임 간격 {period}초, EVSE {num_evse}개")
+
+    try:
+        result = run_pipeline(path, num_evse)
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+    print(f"처리 프레임: {result['frames']}개, 보고 샘플: {result['reports']}개")
+    print(f"캡처 시간 {result['captured']:.0f}초를 {result['elapsed']:.2f}초에 처리 "
+          f"({result['captured'] / result['elapsed']:.0f}배속, {result['frames'] / result['elapsed']:.0f} 프레임/초)")
+    print("누적 에너지(Wh): " + ", ".join(f"{wh:.1f}" for wh in result["energy"]))
+
+if __name__ == "__main__":
+    main()
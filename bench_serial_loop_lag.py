@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+OCPP 충전소 시뮬레이터 - 시리얼 수신 방식별 이벤트 루프 지연 측정
+
+아두이노 대신 파이프에 일정 주기로 프레임을 쓰고, 0.5초 주기 메인 루프에서
+- 기존 방식: 이벤트 루프에서 reset_input_buffer() 후 read(1) 바쁜 대기로 프레임 1개 읽기
+- 수신 스레드 방식: SerialReader가 받아 둔 프레임을 drain()으로 꺼내기
+를 실행하는 동안 이벤트 루프 지연(monitor_loop_lag)을 비교한다.
+
+사용법: python bench_serial_loop_lag.py [측정 시간(초)] [프레임 간격(초)]
+"""
+
+import asyncio
+import fcntl
+import os
+import select
+import sys
+import termios
+import threading
+import time
+
+from ocpp_metrics import LatencyHistogram, monitor_loop_lag
+from serial_link import SerialReader
+
+FRAME = b"!220.0 13.6 0 0 219.5 4.5@"
+
+class PipeSerial:
+    """파이프 위에서 동작하는 pyserial 대용 (벤치마크에 쓰는 메서드만 구현)"""
+
+    def __init__(self, fd: int, timeout: float = 1.0):
+        self.fd = fd
+        self.timeout = timeout
+
+    @property
+    def in_waiting(self) -> int:
+        buf = bytearray(4)
+        fcntl.ioctl(self.fd, termios.FIONREAD, buf)
+        return int.from_bytes(buf, sys.byteorder)
+
+    def read(self, size: int = 1) -> bytes:
+        ready, _, _ = select.select([self.fd], [], [], self.timeout)
+        return os.read(self.fd, size) if ready else b""
+
+    def reset_input_buffer(self):
+        while self.in_waiting:
+            os.read(self.fd, self.in_waiting)
+
+def legacy_read_frame(conn, timeout: float = 1.0) -> str:
+    """기존 get_load3_data의 수신 부분 (이벤트 루프에서 바쁜 대기)"""
+    conn.reset_input_buffer()
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        if conn.in_waiting > 0 and conn.read(1) == b"!":
+            break
+    data = ""
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        if conn.in_waiting > 0:
+            char = conn.read(1).decode("ascii", errors="ignore")
+            if char == "@":
+                break
+            data += char
+    return data
+
+def start_writer(fd: int, period: float, stop: threading.Event) -> threading.Thread:
+    """period초마다 프레임을 쓰는 아두이노 대용 스레드"""
+    def run():
+        while not stop.is_set():
+            os.write(fd, FRAME)
+            time.sleep(period)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+async def measure(mode: str, duration: float, period: float) -> dict:
+    """mode("legacy" 또는 "reader")로 duration초 동안 메인 루프를 돌리며 지연 측정"""
+    read_fd, write_fd = os.pipe()
+    conn = PipeSerial(read_fd)
+    stop = threading.Event()
+    start_writer(write_fd, period, stop)
+
+    reader = None
+    if mode == "reader":
+        reader = SerialReader(conn, asyncio.get_running_loop())
+        reader.start()
+
+    lag = LatencyHistogram()
+    lag_task = asyncio.create_task(monitor_loop_lag(lag, interval=0.01))
+    frames = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        if reader is None:
+            frames += 1 if legacy_read_frame(conn) else 0
+        else:
+            frames += len(reader.drain())
+        await asyncio.sleep(0.5)
+
+    lag_task.cancel()
+    stop.set()
+    if reader is not None:
+        reader.stop()
+    os.close(write_fd)
+    os.close(read_fd)
+    return {"frames": frames, **lag.snapshot()}
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    period = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+
+    print(f"측정 시간: {duration:.0f}초, 프레임 간격: {period}초 (보낸 프레임 약 {duration / period:.0f}개)")
+    for mode, label in (("legacy", "기존 방식"), ("reader", "수신 스레드")):
+        result = asyncio.run(measure(mode, duration, period))
+        print(f"{label:6s}: 받은 프레임 {result['frames']:3d}개, 루프 지연 "
+              f"평균 {result['avg'] * 1000:6.1f}ms, p99 ≤ {result['p99'] * 1000:6.0f}ms, "
+              f"최대 {result['max'] * 1000:6.1f}ms")
+
+if __name__ == "__main__":
+    main()
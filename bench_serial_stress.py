@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+OCPP 충전소 시뮬레이터 - 시리얼 수신 부하 시험 (아두이노 에뮬레이터 사용)
+
+ArduinoEmulator가 연 PTY에 OcppComm.connect_serial()로 연결하고, SerialReader로
+높은 프레임 속도의 데이터를 받으면서 수신/누락 프레임 수와 이벤트 루프 지연, 그리고
+전력 제어 명령(PowerCommandChannel)의 응답 지연을 측정한다.
+PTY는 보드레이트 제한이 없으므로 2400 baud보다 훨씬 빠른 속도로 시험할 수 있다.
+
+사용법: python bench_serial_stress.py [측정 시간(초)] [초당 프레임 수] [EVSE 수] [ascii|binary]
+"""
+
+import asyncio
+import sys
+import time
+
+from arduino_emulator import ArduinoEmulator
+from ocpp_comm import OcppComm
+from ocpp_metrics import LatencyHistogram, monitor_loop_lag
+from power_control import PowerCommandChannel
+from serial_link import BINARY_MODE_COMMAND, SerialReader
+
+async def run(duration: float, rate: float, num_evse: int, binary: bool) -> dict:
+    """duration초 동안 에뮬레이터 프레임을 수신하며 통계 수집"""
+    emulator = ArduinoEmulator(num_evse, rate)
+    emulator.start()
+    comm = OcppComm("", serial_port=emulator.port)
+    if not comm.connect_serial():
+        emulator.stop()
+        raise SystemExit(1)
+
+    power = PowerCommandChannel(comm.serial_conn.write)
+    reader = SerialReader(comm.serial_conn, asyncio.get_running_loop(), max_frames=int(rate) + 1000,
+                          on_ack=power.handle_ack)
+    reader.start()
+    if binary:
+        comm.serial_conn.write(BINARY_MODE_COMMAND)
+
+    lag = LatencyHistogram()
+    lag_task = asyncio.create_task(monitor_loop_lag(lag, interval=0.01))
+    frames = 0
+    started = time.monotonic()
+    confirmed = 0
+    enable = True
+    while time.monotonic() - started < duration:
+        # 프레임을 받는 중에 모든 포트의 전력을 번갈아 켜고 끄며 응답 확인
+        results = await asyncio.gather(*(power.set(port, enable) for port in range(1, num_evse + 1)))
+        confirmed += sum(results)
+        enable = not enable
+        await asyncio.sleep(0.5)
+        frames += len(reader.drain())
+    elapsed = time.monotonic() - started
+
+    lag_task.cancel()
+    reader.stop()
+    power.close()
+    comm.serial_conn.close()
+    emulator.stop()
+    return {
+        "elapsed": elapsed,
+        "frames": frames,
+        "sent": emulator.frames_sent,
+        "emulator_dropped": emulator.frames_dropped,
+        "reader": reader.stats(),
+        "lag": lag.snapshot(),
+        "confirmed": confirmed,
+        "power": power.stats(),
+    }
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1000.0
+    num_evse = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    binary = len(sys.argv) > 4 and sys.argv[4] == "binary"
+
+    result = asyncio.run(run(duration, rate, num_evse, binary))
+    stats = result["reader"]
+    lag = result["lag"]
+    print(f"EVSE {num_evse}개, 목표 {rate:.0f} 프레임/초, 형식 {stats['format']}")
+    print(f"보낸 프레임 {result['sent']}개 (에뮬레이터에서 버림 {result['emulator_dropped']}개), "
+          f"받은 프레임 {result['frames']}개 ({result['frames'] / result['elapsed']:.0f} 프레임/초)")
+    print(f"CRC 오류 {stats['crc_errors']}개, 누락 {stats['frames_lost']}개, 수신 큐 초과 {stats['frames_dropped']}개, "
+          f"버린 바이트 {stats['bytes_discarded']}")
+    power = result["power"]
+    ack = power["ack_latency"]
+    print(f"전력 제어: 요청 {power.get('requests', 0)}개, 명령 {power.get('frames', 0)}줄, 확인 {result['confirmed']}개, "
+          f"재전송 {power.get('retries', 0)}개, 응답 지연 평균 {(ack['avg'] or 0) * 1000:.2f}ms, 최대 {ack['max'] * 1000:.2f}ms")
+    print(f"루프 지연 평균 {lag['avg'] * 1000:.1f}ms, p99 ≤ {lag['p99'] * 1000:.0f}ms, 최대 {lag['max'] * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+OCPP 충전소 시뮬레이터 - EVSE 전력/상태 변화 계산 벤치마크
+
+StationState의 전력 계산(scan_power)을 EVSE 수별로
+순수 파이썬 구현과 numpy 구현(설치된 경우)으로 나누어 측정한다. EVSE의 절반은
+충전 중, 1/4은 이번 주기에 전력이 생기거나 사라지도록 상태를 만든다.
+1024개는 바이너리 프레임 한계(MAX_EVSE)를 넘지만 계산 비용 비교용 모의 충전소로 사용한다.
+
+사용법: python bench_station_scan.py [EVSE 수,...] [반복 횟수]
+"""
+
+import random
+import sys
+import time
+
+import station_state
+from station_state import StationState, scan_power_python
+
+MIN_POWER = 100
+
+def make_station(num_evse: int) -> StationState:
+    """케이블 연결/충전/전력 변화가 섞인 모의 충전소"""
+    station = StationState(num_evse)
+    for i in range(num_evse):
+        plugged = random.random() < 0.75
+        charging = plugged and random.random() < 0.5
+        station.voltage[i] = 220.0 + random.uniform(-2, 2) if plugged else 0.0
+        station.current[i] = 13.6 + random.uniform(-0.5, 0.5) if charging and random.random() < 0.75 else 0.0
+        station.charging_active[i] = charging
+        if charging and random.random() < 0.5:
+            station.powered[i] = True
+    return station
+
+def measure(func, station: StationState, repeat: int, *args) -> float:
+    """한 번 호출의 평균 시간(마이크로초)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(station, *args)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def main():
+    sizes = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [3, 32, 1024]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    implementations = [("python", scan_power_python)]
+    if station_state.np is not None:
+        implementations.append(("numpy", station_state.scan_power_numpy))
+    else:
+        print("numpy가 설치되어 있지 않아 순수 파이썬 구현만 측정합니다.")
+
+    for num_evse in sizes:
+        station = make_station(num_evse)
+        reference = scan_power_python(station, MIN_POWER)
+        print(f"EVSE {num_evse}개 (충전 중 {sum(station.charging_active)}개, "
+              f"시작 {len(reference.started)}개, 종료 {len(reference.ended)}개)")
+        for name, scan in implementations:
+            # 두 구현의 결과가 같아야 함
+            assert scan(station, MIN_POWER) == reference, name
+            scan_us = measure(scan, station, repeat, MIN_POWER)
+            print(f"  {name:6s}: scan_power {scan_us:8.1f}us")
+
+if __name__ == "__main__":
+    main()
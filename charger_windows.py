@@ -7,7 +7,8 @@ from tkinter import ttk, messagebox
 import asyncio
 import random
 import time
-import json
+
+from enums import ConnectorState
 
 class LoginWindow(tk.Toplevel):
     """로그인 창 (OCPP Authorize 사용)"""
@@ -80,44 +81,30 @@ class LoginWindow(tk.Toplevel):
             }
         }
         
-        # 응답 이벤트 초기화
-        self.ocpp_client.comm.response_event.clear()
-        self.ocpp_client.comm.last_response = None
-        
-        # 메시지 전송
-        success = await self.ocpp_client.comm.send_message(message)
+        # 메시지 전송 및 응답 대기 (최대 5초, messageId로 응답 매칭)
+        success, response = await self.ocpp_client.comm.send_request(message, timeout=5.0)
         if not success:
             return False, "메시지 전송 실패"
+        if response is None:
+            return False, "응답 대기 시간 초과"
             
-        # 응답 대기 (최대 5초)
+        # 응답 확인
         try:
-            await asyncio.wait_for(self.ocpp_client.comm.response_event.wait(), timeout=5.0)
-            
-            # 응답 확인
-            if self.ocpp_client.comm.last_response:
-                try:
-                    response = json.loads(self.ocpp_client.comm.last_response)
-                    if len(response) >= 3 and response[0] == 3 and response[1] == message_id:
-                        # 응답 데이터 확인
-                        response_data = response[2]
-                        if "idTokenInfo" in response_data and "status" in response_data["idTokenInfo"]:
-                            status = response_data["idTokenInfo"]["status"]
-                            if status == "Accepted":
-                                return True, "인증 성공"
-                            else:
-                                return False, f"인증 거부: {status}"
-                        else:
-                            return False, "응답 형식 오류"
+            if len(response) >= 3 and response[0] == 3:
+                # 응답 데이터 확인
+                response_data = response[2]
+                if "idTokenInfo" in response_data and "status" in response_data["idTokenInfo"]:
+                    status = response_data["idTokenInfo"]["status"]
+                    if status == "Accepted":
+                        return True, "인증 성공"
                     else:
-                        return False, "응답 형식 오류"
-                except json.JSONDecodeError:
-                    return False, "응답 파싱 오류"
-                except Exception as e:
-                    return False, f"응답 처리 오류: {e}"
+                        return False, f"인증 거부: {status}"
+                else:
+                    return False, "응답 형식 오류"
             else:
-                return False, "응답 없음"
-        except asyncio.TimeoutError:
-            return False, "응답 대기 시간 초과"
+                return False, "응답 형식 오류"
+        except Exception as e:
+            return False, f"응답 처리 오류: {e}"
         
     def login(self):
         """로그인 처리"""
@@ -169,7 +156,6 @@ class ChargingWindow(tk.Toplevel):
         self.event_loop = event_loop
         self.charging = False
         self.transaction_started = False
-        self.power_threshold = 100  # 충전 시작을 위한 전력 임계값 (W)
         self.power_check_timer = None
         self.last_power_value = 0
         self.ctoc_connected = False
@@ -356,7 +342,7 @@ class ChargingWindow(tk.Toplevel):
     def check_power_and_update_status(self):
         """전력 확인 및 상태 업데이트"""
         # 현재 전력값 가져오기
-        power_value = self.ocpp_client.power_data[self.charger_id - 1]
+        power_value = int(self.ocpp_client.station.power_data[self.charger_id - 1])
         
         # 전력 표시 업데이트
         self.update_power_display(power_value)
@@ -364,8 +350,9 @@ class ChargingWindow(tk.Toplevel):
         # 가격 정보 업데이트
         self.update_price_display()
         
-        # CTOC 연결 상태 확인 (전력이 임계값 이상이면 연결된 것으로 간주)
-        connected = power_value >= self.power_threshold
+        # CTOC 연결 상태 확인 (커넥터 상태 머신이 디바운스한 충전/일시 중지 상태면 연결된 것으로 간주)
+        state = self.ocpp_client.connectors[self.charger_id - 1].state
+        connected = state in (ConnectorState.CHARGING, ConnectorState.SUSPENDED_EV)
         
         # 연결 상태가 변경된 경우에만 업데이트
         if connected != self.ctoc_connected:
@@ -397,20 +384,23 @@ class ChargingWindow(tk.Toplevel):
             idx = self.charger_id - 1
             
             # 전력값 설정 (GUI 클라이언트의 여러 배열에 모두 업데이트)
-            self.ocpp_client.manual_power[idx] = power
-            self.ocpp_client.power_data[idx] = power
+            self.ocpp_client.station.manual_power[idx] = power
+            self.ocpp_client.station.power_data[idx] = power
             
             # 전압/전류 값도 업데이트 (로그에 사용되는 값)
             voltage = 220.0
             current = power / voltage
-            self.ocpp_client.load3_mv[idx*2] = voltage
-            self.ocpp_client.load3_mv[idx*2+1] = current
+            self.ocpp_client.station.load3_mv[idx*2] = voltage
+            self.ocpp_client.station.load3_mv[idx*2+1] = current
             
             # 충전 활성화 상태 설정
-            self.ocpp_client.charging_active[idx] = True
+            self.ocpp_client.station.charging_active[idx] = True
             
             # 케이블 연결 상태 설정
-            self.ocpp_client.cable_connected[idx] = True
+            self.ocpp_client.station.cable_connected[idx] = True
+            
+            # 클라이언트 메인 루프가 바뀐 전력값을 바로 반영하도록 깨움
+            self.ocpp_client.request_update()
             
             # 상태 업데이트
             self.update_power_display(power)
@@ -508,20 +498,20 @@ class ChargingWindow(tk.Toplevel):
                 idx = self.charger_id - 1
                 
                 # 전력값 설정 (GUI 클라이언트의 여러 배열에 모두 업데이트)
-                self.ocpp_client.manual_power[idx] = power
-                self.ocpp_client.power_data[idx] = power
+                self.ocpp_client.station.manual_power[idx] = power
+                self.ocpp_client.station.power_data[idx] = power
                 
                 # 전압/전류 값도 업데이트 (로그에 사용되는 값)
                 voltage = 220.0
                 current = power / voltage if power > 0 else 0.0  # 0으로 나누기 방지
-                self.ocpp_client.load3_mv[idx*2] = voltage
-                self.ocpp_client.load3_mv[idx*2+1] = current
+                self.ocpp_client.station.load3_mv[idx*2] = voltage
+                self.ocpp_client.station.load3_mv[idx*2+1] = current
                 
                 # 충전 활성화 상태 설정
-                self.ocpp_client.charging_active[idx] = True
+                self.ocpp_client.station.charging_active[idx] = True
                 
                 # 케이블 연결 상태 설정
-                self.ocpp_client.cable_connected[idx] = True
+                self.ocpp_client.station.cable_connected[idx] = True
             else:
                 # 시리얼 포트 사용 중인 경우 초기 전력값 0으로 시작
                 power = 0  # 기본값을 0W로 변경
@@ -0,0 +1,138 @@
+"""
+OCPP 충전소 시뮬레이터 - 커넥터 상태 머신 (히스테리시스 / 유지 시간 디바운스)
+"""
+
+from typing import List, NamedTuple, Optional
+
+from enums import ConnectorState
+
+class Hysteresis(NamedTuple):
+    """켜짐/꺼짐 기준 (on을 넘은 뒤 off 아래로 돌아가지 않고 on_dwell초가 지나면 켜짐, 꺼짐은 반대)"""
+    on: float
+    off: float
+    on_dwell: float
+    off_dwell: float
+
+class DebouncedSignal:
+    """히스테리시스와 유지 시간을 적용한 켜짐/꺼짐 신호 (잡음 한 샘플로는 바뀌지 않음)"""
+    __slots__ = ("config", "value", "since")
+
+    def __init__(self, config: Hysteresis):
+        self.config = config
+        self.value = False
+        self.since: Optional[float] = None  # 반대쪽 기준을 처음 넘은 샘플 시각 (유지 중이 아니면 None)
+
+    def update(self, sample: float, timestamp: float) -> bool:
+        """샘플 반영 (값이 바뀌면 True)"""
+        config = self.config
+        if self.value:
+            crossing, reverting = sample < config.off, sample > config.on
+        else:
+            crossing, reverting = sample > config.on, sample < config.off
+        if self.since is None:
+            if not crossing:
+                return False
+            self.since = timestamp
+        elif reverting:
+            # 원래 쪽 기준까지 되돌아가면 유지 취소 (두 기준 사이 샘플은 유지를 끊지 않음)
+            self.since = None
+            return False
+        if timestamp - self.since < (config.off_dwell if self.value else config.on_dwell):
+            return False
+        self.value = not self.value
+        self.since = None
+        return True
+
+    def settles_at(self) -> Optional[float]:
+        """유지 중인 변화가 확정될 시각 (유지 중이 아니면 None)"""
+        if self.since is None:
+            return None
+        return self.since + (self.config.off_dwell if self.value else self.config.on_dwell)
+
+class Transition(NamedTuple):
+    """커넥터 상태 전이 이벤트"""
+    evse_id: int
+    old: ConnectorState
+    new: ConnectorState
+    timestamp: float
+
+ACTIVE_STATES = (ConnectorState.AUTHORIZED, ConnectorState.CHARGING, ConnectorState.SUSPENDED_EV)
+
+class ConnectorStateMachine:
+    """커넥터 1개의 상태 머신
+
+    전압으로 케이블 연결(plugged), 전력으로 EV 충전 여부(drawing)를 각각 디바운스하고,
+    충전 허가(authorize/deauthorize)와 함께 상태를 정한다.
+    Available → Plugged → Authorized → Charging ⇄ SuspendedEV → Finishing → Plugged/Available
+    허가된 상태에서 케이블이 빠지거나 허가가 취소되면 Finishing으로 가며, 트랜잭션 종료를
+    처리한 쪽이 finish()를 호출해야 다음 상태로 넘어간다. 모든 메서드는 상태가 바뀌면
+    Transition 목록을 돌려준다 (Finishing 전이 후 바로 finish()하는 경우처럼 여러 개일 수 있음).
+    """
+
+    def __init__(self, evse_id: int, plug: Hysteresis, charge: Hysteresis):
+        self.evse_id = evse_id
+        self.state = ConnectorState.AVAILABLE
+        self.plugged = DebouncedSignal(plug)  # 케이블 연결 (전압 기준)
+        self.drawing = DebouncedSignal(charge)  # EV가 전력을 받는 중 (전력 기준)
+        self.authorized = False  # 충전 허가 (충전 시작 요청을 받음)
+        self.last_power = 0.0  # 충전 중 꺼짐 기준 이상이던 마지막 전력(W) - 종료 이벤트에 사용
+
+    def update(self, timestamp: float, voltage: float, power: float) -> List[Transition]:
+        """측정 샘플 반영 (샘플마다 호출)"""
+        changed = self.plugged.update(voltage, timestamp)
+        changed |= self.drawing.update(power, timestamp)
+        if self.drawing.value and power >= self.drawing.config.off:
+            self.last_power = power
+        if not changed:
+            return []
+        return self._advance(timestamp)
+
+    def authorize(self, timestamp: float) -> List[Transition]:
+        """충전 허가"""
+        self.authorized = True
+        return self._advance(timestamp)
+
+    def deauthorize(self, timestamp: float) -> List[Transition]:
+        """충전 허가 취소 (충전 중이었으면 Finishing)"""
+        self.authorized = False
+        return self._advance(timestamp)
+
+    def finish(self, timestamp: float) -> List[Transition]:
+        """Finishing 처리 완료 (트랜잭션 종료 후 호출, 허가와 마지막 전력도 초기화)"""
+        self.authorized = False
+        self.last_power = 0.0
+        if self.state is not ConnectorState.FINISHING:
+            return []
+        return self._transition(self._resolve(), timestamp)
+
+    def settles_at(self) -> Optional[float]:
+        """유지 중인 신호 변화가 확정될 가장 이른 시각 (없으면 None)"""
+        times = [t for t in (self.plugged.settles_at(), self.drawing.settles_at()) if t is not None]
+        return min(times) if times else None
+
+    def _advance(self, timestamp: float) -> List[Transition]:
+        """현재 신호로 다음 상태 결정"""
+        if self.state is ConnectorState.FINISHING:
+            return []  # finish()를 기다림
+        if self.state in ACTIVE_STATES and (not self.authorized or not self.plugged.value):
+            return self._transition(ConnectorState.FINISHING, timestamp)
+        return self._transition(self._resolve(), timestamp)
+
+    def _resolve(self) -> ConnectorState:
+        """Finishing이 아닐 때의 상태"""
+        if not self.plugged.value:
+            return ConnectorState.AVAILABLE
+        if not self.authorized:
+            return ConnectorState.PLUGGED
+        if self.drawing.value:
+            return ConnectorState.CHARGING
+        if self.state in (ConnectorState.CHARGING, ConnectorState.SUSPENDED_EV):
+            return ConnectorState.SUSPENDED_EV  # 케이블은 연결되어 있고 EV가 전력을 받지 않음
+        return ConnectorState.AUTHORIZED
+
+    def _transition(self, new: ConnectorState, timestamp: float) -> List[Transition]:
+        old = self.state
+        if new is old:
+            return []
+        self.state = new
+        return [Transition(self.evse_id, old, new, timestamp)]
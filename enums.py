@@ -18,3 +18,12 @@ class ConnectorStatus(Enum):
     AVAILABLE = "Available"
     OCCUPIED = "Occupied"
     UNAVAILABLE = "Unavailable"
+
+class ConnectorState(Enum):
+    """커넥터 상태 머신의 상태 (connector_fsm.ConnectorStateMachine)"""
+    AVAILABLE = "Available"
+    PLUGGED = "Plugged"
+    AUTHORIZED = "Authorized"
+    CHARGING = "Charging"
+    SUSPENDED_EV = "SuspendedEV"
+    FINISHING = "Finishing"
@@ -5,6 +5,7 @@ OCPP 충전소 시뮬레이터 GUI - 메인 애플리케이션 클래스
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import asyncio
+import re
 import threading
 import time
 from typing import Dict, List, Optional
@@ -13,9 +14,11 @@ from enums import ConnectorStatus
 from gui_client import GuiOcppClient
 from charger_windows import LoginWindow, ChargingWindow
 from visual_dashboard import ChargerVisualFrame
+from station_state import configured_num_evse
 
 # 상수 정의
-NUM_EVSE = 3
+WIDE_LAYOUT_COLUMNS = 4  # EVSE가 3개보다 많으면 충전기 버튼/시각화 대시보드를 이 열 수의 격자로 배치
+CHARGER_ID_PATTERN = re.compile(r"(?:EVSE|충전기) (\d+)")  # 로그 메시지에서 충전기 번호 찾기
 
 class OcppGuiApp(tk.Tk):
     """OCPP GUI 애플리케이션 메인 클래스"""
@@ -37,8 +40,11 @@ class OcppGuiApp(tk.Tk):
         # Charger windows
         self.charger_windows = {}
         
+        # EVSE 수 (설정 파일의 num_evse)
+        self.num_evse = configured_num_evse()
+        
         # Charger in use status
-        self.charger_in_use = [False] * NUM_EVSE
+        self.charger_in_use = [False] * self.num_evse
         
         # Create widgets
         self.create_widgets()
@@ -132,13 +138,16 @@ class OcppGuiApp(tk.Tk):
         charger_frame = ttk.LabelFrame(left_frame, text="충전기", padding="10")
         charger_frame.pack(fill=tk.X, pady=10)
         
-        for i in range(1, NUM_EVSE + 1):
+        columns = 1 if self.num_evse <= 3 else WIDE_LAYOUT_COLUMNS
+        for i in range(1, self.num_evse + 1):
             charger_button = ttk.Button(
                 charger_frame,
                 text=f"충전기 {i}",
                 command=lambda idx=i: self.open_charger(idx)
             )
-            charger_button.pack(fill=tk.X, pady=5)
+            charger_button.grid(row=(i - 1) // columns, column=(i - 1) % columns, sticky="ew", padx=2, pady=5)
+        for column in range(columns):
+            charger_frame.columnconfigure(column, weight=1)
             
         # Right column (content)
         right_frame = ttk.Frame(main_frame)
@@ -158,10 +167,15 @@ class OcppGuiApp(tk.Tk):
         
         # Create visual frames for each charger
         self.charger_visuals = []
-        for i in range(1, NUM_EVSE + 1):
+        for i in range(1, self.num_evse + 1):
             visual_frame = ChargerVisualFrame(self.visual_dashboard, i)
-            visual_frame.pack(fill=tk.BOTH, expand=True, pady=10)  # 원래의 세로 배치로 되돌림
+            # EVSE가 3개 이하면 원래의 세로 배치, 많으면 격자 배치
+            visual_frame.grid(row=(i - 1) // columns, column=(i - 1) % columns, sticky="nsew", padx=5, pady=10)
             self.charger_visuals.append(visual_frame)
+        for column in range(columns):
+            self.visual_dashboard.columnconfigure(column, weight=1)
+        for row in range((self.num_evse + columns - 1) // columns):
+            self.visual_dashboard.rowconfigure(row, weight=1)
         
         # Create log tab
         log_tab = ttk.Frame(self.content_notebook)
@@ -181,7 +195,7 @@ class OcppGuiApp(tk.Tk):
         
         # Create individual log tabs for each charger
         self.charger_logs = []
-        for i in range(1, NUM_EVSE + 1):
+        for i in range(1, self.num_evse + 1):
             charger_frame = ttk.Frame(self.log_notebook)
             self.log_notebook.add(charger_frame, text=f"충전기 {i} 로그")
             
@@ -197,7 +211,7 @@ class OcppGuiApp(tk.Tk):
         self.charger_status_vars = []
         self.charger_power_vars = []
         
-        for i in range(1, NUM_EVSE + 1):
+        for i in range(1, self.num_evse + 1):
             status_row = ttk.Frame(charger_status_frame)
             status_row.pack(fill=tk.X, pady=2)
             
@@ -224,17 +238,17 @@ class OcppGuiApp(tk.Tk):
         self.log_text.see(tk.END)
         
         # Check if message is related to a specific charger
-        for i in range(1, NUM_EVSE + 1):
-            if f"EVSE {i}:" in message or f"충전기 {i}" in message:
-                self.charger_logs[i-1].insert(tk.END, log_entry)
-                self.charger_logs[i-1].see(tk.END)
-                break
+        match = CHARGER_ID_PATTERN.search(message)
+        if match and 1 <= int(match.group(1)) <= self.num_evse:
+            charger_log = self.charger_logs[int(match.group(1)) - 1]
+            charger_log.insert(tk.END, log_entry)
+            charger_log.see(tk.END)
         
         # Add power data logs to all charger logs
         if message.startswith("W:"):
             values = message.split()
-            if len(values) >= NUM_EVSE + 1:  # "W:" + at least NUM_EVSE values
-                for i in range(NUM_EVSE):
+            if len(values) >= self.num_evse + 1:  # "W:" + at least self.num_evse values
+                for i in range(self.num_evse):
                     if i + 1 < len(values):
                         power_log = f"{timestamp} - 전력: {values[i+1]}W\n"
                         self.charger_logs[i].insert(tk.END, power_log)
@@ -242,7 +256,7 @@ class OcppGuiApp(tk.Tk):
             
     def update_charger_status(self, charger_id, status):
         """충전기 상태 업데이트"""
-        if 1 <= charger_id <= NUM_EVSE:
+        if 1 <= charger_id <= self.num_evse:
             self.charger_status_vars[charger_id - 1].set(status)
             # Update visual dashboard
             self.charger_visuals[charger_id - 1].update_status(status)
@@ -252,7 +266,7 @@ class OcppGuiApp(tk.Tk):
             
     def update_power_display(self, charger_id, power_value):
         """충전기 전력 표시 업데이트"""
-        if 1 <= charger_id <= NUM_EVSE:
+        if 1 <= charger_id <= self.num_evse:
             self.charger_power_vars[charger_id - 1].set(f"{power_value} W")
             # Update visual dashboard
             self.charger_visuals[charger_id - 1].update_power(power_value)
@@ -273,7 +287,7 @@ class OcppGuiApp(tk.Tk):
                 
     def update_total_price(self, charger_id, total_price):
         """충전 완료 후 총 금액 정보 업데이트"""
-        if 1 <= charger_id <= NUM_EVSE:
+        if 1 <= charger_id <= self.num_evse:
             # 로그에 기록
             self.log(f"충전기 {charger_id}: 총 금액 {total_price}원")
             
@@ -304,7 +318,7 @@ class OcppGuiApp(tk.Tk):
             self.connect_button.config(text="연결 중...", state=tk.DISABLED)
             
             # Create OCPP client
-            self.ocpp_client = GuiOcppClient(self, websocket_url, serial_port, baud_rate)
+            self.ocpp_client = GuiOcppClient(self, websocket_url, serial_port, baud_rate, self.num_evse)
             
             # Start client in event loop
             asyncio.run_coroutine_threadsafe(self.ocpp_client.run_loop(), self.event_loop)
@@ -336,7 +350,7 @@ class OcppGuiApp(tk.Tk):
                 visual.update_power(0)
                 
             # Reset charger in use status
-            self.charger_in_use = [False] * NUM_EVSE
+            self.charger_in_use = [False] * self.num_evse
             
     def open_charger(self, charger_id):
         """충전기 창 열기"""
@@ -4,55 +4,126 @@ OCPP 충전소 시뮬레이터 GUI - GUI용 OCPP 클라이언트
 
 import asyncio
 import time
+import math
 import random
+from array import array
 from typing import Dict, List, Optional
 
-from enums import EventType, TriggerReason, ConnectorStatus
+from enums import EventType, TriggerReason, ConnectorStatus, ConnectorState
+from connector_fsm import ConnectorStateMachine, Hysteresis, Transition
 from ocpp_comm import OcppComm
-from ocpp_message import generate_message_id, generate_timestamp, generate_transaction_id
+from ocpp_message import generate_message_id, generate_timestamp, generate_transaction_id, CallTemplate
+from metering import (MeterBatcher, EnergyAccumulator, IntervalAggregator, DeadbandFilter,
+                      build_interval_sampled_values, build_energy_sample)
+from ocpp_metrics import monitor_loop_lag
+from serial_link import SerialReader, SerialFrame, BINARY_MODE_COMMAND
+from sample_buffer import StationHistory
+from station_state import PowerScan, StationState, configured_num_evse, scan_power
+from scheduler import TimerScheduler
+from serial_capture import CaptureWriter, ReplaySerial
+from power_control import PowerCommandChannel
 
 # 상수 정의
-NUM_EVSE = 3
+JOURNAL_FILE = "ocpp_outbox.db"  # 오프라인 중 전송하지 못한 메시지를 보관하는 저널 파일
+SERIAL_BINARY_FRAMES = True  # 아두이노에 바이너리(CRC) 프레임을 요청 (지원하지 않는 펌웨어는 ASCII 유지)
+SERIAL_CAPTURE = False  # True면 수신한 시리얼 원본 바이트를 파일로 기록 (현장 문제 재현용)
+SERIAL_CAPTURE_FILE = "logs/serial_%Y%m%d_%H%M%S.cap"  # 캡처 파일 이름 (time.strftime 형식)
+SERIAL_FRAME_TIMEOUT = 2.0  # 이 시간 동안 새 프레임이 없으면 시리얼 데이터 읽기 실패로 처리(초)
+TEMP_DATA_INTERVAL = 0.5  # 시리얼 데이터를 읽지 못해 임시 데이터를 쓰는 동안의 갱신 간격(초)
+TIMER_RETRY_INTERVAL = 0.5  # 하트비트 전송이 실패했을 때 다시 시도하는 간격(초)
+HEARTBEAT_INTERVAL = 60  # 하트비트 전송 간격(초)
+POWER_COMMAND_ACK = True  # 전력 제어 명령을 순번/응답 확인 방식으로 전송 (응답이 없는 펌웨어는 기존 명령으로 자동 전환)
+POWER_ACK_TIMEOUT = 0.5  # 전력 제어 응답 대기 시간(초)
+POWER_COMMAND_ATTEMPTS = 3  # 전력 제어 명령 최대 전송 횟수
+MIN_CHARGING_POWER = 100  # 이 값 미만의 전력(W)은 잡음으로 보고 0으로 처리
+# 커넥터 상태 머신 기준 (켜짐 기준, 꺼짐 기준, 켜짐 유지 시간(초), 꺼짐 유지 시간(초)) - 잡음 한 샘플로는 상태가 바뀌지 않음
+CABLE_HYSTERESIS = Hysteresis(50.0, 30.0, 0.2, 0.5)  # 케이블 연결 전압(V)
+CHARGING_HYSTERESIS = Hysteresis(100.0, 50.0, 1.0, 3.0)  # EV 충전 전력(W) - 허가 후 이 기준을 넘으면 트랜잭션 시작
+HISTORY_CAPACITY = 4 * 3600  # EVSE별 보관할 측정 샘플 수 (1Hz 기준 4시간)
+ENERGY_SAMPLE_INTERVAL = 1.0  # 전력이 있는 EVSE를 샘플링하는 최대 간격(초) - 프레임이 오지 않는 수동/오프라인 모드에서도 에너지 적산 (EnergyAccumulator max_gap보다 짧게)
+METER_SAMPLE_INTERVAL = 1.0  # 미터 샘플 간격(초) - 구간마다 평균/최소/최대/마지막 값 1개를 보고 (15~60초로 늘려도 전력 변화는 유지됨)
+METER_REPORT_ON_CHANGE = True  # True면 값이 불감대를 벗어나거나 최대 무보고 시간이 지났을 때만 보고
+METER_DEADBAND = (50.0, 2.0, 0.25)  # 절대 불감대 (전력 W, 전압 V, 전류 A)
+METER_DEADBAND_RELATIVE = 0.02  # 비율 불감대 (마지막으로 보낸 값 대비)
+METER_MAX_SILENCE = 60.0  # 변화가 없어도 보고하는 최대 간격(초)
+METER_FLUSH_INTERVAL = 10.0  # 모은 샘플 전송 간격(초)
+METER_BATCH_SIZE = 10  # 한 메시지에 담을 최대 샘플 수
+METRICS_FILE = "ocpp_metrics.json"  # 통신 계측 값을 저장하는 파일
+METRICS_DUMP_INTERVAL = 60.0  # 계측 값 저장 간격(초)
+LOOP_LAG_INTERVAL = 1.0  # 이벤트 루프 지연 측정 간격(초) - 쉬는 동안 깨어나는 횟수를 줄이기 위해 1초
+BACKPRESSURE_SLOWDOWN = 6  # 송신 큐 혼잡 시 미터 전송 간격/묶음 크기 배수
+
+# 메시지 고정 필드
+ID_TOKEN = {"idToken": "token001", "type": "Central"}
+VEHICLE_CUSTOM_DATA = {
+    "vendorId": "Quarterback",
+    "vehicleInfo": {
+        "vehicleNo": "38-473",
+        "model": "GV-60",
+        "batteryCapacityKWh": 72000,
+        "requestedEnergyKWh": 30000
+    }
+}
+HEARTBEAT_TEMPLATE = CallTemplate("Heartbeat", {})
 
 class GuiOcppClient:
     """GUI용 OCPP 클라이언트 클래스"""
     
-    def __init__(self, app, websocket_url: str, serial_port: str = None, baud_rate: int = 2400):
+    def __init__(self, app, websocket_url: str, serial_port: str = None, baud_rate: int = 2400,
+                 num_evse: Optional[int] = None):
         self.app = app
+        # EVSE 수 (지정하지 않으면 설정 파일의 num_evse)
+        self.num_evse = num_evse if num_evse is not None else configured_num_evse()
+        self.station = StationState(self.num_evse)  # EVSE별 상태 (측정값, 전력, 플래그, 트랜잭션)
+        # EVSE별 커넥터 상태 머신 (케이블 연결/충전 시작/일시 중지/종료 판단)
+        self.connectors = [ConnectorStateMachine(i + 1, CABLE_HYSTERESIS, CHARGING_HYSTERESIS) for i in range(self.num_evse)]
+        self.transitions: List[Transition] = []  # 샘플 반영 중 생긴 커넥터 상태 전이 (메인 루프에서 처리)
         # 라즈베리파이에서는 기본 시리얼 포트를 "/dev/ttyUSB0"로 설정
         if serial_port is None and self.is_raspberry_pi():
             serial_port = "/dev/ttyUSB0"
             
-        self.comm = OcppComm(websocket_url, serial_port, baud_rate)
-        self.power_data = [0] * NUM_EVSE
-        self.prev_power_data = [0] * NUM_EVSE
-        self.last_report_time = [0] * NUM_EVSE
-        self.last_heartbeat_time = 0
+        self.comm = OcppComm(websocket_url, serial_port, baud_rate, journal_path=JOURNAL_FILE)
+        self.meter_batcher = MeterBatcher(self.num_evse, METER_FLUSH_INTERVAL, METER_BATCH_SIZE)
         
         # 트랜잭션 관련 변수
         self.transaction_id_counter = 1  # 전체 시스템에서 사용하는 트랜잭션 ID 카운터
-        self.transaction_ids = [None] * NUM_EVSE  # 각 충전기의 현재 트랜잭션 ID
-        self.seq_num_counter = [1] * NUM_EVSE  # 시퀀스 넘버 카운터
         self.boot_notification_sent = False
         self.server_tx_id_received = False  # 서버에서 트랜잭션 ID를 받았는지 여부
         self.tx_id_lock = asyncio.Lock()  # 트랜잭션 ID 생성을 위한 락 추가
         
-        self.load3_mv = [0.0] * 10
+        self.history = StationHistory(self.num_evse, HISTORY_CAPACITY)  # EVSE별 측정값 시계열 (시각, 전압, 전류, 전력)
+        self.energy = EnergyAccumulator(self.num_evse)  # EVSE별 누적 에너지 (모든 샘플 적분)
+        self.aggregator = IntervalAggregator(self.num_evse, 3)  # EVSE별 보고 구간 통계 (전력, 전압, 전류)
+        self.deadband = DeadbandFilter(self.num_evse, METER_DEADBAND, METER_DEADBAND_RELATIVE, METER_MAX_SILENCE)
         self.running = False
-        self.charging_active = [False] * NUM_EVSE
-        self.manual_power = [0] * NUM_EVSE  # For manual power input
         self.use_serial = serial_port is not None
         self.serial_data_valid = False
-        self.cable_connected = [False] * NUM_EVSE  # 케이블 연결 상태 추적
+        self.serial_reader: Optional[SerialReader] = None  # 시리얼 수신 스레드 (run_loop에서 시작)
+        self.power = PowerCommandChannel(self.write_serial, POWER_ACK_TIMEOUT, POWER_COMMAND_ATTEMPTS,
+                                         require_ack=POWER_COMMAND_ACK, log=self.app.log)  # 전력 제어 명령 채널
+        self.loop_lag_task = None  # 이벤트 루프 지연 측정 태스크
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # run_loop를 실행 중인 이벤트 루프
+        self.wakeup = asyncio.Event()  # 메인 루프를 깨우는 이벤트 (프레임 도착, 충전 시작/중지, 수동 전력 변경, 예정 작업)
+        self.processing = False  # 메인 루프가 깨어나 처리 중 (끝나면 예정 작업 대기 시간을 다시 계산하므로 깨울 필요 없음)
+        # 예정 작업 (미터 샘플 구간, 하트비트, 계측 저장, 시리얼 수신 기한) - 단조 시계 기준
+        self.timers = TimerScheduler(notify=self.handle_timer_rescheduled)
+        self.last_frame_time = None  # 마지막 프레임 수신 시각 (sample_clock 기준)
+        # 측정 샘플 시각 기준 (캡처 재생 중에는 재생 시계) - 샘플 기록, 에너지 적산, 커넥터 상태 머신, 수신 끊김 판단에 공통
+        self.sample_clock = time.monotonic
+        self.sample_speed = 1.0  # 실제 시간 1초 동안 흐르는 sample_clock 시간 (배속 재생 시 배속, 타이머 지연 변환용)
         
-        # 트랜잭션 시작 상태 추적을 위한 변수 추가
-        self.transaction_started = [False] * NUM_EVSE
-
-        # 충전 대기 상태 플래그 추가
-        self.charging_pending = [False] * NUM_EVSE  # 충전 대기 상태 플래그
+        self.boot_accepted = False  # BootNotification 응답 수신 여부
+        
+        # 메시지 템플릿 (고정 필드는 미리 인코딩)
+        self.status_templates = [CallTemplate("StatusNotification", {"evseId": i + 1, "connectorId": 1}) for i in range(self.num_evse)]
+        self.meter_templates = [CallTemplate("MeterValues", {"evseId": i + 1}) for i in range(self.num_evse)]
+        self.tx_templates: List[Optional[Dict[str, CallTemplate]]] = [None] * self.num_evse  # 진행 중인 트랜잭션의 템플릿
         
-        # 충전기 가용성 상태 추적 변수 추가
-        self.charger_available = [True] * NUM_EVSE  # 초기값은, 모든 충전기가 사용 가능
+        # 메시지 응답 콜백 등록
+        self.comm.set_message_acked_callback(self.handle_message_acked)
+        
+        # 송신 큐 혼잡 콜백 등록
+        self.comm.set_backpressure_callback(self.handle_backpressure)
 
         # ChangeAvailability 콜백 등록
         self.comm.set_change_availability_callback(self.handle_change_availability)
@@ -97,34 +168,26 @@ class GuiOcppClient:
 
     async def send_heartbeat(self) -> bool:
         """하트비트 전송"""
-        current_time = time.time()
-        if current_time - self.last_heartbeat_time >= 60:
-            message = {
-                "messageTypeId": 2,
-                "messageId": generate_message_id(),
-                "action": "Heartbeat",
-                "payload": {}
-            }
-            success = await self.comm.send_message(message)
-            if success:
-                self.app.log("하트비트 전송됨")
-                self.last_heartbeat_time = current_time
-            return success
-        return True
+        message = HEARTBEAT_TEMPLATE.build()
+        success = await self.comm.send_message(message)
+        if success:
+            self.app.log("하트비트 전송됨")
+        return success
+
+    async def on_heartbeat_timer(self):
+        """하트비트 예정 시각 (연결되어 있으면 전송하고 다음 하트비트 예약, 전송 실패 시 잠시 뒤 재시도)"""
+        if self.comm.websocket and not await self.send_heartbeat():
+            self.timers.schedule("heartbeat", TIMER_RETRY_INTERVAL, self.on_heartbeat_timer)
+            return
+        self.timers.schedule("heartbeat", HEARTBEAT_INTERVAL, self.on_heartbeat_timer)
 
     async def send_status_notification(self, evse_id: int, status: ConnectorStatus) -> bool:
         """상태 알림 전송"""
-        message = {
-            "messageTypeId": 2,
-            "messageId": generate_message_id(),
-            "action": "StatusNotification",
-            "payload": {
-                "timestamp": generate_timestamp(),
-                "connectorStatus": status.value,
-                "evseId": evse_id,
-                "connectorId": 1
-            }
-        }
+        self.station.connector_status[evse_id - 1] = status
+        message = self.status_templates[evse_id - 1].build(
+            timestamp=generate_timestamp(),
+            connectorStatus=status.value
+        )
         success = await self.comm.send_message(message)
         if success:
             self.app.log(f"EVSE {evse_id}: 상태 알림 전송됨 [{status.value}]")
@@ -132,10 +195,90 @@ class GuiOcppClient:
             self.app.update_charger_status(evse_id, status.value)
         return success
 
+    def handle_message_acked(self, message: dict, response: list):
+        """서버가 응답한 메시지 기록 (재연결 시 재전송 대상 판단용)"""
+        action = message.get("action")
+        if action == "StatusNotification":
+            payload = message["payload"]
+            self.station.reported_status[payload["evseId"] - 1] = ConnectorStatus(payload["connectorStatus"])
+        elif action == "BootNotification":
+            self.boot_accepted = True
+
+    def handle_backpressure(self, active: bool):
+        """송신 큐가 혼잡하면 미터 값을 더 길게 모아서 보내고, 해소되면 원래 주기로 복귀"""
+        factor = BACKPRESSURE_SLOWDOWN if active else 1
+        self.meter_batcher.flush_interval = METER_FLUSH_INTERVAL * factor
+        self.meter_batcher.max_samples = METER_BATCH_SIZE * factor
+        if active:
+            self.app.log(f"송신 큐 혼잡 - 미터 값 전송 간격을 {self.meter_batcher.flush_interval:.0f}초로 늘립니다")
+        else:
+            self.app.log("송신 큐 혼잡 해소 - 미터 값 전송 간격을 원래대로 되돌립니다")
+
+    def get_metrics(self) -> Dict:
+        """통신 계측 값 (액션별 지연 히스토그램, 큐 깊이, 재시도/타임아웃/재연결 횟수 등)"""
+        return self.comm.get_metrics(serial=self.serial_stats(), power=self.power.stats())
+
+    def serial_stats(self) -> Optional[Dict]:
+        """시리얼 수신 통계 (시리얼을 사용하지 않으면 None)"""
+        return self.serial_reader.stats() if self.serial_reader is not None else None
+
+    def dump_metrics(self):
+        """통신 계측 값을 파일로 저장"""
+        try:
+            self.comm.dump_metrics(METRICS_FILE, serial=self.serial_stats(), power=self.power.stats())
+        except OSError as e:
+            self.app.log(f"계측 값 저장 실패: {e}")
+
+    def on_metrics_timer(self):
+        """계측 값 저장 예정 시각 (저장 후 다음 저장 예약)"""
+        self.dump_metrics()
+        self.timers.schedule("metrics", METRICS_DUMP_INTERVAL, self.on_metrics_timer)
+
+    async def resume_session(self):
+        """(재)연결 직후 처리 - 부팅 알림은 응답받을 때까지만, 상태 알림은 바뀐 EVSE만 전송"""
+        self.app.log("서버 연결됨")
+        self.timers.schedule("heartbeat", HEARTBEAT_INTERVAL, self.on_heartbeat_timer)
+        if not self.boot_accepted:
+            self.boot_notification_sent = False
+            await self.send_boot_notification()
+        for i in range(self.num_evse):
+            if self.station.connector_status[i] != self.station.reported_status[i]:
+                await self.send_status_notification(i + 1, self.station.connector_status[i])
+
+    def build_transaction_templates(self, evse_id: int, tx_num: int) -> Dict[str, CallTemplate]:
+        """트랜잭션의 TransactionEvent 템플릿 생성 (이벤트 종류별)"""
+        common = {
+            "transactionInfo": {
+                "transactionId": generate_transaction_id(tx_num)
+            },
+            "evse": {
+                "id": evse_id
+            },
+            "idToken": ID_TOKEN
+        }
+        return {
+            EventType.STARTED.value: CallTemplate("TransactionEvent", {
+                "eventType": EventType.STARTED.value,
+                "triggerReason": TriggerReason.CABLE_PLUGGED_IN.value,
+                **common,
+                "customData": VEHICLE_CUSTOM_DATA
+            }),
+            EventType.UPDATED.value: CallTemplate("TransactionEvent", {
+                "eventType": EventType.UPDATED.value,
+                "triggerReason": TriggerReason.METER_VALUE_PERIODIC.value,
+                **common
+            }),
+            EventType.ENDED.value: CallTemplate("TransactionEvent", {
+                "eventType": EventType.ENDED.value,
+                "triggerReason": TriggerReason.EV_DISCONNECTED.value,
+                **common
+            })
+        }
+
     async def send_transaction_event_started(self, evse_id: int) -> bool:
         """트랜잭션 시작 이벤트 전송"""
         # 이미 트랜잭션이 시작된 경우 중복 전송 방지
-        if self.transaction_started[evse_id - 1]:
+        if self.station.transaction_started[evse_id - 1]:
             self.app.log(f"EVSE {evse_id}: 이미 트랜잭션이 시작되었습니다. 중복 이벤트 무시.")
             return True
         
@@ -158,296 +301,306 @@ class GuiOcppClient:
             
             # 현재 충전기에 트랜잭션 ID 할당
             current_tx_id = self.transaction_id_counter
-            self.transaction_ids[evse_id - 1] = current_tx_id
+            self.station.transaction_ids[evse_id - 1] = current_tx_id
             self.app.log(f"충전기 {evse_id}에 트랜잭션 ID tx-{current_tx_id:03d} 할당")
             
             # 다음 트랜잭션을 위해 카운터 증가 (다음 충전기가 사용할 ID 준비)
             self.transaction_id_counter += 1
         
-        # TransactionEvent 메시지 생성
-        message = {
-            "messageTypeId": 2,
-            "messageId": generate_message_id(),
-            "action": "TransactionEvent",
-            "payload": {
-                "eventType": EventType.STARTED.value,
-                "timestamp": generate_timestamp(),
-                "triggerReason": TriggerReason.CABLE_PLUGGED_IN.value,
-                "seqNo": self.seq_num_counter[evse_id - 1],
-                "transactionInfo": {
-                    "transactionId": generate_transaction_id(current_tx_id)
-                },
-                "evse": {
-                    "id": evse_id
-                },
-                "idToken": {
-                    "idToken": "token001",
-                    "type": "Central"
-                },
-                "customData": {
-                    "vendorId": "Quarterback",
-                    "vehicleInfo": {
-                        "vehicleNo": "38-473",
-                        "model": "GV-60",
-                        "batteryCapacityKWh": 72000,
-                        "requestedEnergyKWh": 30000
-                    }
+        # TransactionEvent 메시지 생성 (이 트랜잭션의 템플릿도 함께 준비)
+        templates = self.build_transaction_templates(evse_id, current_tx_id)
+        self.tx_templates[evse_id - 1] = templates
+        timestamp = generate_timestamp()
+        # 마지막 샘플 이후 구간을 먼저 적산 (쉬는 동안의 오래된 샘플과 첫 충전 샘플 사이를 트랜잭션에 넣지 않도록)
+        started_at = self.sample_clock()
+        self.sample_energy(evse_id, started_at)
+        self.station.transaction_started_at[evse_id - 1] = started_at
+        start_wh = self.energy.start_transaction(evse_id)
+        message = templates[EventType.STARTED.value].build(
+            timestamp=timestamp,
+            seqNo=self.station.seq_num_counter[evse_id - 1],
+            meterValue=[
+                {
+                    "timestamp": timestamp,
+                    "sampledValue": [build_energy_sample(start_wh, "Transaction.Begin")]
                 }
-            }
-        }
+            ]
+        )
         
-        self.seq_num_counter[evse_id - 1] += 1
+        self.station.seq_num_counter[evse_id - 1] += 1
         success = await self.comm.send_message(message)
         if success:
             self.app.log(f"EVSE {evse_id}: 충전 시작 이벤트 전송됨 (트랜잭션 ID: tx-{current_tx_id:03d})")
-            self.transaction_started[evse_id - 1] = True
+            self.station.transaction_started[evse_id - 1] = True
         return success
 
-    async def send_transaction_event_updated(self, evse_id: int, power_value: int) -> bool:
-        """트랜잭션 업데이트 이벤트 전송"""
+    async def send_transaction_event_updated(self, evse_id: int, meter_values: List[Dict]) -> bool:
+        """트랜잭션 업데이트 이벤트 전송 (모은 미터 샘플을 한 번에 전송)"""
         # 트랜잭션이 시작되지 않은 경우 업데이트 이벤트 무시
-        if not self.transaction_started[evse_id - 1] or self.transaction_ids[evse_id - 1] is None:
+        if not self.station.transaction_started[evse_id - 1] or self.station.transaction_ids[evse_id - 1] is None:
             return False
             
-        message = {
-            "messageTypeId": 2,
-            "messageId": generate_message_id(),
-            "action": "TransactionEvent",
-            "payload": {
-                "eventType": EventType.UPDATED.value,
-                "timestamp": generate_timestamp(),
-                "triggerReason": TriggerReason.METER_VALUE_PERIODIC.value,
-                "seqNo": self.seq_num_counter[evse_id - 1],
-                "transactionInfo": {
-                    "transactionId": generate_transaction_id(self.transaction_ids[evse_id - 1])
-                },
-                "evse": {
-                    "id": evse_id
-                },
-                "idToken": {
-                    "idToken": "token001",
-                    "type": "Central"
-                },
-                "meterValue": [
-                    {
-                        "timestamp": generate_timestamp(),
-                        "sampledValue": [
-                            {
-                                "value": power_value
-                            }
-                        ]
-                    }
-                ]
-            }
-        }
-        self.seq_num_counter[evse_id - 1] += 1
+        message = self.tx_templates[evse_id - 1][EventType.UPDATED.value].build(
+            timestamp=generate_timestamp(),
+            seqNo=self.station.seq_num_counter[evse_id - 1],
+            meterValue=meter_values
+        )
+        self.station.seq_num_counter[evse_id - 1] += 1
         success = await self.comm.send_message(message)
         if success:
-            self.app.log(f"EVSE {evse_id}: 전력 사용량 전송됨 [{power_value}W] (트랜잭션 ID: tx-{self.transaction_ids[evse_id - 1]:03d})")
+            last_power = meter_values[-1]["sampledValue"][0]["value"]
+            self.app.log(f"EVSE {evse_id}: 전력 사용량 전송됨 [{last_power}W, 샘플 {len(meter_values)}개] (트랜잭션 ID: tx-{self.station.transaction_ids[evse_id - 1]:03d})")
         return success
 
     async def send_transaction_event_ended(self, evse_id: int, power_value: int) -> bool:
         """트랜잭션 종료 이벤트 전송"""
         # 트랜잭션이 시작되지 않은 경우 종료 이벤트 무시
-        if not self.transaction_started[evse_id - 1] or self.transaction_ids[evse_id - 1] is None:
+        tx_id = self.station.transaction_ids[evse_id - 1]
+        if not self.station.transaction_started[evse_id - 1] or tx_id is None:
             return False
             
-        message = {
-            "messageTypeId": 2,
-            "messageId": generate_message_id(),
-            "action": "TransactionEvent",
-            "payload": {
-                "eventType": EventType.ENDED.value,
-                "timestamp": generate_timestamp(),
-                "triggerReason": TriggerReason.EV_DISCONNECTED.value,
-                "seqNo": self.seq_num_counter[evse_id - 1],
-                "transactionInfo": {
-                    "transactionId": generate_transaction_id(self.transaction_ids[evse_id - 1])
-                },
-                "evse": {
-                    "id": evse_id
-                },
-                "idToken": {
-                    "idToken": "token001",
-                    "type": "Central"
-                },
-                "meterValue": [
-                    {
-                        "timestamp": generate_timestamp(),
-                        "sampledValue": [
-                            {
-                                "value": power_value
-                            }
-                        ]
-                    }
-                ]
-            }
-        }
-        self.seq_num_counter[evse_id - 1] += 1
+        # 아직 보내지 않은 미터 샘플을 종료 이벤트보다 먼저 전송
+        await self.flush_meter_values(evse_id)
         
-        # 응답 수신을 위해 미리 total_price를 초기화
-        self.comm.total_price = None
+        # 메인 루프(전력 0 감지)와 충전 중지가 종료 이벤트를 겹쳐 보내지 않도록 응답을 기다리기 전에 표시
+        if not self.station.transaction_started[evse_id - 1]:
+            return False
+        self.station.transaction_started[evse_id - 1] = False
+            
+        timestamp = generate_timestamp()
+        # 마지막 샘플 이후 지금까지 적산한 뒤 종료 레지스터를 읽음
+        self.sample_energy(evse_id, self.sample_clock())
+        energy_wh = self.energy.transaction_energy(evse_id)
+        message = self.tx_templates[evse_id - 1][EventType.ENDED.value].build(
+            timestamp=timestamp,
+            seqNo=self.station.seq_num_counter[evse_id - 1],
+            meterValue=[
+                {
+                    "timestamp": timestamp,
+                    "sampledValue": [
+                        {
+                            "value": power_value
+                        },
+                        build_energy_sample(self.energy.register(evse_id), "Transaction.End")
+                    ]
+                }
+            ]
+        )
+        self.station.seq_num_counter[evse_id - 1] += 1
         
-        # 메시지 전송
-        success = await self.comm.send_message(message)
+        # 메시지 전송 후 해당 메시지의 응답을 기다림 (최대 3초)
+        success, response = await self.comm.send_request(message, timeout=3.0)
         if success:
-            self.app.log(f"EVSE {evse_id}: 충전 종료 이벤트 전송됨, 마지막 보고된 전력 [{power_value}W] (트랜잭션 ID: tx-{self.transaction_ids[evse_id - 1]:03d})")
+            self.app.log(f"EVSE {evse_id}: 충전 종료 이벤트 전송됨, 마지막 보고된 전력 [{power_value}W], 충전량 [{energy_wh:.1f}Wh] (트랜잭션 ID: tx-{tx_id:03d})")
+            self.log_session_summary(evse_id)
             
-            # 서버 응답을 기다림 (최대 3초)
-            wait_time = 0
-            max_wait = 30  # 100ms * 30 = 3초
-            while wait_time < max_wait and self.comm.total_price is None:
-                await asyncio.sleep(0.1)
-                wait_time += 1
+            # 응답 페이로드에서 총 금액 확인
+            total_price = None
+            if response and response[0] == 3:
+                total_price = response[2].get("totalPrice")
+                if not isinstance(total_price, (int, float)) or total_price < 0:
+                    total_price = None
             
             # total_price가 설정된 경우에만 UI 업데이트
-            if self.comm.total_price is not None:
-                total_price = self.comm.total_price
+            if total_price is not None:
                 self.app.log(f"EVSE {evse_id}: 총 충전 금액: {total_price}원")
                 
                 # GUI에 총 금액 표시 업데이트
                 if hasattr(self.app, 'update_total_price'):
                     self.app.update_total_price(evse_id, total_price)
-                
-                # 사용 후 초기화
-                self.comm.total_price = None
             else:
                 self.app.log(f"EVSE {evse_id}: 서버에서 총 금액 정보를 받지 못했습니다.")
             
             # 트랜잭션 상태 초기화
-            self.transaction_started[evse_id - 1] = False
-            self.transaction_ids[evse_id - 1] = None
+            self.station.transaction_ids[evse_id - 1] = None
+            self.tx_templates[evse_id - 1] = None
+            self.energy.end_transaction(evse_id)
+        else:
+            # 전송 실패 시 트랜잭션은 진행 중으로 남김 (다음 종료 시도에서 다시 전송)
+            self.station.transaction_started[evse_id - 1] = True
             
         return success
 
-    async def send_meter_values(self, evse_id: int, power_value: int) -> bool:
-        """미터 값 전송"""
-        message = {
-            "messageTypeId": 2,
-            "messageId": generate_message_id(),
-            "action": "MeterValues",
-            "payload": {
-                "meterValue": [
-                    {
-                        "timestamp": generate_timestamp(),
-                        "sampledValue": [
-                            {
-                                "value": power_value,
-                                "measurand": "Power.Active.Import"
-                            }
-                        ]
-                    }
-                ]
-            }
-        }
+    async def send_meter_values(self, evse_id: int, meter_values: List[Dict]) -> bool:
+        """미터 값 전송 (트랜잭션 밖에서 모은 샘플)"""
+        message = self.meter_templates[evse_id - 1].build(meterValue=meter_values)
         success = await self.comm.send_message(message)
         if success:
-            self.app.log(f"EVSE {evse_id}: 미터 값 전송됨 [{power_value}W]")
+            last_power = meter_values[-1]["sampledValue"][0]["value"]
+            self.app.log(f"EVSE {evse_id}: 미터 값 전송됨 [{last_power}W, 샘플 {len(meter_values)}개]")
         return success
 
+    async def flush_meter_values(self, evse_id: int) -> bool:
+        """모은 미터 샘플 전송 (트랜잭션 중이면 TransactionEvent, 아니면 MeterValues)"""
+        meter_values = self.meter_batcher.flush(evse_id)
+        if not meter_values:
+            return True
+        if self.station.transaction_started[evse_id - 1] and self.station.transaction_ids[evse_id - 1] is not None:
+            return await self.send_transaction_event_updated(evse_id, meter_values)
+        return await self.send_meter_values(evse_id, meter_values)
+
     def get_load3_data(self, number_of_load: int) -> bool:
         """로드 데이터 가져오기"""
         if not self.use_serial or not self.comm.serial_conn:
             # If not using serial, use manual power values
-            for i in range(NUM_EVSE):
-                if self.charging_active[i]:
-                    self.load3_mv[i*2] = 220.0  # Voltage
-                    self.load3_mv[i*2+1] = self.manual_power[i] / 220.0  # Current
-                else:
-                    self.load3_mv[i*2] = 0.0
-                    self.load3_mv[i*2+1] = 0.0
+            station = self.station
+            station.load3_mv[:] = array("d", bytes(16 * self.num_evse))
+            for i in station.indices(station.charging_active):
+                station.voltage[i] = 220.0
+                station.current[i] = station.manual_power[i] / 220.0
+            self.record_samples(self.sample_clock())
             return True
             
-        try:
-            self.comm.serial_conn.reset_input_buffer()
-            start_time = time.time()
-            timeout = 1.0
-            while time.time() - start_time < timeout:
-                if self.comm.serial_conn.in_waiting > 0:
-                    char = self.comm.serial_conn.read(1).decode('ascii', errors='ignore')
-                    if char == '!':
-                        break
-            if time.time() - start_time >= timeout:
-                self.app.log("시리얼 데이터 시작 문자를 찾지 못함")
-                self.serial_data_valid = False
+        if self.serial_reader is None or not self.serial_reader.is_alive():
+            error = self.serial_reader.error if self.serial_reader is not None else None
+            if isinstance(error, EOFError):
+                # 캡처 재생이 끝나면 남은 프레임까지 반영하고, 임시 데이터로 넘어가지 않고 클라이언트 종료
+                for frame in self.serial_reader.drain():
+                    self.apply_serial_frame(frame)
+                self.app.log(f"{error} - 클라이언트를 종료합니다.")
+                self.stop()
                 return False
-            data = ""
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                if self.comm.serial_conn.in_waiting > 0:
-                    char = self.comm.serial_conn.read(1).decode('ascii', errors='ignore')
-                    if char == '@':
-                        break
-                    elif char == '!':
-                        data = ""
-                    elif char in "0123456789. ":
-                        data += char
-            if not data:
+            self.app.log(f"시리얼 수신 스레드가 동작하지 않음: {error}")
+            self.serial_data_valid = False
+            return False
+            
+        try:
+            # 수신 스레드가 받아 둔 프레임을 대기 없이 꺼내 모두 순서대로 반영
+            frames = self.serial_reader.drain()
+            for frame in frames:
+                self.apply_serial_frame(frame)
+            if frames:
+                # 다음 프레임이 SERIAL_FRAME_TIMEOUT 안에 오지 않으면 깨어나 읽기 실패 처리
+                self.timers.schedule("serial_timeout", SERIAL_FRAME_TIMEOUT / self.sample_speed)
+                
+            if self.last_frame_time is None or self.sample_clock() - self.last_frame_time > SERIAL_FRAME_TIMEOUT:
                 self.app.log("유효한 시리얼 데이터를 읽지 못함")
                 self.serial_data_valid = False
+                if self.serial_reader.parser.format is not None:
+                    # 판별된 형식의 프레임이 끊기면 (아두이노 재시작 등) 형식을 다시 판별
+                    self.serial_reader.reset_format()
+                    self.request_binary_frames()
                 return False
-            values = data.strip().split()
-            self.app.log(f"수신된 데이터: {values}")
-            for i in range(min(len(values), 10)):
-                try:
-                    self.load3_mv[i] = float(values[i])
-                except ValueError:
-                    self.app.log(f"잘못된 데이터 형식: {values[i]}")
             self.serial_data_valid = True
-            
-            # 케이블 연결 상태 감지 (전압이 있으면 케이블이 연결된 것으로 간주)
-            for i in range(NUM_EVSE):
-                if i*2 < len(self.load3_mv):
-                    voltage = self.load3_mv[i*2]
-                    # 전압이 임계값(예: 50V) 이상이면 케이블이 연결된 것으로 간주
-                    if voltage > 50.0:
-                        if not self.cable_connected[i]:
-                            self.cable_connected[i] = True
-                            self.app.log(f"충전기 {i+1}: 케이블 연결 감지됨")
-                            # 케이블이 연결되었지만 충전이 활성화되지 않은 경우 전력 차단 명령 전송
-                            if not self.charging_active[i]:
-                                self.send_power_control_command(i+1, False)
-                    else:
-                        if self.cable_connected[i]:
-                            self.cable_connected[i] = False
-                            self.app.log(f"충전기 {i+1}: 케이블 연결 해제됨")
-            
             return True
         except Exception as e:
             self.app.log(f"시리얼 데이터 읽기 오류: {e}")
             self.serial_data_valid = False
             return False
 
-    def send_power_control_command(self, port_number: int, enable: bool) -> bool:
-        """특정 포트의 전력 공급을 제어하는 명령 전송"""
-        if not self.use_serial or not self.comm.serial_conn:
-            self.app.log(f"시리얼 연결이 없어 전력 제어 명령을 전송할 수 없습니다.")
-            return False
-            
+    def apply_serial_frame(self, frame: SerialFrame):
+        """수신 프레임 한 개를 측정값과 케이블 연결 상태에 반영"""
+        self.last_frame_time = frame.received_at
+        station = self.station
+        load3_mv = station.load3_mv
+        for i, value in enumerate(frame.values[:len(load3_mv)]):
+            # 바이너리 프레임은 float32를 그대로 풀기 때문에 CRC가 맞아도 NaN/inf일 수 있음 (이전 값 유지)
+            if value is None or not math.isfinite(value):
+                self.app.log(f"잘못된 데이터 형식: 프레임의 {i + 1}번째 값 ({value})")
+                continue
+            load3_mv[i] = value
+        self.record_samples(frame.received_at)
+
+    def record_samples(self, timestamp: float):
+        """현재 전압/전류를 EVSE별 시계열과 커넥터 상태 머신에 반영하고 충전 전력을 에너지로 적산"""
+        charging_active = self.station.charging_active
+        connectors = self.connectors
+        for i, (voltage, current) in enumerate(zip(self.station.voltage, self.station.current)):
+            power = voltage * current
+            self.history.append(i + 1, timestamp, voltage, current, power)
+            transitions = connectors[i].update(timestamp, voltage, power)
+            if transitions:
+                self.transitions.extend(transitions)
+            charging = charging_active[i] and power >= MIN_CHARGING_POWER
+            self.energy.add_sample(i + 1, timestamp, power if charging else 0.0)
+            if charging_active[i]:
+                # 보고 구간 통계는 충전 중인 EVSE만 (쉬는 EVSE는 보고하지 않음)
+                self.aggregator.add(i + 1, (power if charging else 0.0, voltage, current))
+
+    def sample_energy(self, evse_id: int, timestamp: float):
+        """EVSE 하나의 현재 전력을 timestamp까지 적산 (트랜잭션 시작/종료 시점의 레지스터를 샘플 주기와 상관없이 맞춤)"""
+        i = evse_id - 1
+        power = self.station.voltage[i] * self.station.current[i]
+        charging = self.station.charging_active[i] and power >= MIN_CHARGING_POWER
+        self.energy.add_sample(evse_id, timestamp, power if charging else 0.0)
+
+    def log_session_summary(self, evse_id: int):
+        """트랜잭션 동안의 측정값 시계열 요약 기록 (시작 이후 구간을 링 버퍼에서 바로 읽음)"""
+        summary = self.history.summary(evse_id, self.station.transaction_started_at[evse_id - 1])
+        if summary is None:
+            return
+        self.app.log(f"EVSE {evse_id}: 충전 세션 요약 - {summary.duration:.0f}초, 샘플 {summary.count}개, "
+                     f"평균 {summary.avg_power:.0f}W, 최대 {summary.peak_power:.0f}W, 측정 적분 {summary.energy_wh:.1f}Wh")
+
+    def start_serial_reader(self):
+        """시리얼 수신 스레드 시작 (캡처 재생이면 재생 시계 사용, 캡처 모드면 원본 바이트 기록)"""
+        conn = self.comm.serial_conn
+        replay = isinstance(conn, ReplaySerial)
+        capture = None
+        if SERIAL_CAPTURE and not replay:
+            try:
+                capture = CaptureWriter(time.strftime(SERIAL_CAPTURE_FILE))
+                self.app.log(f"시리얼 캡처 시작: {capture.path}")
+            except OSError as e:
+                self.app.log(f"시리얼 캡처 파일 생성 실패: {e}")
+        if replay:
+            self.app.log(f"시리얼 캡처 재생: {conn.path} ({conn.speed or '최대'}배속)")
+            # 프레임 수신 시각과 끊김 판단, 에너지 적산 등이 모두 재생 시계를 따르도록
+            self.sample_clock = conn.now
+            self.sample_speed = conn.speed if conn.speed > 0 else 1.0
+        self.serial_reader = SerialReader(
+            conn, asyncio.get_running_loop(),
+            capture=capture,
+            clock=self.sample_clock,
+            on_ack=self.power.handle_ack,
+            frame_ready=self.wakeup  # 프레임이 도착하면 메인 루프를 바로 깨움
+        )
+        self.serial_reader.start()
+
+    def request_binary_frames(self):
+        """아두이노에 바이너리 프레임 전송 요청 (응답이 바이너리 프레임이면 수신 측이 자동으로 전환)"""
+        if not SERIAL_BINARY_FRAMES:
+            return
         try:
-            # 명령 형식: "P,포트번호,상태\n"
-            # 상태: 1=켜기, 0=끄기
-            command = f"P,{port_number},{1 if enable else 0}\n"
-            self.comm.serial_conn.write(command.encode('ascii'))
-            self.app.log(f"충전기 {port_number}: 전력 {'공급' if enable else '차단'} 명령 전송됨")
-            return True
+            self.comm.serial_conn.write(BINARY_MODE_COMMAND)
+            self.app.log("시리얼 바이너리 프레임 요청 전송됨")
         except Exception as e:
-            self.app.log(f"전력 제어 명령 전송 오류: {e}")
+            self.app.log(f"바이너리 프레임 요청 전송 오류: {e}")
+
+    def write_serial(self, data: bytes):
+        """시리얼 포트에 쓰기 (전력 제어 명령 채널에서 사용)"""
+        self.comm.serial_conn.write(data)
+
+    def send_power_control_command(self, port_number: int, enable: bool) -> Optional[asyncio.Future]:
+        """특정 포트의 전력 공급 제어 요청 (같은 루프 반복의 요청은 명령 한 줄로 묶여 전송됨)
+
+        반환값: 아두이노가 전환을 확인하면 True가 되는 Future (시리얼 연결이 없으면 None)
+        """
+        if not self.use_serial or not self.comm.serial_conn:
+            self.app.log(f"시리얼 연결이 없어 전력 제어 명령을 전송할 수 없습니다.")
+            return None
+        self.app.log(f"충전기 {port_number}: 전력 {'공급' if enable else '차단'} 명령 전송")
+        return self.power.set(port_number, enable)
+
+    async def set_power(self, port_number: int, enable: bool) -> bool:
+        """전력 공급 제어 후 아두이노의 확인까지 대기 (확인되면 True)"""
+        future = self.send_power_control_command(port_number, enable)
+        if future is None:
             return False
+        confirmed = await future
+        if confirmed:
+            self.app.log(f"충전기 {port_number}: 전력 {'공급' if enable else '차단'} 확인됨")
+        else:
+            self.app.log(f"충전기 {port_number}: 전력 {'공급' if enable else '차단'} 확인 실패")
+        return confirmed
+
+    def scan_power(self) -> PowerScan:
+        """EVSE 전체의 전력과 지난 주기 대비 변화를 한 번에 계산 (numpy가 있으면 배열 연산)"""
+        return scan_power(self.station, MIN_CHARGING_POWER)
 
     def measure_load_sensor(self, number_of_load: int) -> List[int]:
-        """로드 센서 측정"""
-        load_w = [0] * number_of_load
-        for i in range(number_of_load):
-            if i*2+1 < len(self.load3_mv):
-                # 충전이 활성화된 경우에만 전력 계산
-                if self.charging_active[i]:
-                    load_w[i] = int(self.load3_mv[i*2] * self.load3_mv[i*2+1])
-                    if load_w[i] < 100:
-                        load_w[i] = 0
-                else:
-                    load_w[i] = 0
-        return load_w
+        """로드 센서 측정 (충전이 활성화된 EVSE만 전력 계산, 나머지는 0)"""
+        return self.scan_power().power[:number_of_load]
 
     def print_load_w(self, number_of_load: int, load_w: List[int]):
         """로드 전력 출력"""
@@ -456,60 +609,118 @@ class GuiOcppClient:
 
     def update_power_data(self, evse_id: int, power_value: int):
         """전력 데이터 업데이트"""
-        if 1 <= evse_id <= NUM_EVSE:
-            self.power_data[evse_id - 1] = power_value
+        if self.station.is_valid(evse_id):
+            self.station.power_data[evse_id - 1] = power_value
             # Update power display in GUI
             self.app.update_power_display(evse_id, power_value)
 
-    async def check_charging_start(self):
-        """충전 시작 확인"""
-        for i in range(NUM_EVSE):
-            evse_id = i + 1
-            
-            # 충전 대기 상태이고 전력값이 일정 이상이면 트랜잭션 시작
-            if self.charging_pending[i] and self.power_data[i] > 100:  # 100W 이상일 때
-                self.charging_pending[i] = False  # 대기 상태 해제
-                
-                # 이제 실제 측정값으로 트랜잭션 시작 이벤트 전송
+    async def process_transitions(self):
+        """쌓인 커넥터 상태 전이를 순서대로 처리하고, 디바운스 중인 변화가 확정될 시각에 깨어나도록 예약"""
+        while self.transitions:
+            transitions, self.transitions = self.transitions, []
+            for transition in transitions:
+                await self.handle_connector_transition(transition)
+
+        # 수동 모드처럼 새 샘플이 저절로 오지 않아도 유지 시간이 지나면 다시 확인
+        now = self.sample_clock()
+        settles = [when for when in (c.settles_at() for c in self.connectors) if when is not None and when > now]
+        if settles:
+            self.timers.schedule("debounce", (min(settles) - now) / self.sample_speed)
+        else:
+            self.timers.cancel("debounce")
+
+    async def handle_connector_transition(self, transition: Transition):
+        """커넥터 상태 전이 처리 (케이블 연결/해제, 트랜잭션 시작, 충전 종료)"""
+        evse_id = transition.evse_id
+        i = evse_id - 1
+        station = self.station
+        connector = self.connectors[i]
+        self.app.log(f"충전기 {evse_id}: 커넥터 상태 {transition.old.value} -> {transition.new.value}")
+
+        # 케이블 연결 상태 (디바운스된 전압 기준)
+        plugged = connector.plugged.value
+        if plugged != bool(station.cable_connected[i]):
+            station.cable_connected[i] = plugged
+            if plugged:
+                self.app.log(f"충전기 {evse_id}: 케이블 연결 감지됨")
+                # 케이블이 연결되었지만 충전이 활성화되지 않은 경우 전력 차단 명령 전송
+                if not station.charging_active[i]:
+                    self.send_power_control_command(evse_id, False)
+            else:
+                self.app.log(f"충전기 {evse_id}: 케이블 연결 해제됨")
+
+        if transition.new is ConnectorState.CHARGING:
+            if not station.transaction_started[i]:
+                # 충전 허가 후 실제 전력이 감지되면 트랜잭션 시작
                 await self.send_transaction_event_started(evse_id)
-                self.app.log(f"충전기 {evse_id}: 실제 전력 감지됨, 트랜잭션 시작 ({self.power_data[i]}W)")
-            
-            # 기존 로직
-            elif self.prev_power_data[i] == 0 and self.power_data[i] > 0:
-                if not self.transaction_started[i]:
-                    await self.send_status_notification(evse_id, ConnectorStatus.OCCUPIED)
-
-    async def report_power_usage(self):
-        """전력 사용량 보고"""
-        current_time = time.time()
-        for i in range(NUM_EVSE):
-            if self.power_data[i] <= 0:
-                continue
-            if current_time - self.last_report_time[i] >= 1:
-                evse_id = i + 1
-                await self.send_transaction_event_updated(evse_id, self.power_data[i])
-                await self.send_meter_values(evse_id, self.power_data[i])
-                self.last_report_time[i] = current_time
-
-    async def check_charging_end(self):
-        """충전 종료 확인"""
-        for i in range(NUM_EVSE):
-            if self.prev_power_data[i] > 0 and self.power_data[i] == 0:
-                evse_id = i + 1
-                await self.send_transaction_event_ended(evse_id, self.prev_power_data[i])
-                await self.send_status_notification(evse_id, ConnectorStatus.AVAILABLE)
-                self.last_report_time[i] = 0
-                self.charging_active[i] = False
-            self.prev_power_data[i] = self.power_data[i]
+                self.app.log(f"충전기 {evse_id}: 실제 전력 감지됨, 트랜잭션 시작 ({connector.last_power:.0f}W)")
+        elif transition.new is ConnectorState.SUSPENDED_EV:
+            self.app.log(f"충전기 {evse_id}: EV가 전력을 받지 않음 (충전 일시 중지, 트랜잭션 유지)")
+        elif transition.new is ConnectorState.FINISHING:
+            await self.finish_charging(evse_id, int(connector.last_power))
+            self.transitions.extend(connector.finish(self.sample_clock()))
+
+    async def finish_charging(self, evse_id: int, last_power: int):
+        """충전 종료 처리 (마지막 구간은 버리고, 모아 둔 샘플은 종료 이벤트보다 먼저 전송)"""
+        self.aggregator.take(evse_id)
+        await self.flush_meter_values(evse_id)
+        await self.send_transaction_event_ended(evse_id, last_power)
+        await self.send_status_notification(evse_id, ConnectorStatus.AVAILABLE)
+        self.deadband.reset(evse_id)
+        self.station.charging_active[evse_id - 1] = False
+
+    def on_sample_timer(self, evse_id: int):
+        """샘플링 주기 (깨어난 메인 루프가 get_load3_data에서 측정값을 기록하고 에너지를 적산)"""
+        self.timers.schedule(("sample", evse_id), ENERGY_SAMPLE_INTERVAL, self.on_sample_timer, evse_id)
+
+    async def on_meter_timer(self, evse_id: int):
+        """미터 샘플 구간 끝 (구간 통계를 모아 두었다가 묶어서 전송, 전력이 있는 동안 METER_SAMPLE_INTERVAL마다)"""
+        self.timers.schedule(("meter", evse_id), METER_SAMPLE_INTERVAL, self.on_meter_timer, evse_id)
+        self.collect_interval(evse_id, self.sample_clock())
+        if self.meter_batcher.is_due(evse_id):
+            await self.flush_meter_values(evse_id)
+
+    def collect_interval(self, evse_id: int, current_time: float):
+        """구간 통계를 미터 샘플로 추가 (변화 기준 보고 시 불감대 안이면 구간을 이어서 모음)"""
+        if self.station.power_data[evse_id - 1] <= 0:
+            # 충전 중이 아니면 구간을 버리고 새로 시작
+            self.aggregator.take(evse_id)
+            return
+        stats = self.aggregator.peek(evse_id)
+        if stats is None:
+            return
+        # 보내지 않은 구간은 이어지므로 다음 보고의 최소/최대에 포함됨
+        if METER_REPORT_ON_CHANGE and not self.deadband.should_report(evse_id, stats, current_time):
+            return
+        self.aggregator.take(evse_id)
+        self.deadband.mark_sent(evse_id, stats.last, current_time)
+        sampled_values = build_interval_sampled_values(stats, self.energy.register(evse_id))
+        self.meter_batcher.add(evse_id, generate_timestamp(), sampled_values)
+
+    def update_power_edges(self, scan: PowerScan):
+        """전력 발생/소멸 반영 (전력이 있는 동안만 샘플링/미터 샘플 구간 예약, 지난 주기 전력 갱신)"""
+        station = self.station
+        for i in scan.ended:
+            station.powered[i] = False
+            self.timers.cancel(("sample", i + 1))
+            self.timers.cancel(("meter", i + 1))
+        for i in scan.started:
+            station.powered[i] = True
+            # 샘플링은 서버 주소와 상관없이 (오프라인 충전도 에너지 레지스터에 적산)
+            self.timers.schedule(("sample", i + 1), ENERGY_SAMPLE_INTERVAL, self.on_sample_timer, i + 1)
+            if self.comm.websocket_url:
+                # 연결이 끊긴 동안의 미터 값은 저널에 기록되어 재연결 후 전송됨
+                self.timers.schedule(("meter", i + 1), METER_SAMPLE_INTERVAL, self.on_meter_timer, i + 1)
+        station.prev_power_data[:] = station.power_data
 
     async def handle_change_availability(self, evse_id: int, is_operative: bool) -> bool:
         """서버로부터 ChangeAvailability 요청 처리"""
         try:
-            if 1 <= evse_id <= NUM_EVSE:
+            if self.station.is_valid(evse_id):
                 port_idx = evse_id - 1
                 
                 # 충전기 가용성 상태 업데이트
-                self.charger_available[port_idx] = is_operative
+                self.station.charger_available[port_idx] = is_operative
                 
                 # UI 업데이트
                 if is_operative:
@@ -522,7 +733,7 @@ class GuiOcppClient:
                     self.app.log(f"충전기 {evse_id}: 서버 요청에 의해 '사용 불가' 상태로 변경되었습니다.")
                     
                     # 충전 중이면 충전 중지
-                    if self.charging_active[port_idx]:
+                    if self.station.charging_active[port_idx]:
                         await self.stop_charging(evse_id)
                 
                 return True
@@ -535,52 +746,62 @@ class GuiOcppClient:
 
     async def start_charging(self, evse_id: int, power_value: int):
         """충전 시작"""
-        if 1 <= evse_id <= NUM_EVSE:
+        if self.station.is_valid(evse_id):
             port_idx = evse_id - 1
             
             # 충전기가 사용 불가 상태인 경우 충전 불가
-            if not self.charger_available[port_idx]:
+            if not self.station.charger_available[port_idx]:
                 self.app.log(f"충전기 {evse_id}는 현재 사용 불가 상태입니다.")
                 return False
                 
-            self.manual_power[port_idx] = power_value
-            self.charging_active[port_idx] = True
+            self.station.manual_power[port_idx] = power_value
+            self.station.charging_active[port_idx] = True
+            self.request_update()
             self.app.log(f"충전기 {evse_id}의 충전을 시작합니다. 전력: {power_value}W")
         
             # 시리얼 연결이 있는 경우 전력 공급 명령 전송
             if self.use_serial:
                 self.send_power_control_command(evse_id, True)
             
-                # 상태만 Occupied로 변경하고, 트랜잭션 이벤트는 아직 보내지 않음
+                # 상태만 Occupied로 변경하고, 트랜잭션 이벤트는 커넥터가 Charging이 되면 전송
                 await self.send_status_notification(evse_id, ConnectorStatus.OCCUPIED)
-            
-                # 트랜잭션 시작 플래그 설정 (아직 이벤트는 보내지 않음)
-                # 수정: 특정 충전기만 대기 상태로 설정
-                self.charging_pending[evse_id - 1] = True  # 해당 충전기만 대기 상태로 설정
-                return True
             else:
                 # 시리얼 연결이 없는 경우 기존처럼 처리
                 await self.send_status_notification(evse_id, ConnectorStatus.OCCUPIED)
                 await self.send_transaction_event_started(evse_id)
-                return True
+            for transition in self.connectors[port_idx].authorize(self.sample_clock()):
+                await self.handle_connector_transition(transition)
+            return True
         return False
 
     async def stop_charging(self, evse_id: int):
         """충전 중지"""
-        if 1 <= evse_id <= NUM_EVSE:
+        if self.station.is_valid(evse_id):
             port_idx = evse_id - 1
-            final_power = self.manual_power[port_idx]
-            self.manual_power[port_idx] = 0
-            self.charging_active[port_idx] = False
-            self.app.log(f"충전기 {evse_id}의 충전을 중지합니다.")
             
-            # 시리얼 연결이 있는 경우 전력 차단 명령 전송
-            if self.use_serial:
-                self.send_power_control_command(evse_id, False)
+            # 시리얼 연결이 있는 경우 전력 차단이 확인된 뒤에 충전 중지
+            if self.use_serial and not await self.set_power(evse_id, False):
+                self.app.log(f"충전기 {evse_id}: 전력 차단이 확인되지 않아 충전을 중지하지 못했습니다.")
+                return False
             
-            # Update status to Available
-            await self.send_transaction_event_ended(evse_id, final_power)
-            await self.send_status_notification(evse_id, ConnectorStatus.AVAILABLE)
+            # 중지 직전까지의 전력을 적산하고, 같은 시각의 0W 샘플로 전력이 끊긴 시점을 기록
+            stopped_at = self.sample_clock()
+            self.sample_energy(evse_id, stopped_at)
+            self.station.manual_power[port_idx] = 0
+            self.station.charging_active[port_idx] = False
+            self.sample_energy(evse_id, stopped_at)
+            self.request_update()
+            self.app.log(f"충전기 {evse_id}의 충전을 중지합니다.")
+            
+            # 충전 허가 취소 - 충전 중이던 커넥터는 Finishing 처리에서 종료 이벤트 전송
+            connector = self.connectors[port_idx]
+            for transition in connector.deauthorize(self.sample_clock()):
+                await self.handle_connector_transition(transition)
+            if self.station.transaction_started[port_idx]:
+                # 커넥터가 아직 허가 상태가 아니었던 경우 (케이블 연결 감지 전 등) 직접 종료
+                await self.finish_charging(evse_id, int(connector.last_power))
+            elif self.station.connector_status[port_idx] is not ConnectorStatus.AVAILABLE:
+                await self.send_status_notification(evse_id, ConnectorStatus.AVAILABLE)
             
             return True
         return False
@@ -588,14 +809,14 @@ class GuiOcppClient:
     async def handle_request_stop_transaction(self, evse_id: int) -> bool:
         """서버로부터 RequestStopTransaction 요청 처리"""
         try:
-            if 1 <= evse_id <= NUM_EVSE:
+            if self.station.is_valid(evse_id):
                 port_idx = evse_id - 1
                 
                 # 충전 중인지 확인
-                if self.charging_active[port_idx]:
+                if self.station.charging_active[port_idx]:
                     self.app.log(f"충전기 {evse_id}: 서버 요청에 의해 충전이 중지됩니다.")
                     
-                    # 충전 중지 호출
+                    # 충전 중지 호출 (아두이노가 전력 차단을 확인해야 Accepted)
                     success = await self.stop_charging(evse_id)
                     return success
                 else:
@@ -608,14 +829,33 @@ class GuiOcppClient:
             self.app.log(f"RequestStopTransaction 처리 중 오류: {e}")
             return False
 
+    def request_update(self):
+        """메인 루프를 깨워 측정값과 충전 상태를 바로 다시 확인 (다른 스레드에서도 호출 가능)"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def handle_timer_rescheduled(self):
+        """가장 가까운 예정 작업이 앞당겨짐 - 처리 중이 아니면 메인 루프를 깨워 대기 시간을 다시 계산"""
+        if not self.processing:
+            self.request_update()
+
+    async def wait_for_wakeup(self, timeout: Optional[float]):
+        """프레임 도착/상태 변경으로 깨워지거나 timeout초가 지날 때까지 대기 (None이면 깨워질 때까지)"""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.wakeup.clear()
+
     async def run_loop(self):
-        """메인 루프 실행"""
+        """메인 루프 실행 (고정 주기 대신 프레임 도착, 상태 변경, 예정 작업 시각에 맞춰 깨어나 처리)"""
         self.running = True
+        self.loop = asyncio.get_running_loop()
         self.app.log("OCPP 클라이언트 시작")
         
-        websocket_connected = False
+        # 연결 감시 시작 (연결/재연결은 백그라운드에서 처리하고, 연결될 때마다 세션 재개)
         if self.comm.websocket_url:
-            websocket_connected = await self.comm.connect_websocket()
+            self.comm.start_supervisor(on_connected=self.resume_session)
             
         serial_connected = True
         if self.use_serial:
@@ -623,22 +863,26 @@ class GuiOcppClient:
             if not serial_connected:
                 self.app.log("시리얼 포트 연결 실패. 수동 모드로 전환합니다.")
                 self.use_serial = False
+            else:
+                # 시리얼 수신은 전용 스레드에서 처리 (이벤트 루프를 막지 않음)
+                self.start_serial_reader()
+                self.request_binary_frames()
+                
+        # 이벤트 루프 지연 측정 (계측 값의 loop_lag)
+        self.loop_lag_task = asyncio.create_task(monitor_loop_lag(self.comm.metrics.loop_lag, LOOP_LAG_INTERVAL))
         
-        current_time = time.time()
-        self.last_heartbeat_time = current_time
-        for i in range(NUM_EVSE):
-            self.last_report_time[i] = current_time
-            self.power_data[i] = 0
-            self.prev_power_data[i] = 0
-            self.transaction_started[i] = False  # 트랜잭션 시작 상태 초기화
-            self.manual_power[i] = 0  # 초기 수동 전력값을 0으로 설정
+        # 주기 작업 예약 (하트비트는 연결되어 있을 때만 전송)
+        if self.comm.websocket_url:
+            self.timers.schedule("heartbeat", HEARTBEAT_INTERVAL, self.on_heartbeat_timer)
+        self.timers.schedule("metrics", METRICS_DUMP_INTERVAL, self.on_metrics_timer)
+        # 전력 / 트랜잭션 시작 상태 / 수동 전력값 초기화
+        station = self.station
+        for column in (station.power_data, station.prev_power_data, station.manual_power):
+            column[:] = array("d", bytes(8 * self.num_evse))
+        station.transaction_started[:] = bytes(self.num_evse)
+        station.powered[:] = bytes(self.num_evse)
             
-        if websocket_connected:
-            await self.send_boot_notification()
-            for i in range(NUM_EVSE):
-                await self.send_status_notification(i + 1, ConnectorStatus.AVAILABLE)
-                
-        number_of_load3 = NUM_EVSE
+        number_of_load3 = self.num_evse
         self.app.log("메인 루프 시작...")
         
         # 시리얼 연결 실패 시 임시 데이터 생성
@@ -648,61 +892,67 @@ class GuiOcppClient:
             
         try:
             while self.running:
-                if self.comm.websocket_url and not self.comm.websocket and websocket_connected:
-                    websocket_connected = await self.comm.connect_websocket()
-                    if websocket_connected:
-                        self.boot_notification_sent = False
-                        await self.send_boot_notification()
-                        for i in range(NUM_EVSE):
-                            await self.send_status_notification(i + 1, ConnectorStatus.AVAILABLE)
-                    else:
-                        await asyncio.sleep(0.1)
-                        continue
-                        
+                self.processing = True
                 read_success = self.get_load3_data(number_of_load3)
+                if not self.running:
+                    break  # 캡처 재생 완료 등
                 
                 # 시리얼 데이터 읽기 실패 시 임시 데이터 생성
                 if not read_success and self.use_serial:
                     self.app.log("시리얼 데이터 읽기 실패. 임시 데이터를 사용합니다.")
+                    self.timers.schedule("temp_data", TEMP_DATA_INTERVAL)  # 프레임이 다시 올 때까지 주기적으로 갱신
                     # Generate temporary data for active chargers
-                    for i in range(NUM_EVSE):
-                        if self.charging_active[i]:
-                            base_power = self.manual_power[i]
-                            # 전력값이 0이면 변동 없이 유지, 0보다 크면 변동 추가
-                            if base_power > 0:
-                                variation = random.uniform(-200, 200)
-                                power_with_variation = max(0, base_power + variation)
-                            else:
-                                power_with_variation = 0
-                            
-                            self.load3_mv[i*2] = 220.0  # Voltage
-                            self.load3_mv[i*2+1] = power_with_variation / 220.0 if power_with_variation > 0 else 0.0  # Current
+                    station.load3_mv[:] = array("d", bytes(16 * self.num_evse))
+                    for i in station.indices(station.charging_active):
+                        base_power = station.manual_power[i]
+                        # 전력값이 0이면 변동 없이 유지, 0보다 크면 변동 추가
+                        if base_power > 0:
+                            variation = random.uniform(-200, 200)
+                            power_with_variation = max(0, base_power + variation)
                         else:
-                            self.load3_mv[i*2] = 0.0
-                            self.load3_mv[i*2+1] = 0.0
+                            power_with_variation = 0
+                        
+                        station.voltage[i] = 220.0  # Voltage
+                        station.current[i] = power_with_variation / 220.0  # Current
+                    self.record_samples(self.sample_clock())
                     read_success = True
                 
                 if read_success:
-                    load3_w = self.measure_load_sensor(number_of_load3)
-                    self.print_load_w(number_of_load3, load3_w)
-                    for i in range(min(number_of_load3, NUM_EVSE)):
-                        self.update_power_data(i + 1, load3_w[i])
-                    await self.check_charging_start()
-                    await self.check_charging_end()
-                    if websocket_connected:
-                        await self.report_power_usage()
-                        await self.send_heartbeat()
+                    # 전력 계산과 시작/종료 판단을 EVSE 전체에 대해 한 번에 (지난 주기 전력 기준)
+                    scan = self.scan_power()
+                    load3_w = scan.power
+                    changed = False
+                    for i, power in enumerate(load3_w):
+                        # 전력이 바뀐 EVSE만 화면 갱신
+                        if power != station.power_data[i]:
+                            self.update_power_data(i + 1, power)
+                            changed = True
+                    if changed:
+                        self.print_load_w(number_of_load3, load3_w)
+                    self.update_power_edges(scan)
+                    await self.process_transitions()
                 else:
                     self.app.log("데이터 읽기 오류")
                     
-                await asyncio.sleep(0.5)  # 0.1초에서 0.5초로 변경
+                # 시각이 된 예정 작업 (미터 샘플, 하트비트, 계측 저장)
+                await self.timers.run_due()
+                self.processing = False
+                    
+                # 다음 프레임/상태 변경 또는 가장 가까운 예정 작업 시각까지 대기 (쉬는 동안 CPU 사용 없음)
+                await self.wait_for_wakeup(self.timers.next_delay())
         except Exception as e:
             self.app.log(f"오류 발생: {e}")
         finally:
+            self.loop_lag_task.cancel()
+            if self.serial_reader is not None:
+                self.serial_reader.stop()
+            self.power.close()
+            self.dump_metrics()
             self.comm.close_connections()
             self.app.log("OCPP 클라이언트 종료")
             self.running = False
 
     def stop(self):
-        """클라이언트 중지"""
+        """클라이언트 중지 (다른 스레드에서도 호출 가능)"""
         self.running = False
+        self.request_update()
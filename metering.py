@@ -0,0 +1,255 @@
+"""
+OCPP 충전소 시뮬레이터 - 미터 값 처리
+"""
+
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+class MeterBatcher:
+    """EVSE별 미터 샘플 묶음
+
+    샘플(여러 measurand의 sampledValue 목록)을 EVSE별로 모아 두었다가
+    flush_interval초가 지나거나 max_samples개가 쌓이면 meterValue 배열로 한 번에 내보낸다.
+    """
+
+    def __init__(self, num_evse: int, flush_interval: float = 10.0, max_samples: int = 10):
+        self.flush_interval = flush_interval  # 묶음 전송 간격(초)
+        self.max_samples = max_samples  # 한 메시지에 담을 최대 샘플 수
+        self.samples: List[List[Dict]] = [[] for _ in range(num_evse)]
+        self.first_sample_time: List[Optional[float]] = [None] * num_evse
+
+    def add(self, evse_id: int, timestamp: str, sampled_values: List[Dict]):
+        """샘플 추가"""
+        idx = evse_id - 1
+        if not self.samples[idx]:
+            self.first_sample_time[idx] = time.monotonic()
+        self.samples[idx].append({"timestamp": timestamp, "sampledValue": sampled_values})
+
+    def pending(self, evse_id: int) -> int:
+        """보내지 않은 샘플 수"""
+        return len(self.samples[evse_id - 1])
+
+    def is_due(self, evse_id: int, now: Optional[float] = None) -> bool:
+        """전송 시점인지 확인"""
+        idx = evse_id - 1
+        if not self.samples[idx]:
+            return False
+        if len(self.samples[idx]) >= self.max_samples:
+            return True
+        if now is None:
+            now = time.monotonic()
+        return now - self.first_sample_time[idx] >= self.flush_interval
+
+    def flush(self, evse_id: int) -> List[Dict]:
+        """모은 샘플을 meterValue 배열로 꺼내고 비움"""
+        idx = evse_id - 1
+        meter_values = self.samples[idx]
+        self.samples[idx] = []
+        self.first_sample_time[idx] = None
+        return meter_values
+
+class IntervalStats(NamedTuple):
+    """한 보고 구간의 필드별 통계 (필드 순서는 add()에 넘긴 순서)"""
+    count: int
+    avg: List[float]
+    min: List[float]
+    max: List[float]
+    last: List[float]
+
+class IntervalAggregator:
+    """EVSE별 보고 구간 통계 (평균/최소/최대/마지막)
+
+    샘플을 보관하지 않고 필드별 합계/최소/최대/마지막 값만 갱신하므로
+    구간 길이나 샘플 속도와 상관없이 메모리 사용량이 일정하다.
+    """
+
+    def __init__(self, num_evse: int, num_fields: int):
+        self.num_fields = num_fields
+        self.count = [0] * num_evse
+        self.sum = [[0.0] * num_fields for _ in range(num_evse)]
+        self.min = [[0.0] * num_fields for _ in range(num_evse)]
+        self.max = [[0.0] * num_fields for _ in range(num_evse)]
+        self.last = [[0.0] * num_fields for _ in range(num_evse)]
+
+    def add(self, evse_id: int, values: Sequence[float]):
+        """샘플 한 개 반영"""
+        idx = evse_id - 1
+        sums, mins, maxs, lasts = self.sum[idx], self.min[idx], self.max[idx], self.last[idx]
+        first = self.count[idx] == 0
+        for f, value in enumerate(values):
+            if first:
+                sums[f] = mins[f] = maxs[f] = value
+            else:
+                sums[f] += value
+                if value < mins[f]:
+                    mins[f] = value
+                elif value > maxs[f]:
+                    maxs[f] = value
+            lasts[f] = value
+        self.count[idx] += 1
+
+    def pending(self, evse_id: int) -> int:
+        """현재 구간의 샘플 수"""
+        return self.count[evse_id - 1]
+
+    def peek(self, evse_id: int) -> Optional[IntervalStats]:
+        """현재 구간 통계 (구간은 계속 이어짐, 샘플이 없으면 None)"""
+        idx = evse_id - 1
+        count = self.count[idx]
+        if count == 0:
+            return None
+        return IntervalStats(
+            count,
+            [total / count for total in self.sum[idx]],
+            list(self.min[idx]),
+            list(self.max[idx]),
+            list(self.last[idx])
+        )
+
+    def take(self, evse_id: int) -> Optional[IntervalStats]:
+        """현재 구간 통계를 꺼내고 새 구간 시작 (샘플이 없으면 None)"""
+        stats = self.peek(evse_id)
+        self.count[evse_id - 1] = 0
+        return stats
+
+class DeadbandFilter:
+    """EVSE별 변화량 기준 보고 판단
+
+    마지막으로 보낸 값과 비교해 어느 필드든 불감대(절대값 또는 마지막 값 대비 비율 중
+    큰 쪽)를 벗어나거나, max_silence초 동안 보내지 않았으면 보고한다.
+    """
+
+    def __init__(self, num_evse: int, absolute: Sequence[float], relative: float = 0.0,
+                 max_silence: float = 60.0):
+        self.absolute = tuple(absolute)  # 필드별 절대 불감대
+        self.relative = relative  # 마지막으로 보낸 값 대비 비율 불감대
+        self.max_silence = max_silence  # 변화가 없어도 이 시간이 지나면 보고(초)
+        self.last_sent: List[Optional[List[float]]] = [None] * num_evse
+        self.last_sent_time = [0.0] * num_evse
+
+    def exceeds(self, evse_id: int, values: Sequence[float]) -> bool:
+        """values 중 하나라도 마지막으로 보낸 값의 불감대를 벗어났는지 확인"""
+        last_sent = self.last_sent[evse_id - 1]
+        if last_sent is None:
+            return True
+        for value, reference, absolute in zip(values, last_sent, self.absolute):
+            if abs(value - reference) > max(absolute, self.relative * abs(reference)):
+                return True
+        return False
+
+    def should_report(self, evse_id: int, stats: IntervalStats, now: float) -> bool:
+        """구간 통계(최소/최대/마지막 값)를 보고해야 하는지 확인"""
+        if now - self.last_sent_time[evse_id - 1] >= self.max_silence:
+            return True
+        return any(self.exceeds(evse_id, values) for values in (stats.last, stats.min, stats.max))
+
+    def mark_sent(self, evse_id: int, values: Sequence[float], now: float):
+        """보낸 값 기록 (다음 비교 기준)"""
+        self.last_sent[evse_id - 1] = list(values)
+        self.last_sent_time[evse_id - 1] = now
+
+    def reset(self, evse_id: int):
+        """기준 초기화 (다음 샘플은 바로 보고)"""
+        self.last_sent[evse_id - 1] = None
+        self.last_sent_time[evse_id - 1] = 0.0
+
+class EnergyAccumulator:
+    """EVSE별 누적 에너지(Wh) 적산기
+
+    보고 주기와 상관없이 들어오는 모든 샘플의 전력을 사다리꼴 공식으로 적분하여
+    단조 증가하는 에너지 레지스터를 유지한다. 트랜잭션 에너지는 시작 시점의
+    레지스터 값과의 차이로 계산한다.
+    """
+
+    def __init__(self, num_evse: int, max_gap: float = 5.0):
+        self.max_gap = max_gap  # 샘플 간격이 이보다 길면 이 시간만큼만 적분 (수신 끊김 대비, 초)
+        self.register_wh = [0.0] * num_evse  # EVSE별 누적 에너지
+        self.last_time: List[Optional[float]] = [None] * num_evse
+        self.last_power = [0.0] * num_evse
+        self.transaction_start_wh: List[Optional[float]] = [None] * num_evse
+
+    def add_sample(self, evse_id: int, timestamp: float, power: float):
+        """전력 샘플 적분 (timestamp는 time.monotonic, power는 W)"""
+        idx = evse_id - 1
+        last_time = self.last_time[idx]
+        if last_time is not None:
+            dt = min(timestamp - last_time, self.max_gap)
+            if dt > 0:
+                self.register_wh[idx] += (self.last_power[idx] + power) / 2 * dt / 3600
+        self.last_time[idx] = timestamp
+        self.last_power[idx] = power
+
+    def register(self, evse_id: int) -> float:
+        """EVSE 누적 에너지(Wh)"""
+        return self.register_wh[evse_id - 1]
+
+    def start_transaction(self, evse_id: int) -> float:
+        """트랜잭션 시작 시점의 레지스터 값 기록"""
+        idx = evse_id - 1
+        self.transaction_start_wh[idx] = self.register_wh[idx]
+        return self.register_wh[idx]
+
+    def transaction_energy(self, evse_id: int) -> float:
+        """진행 중인 트랜잭션의 에너지(Wh)"""
+        start = self.transaction_start_wh[evse_id - 1]
+        return 0.0 if start is None else self.register_wh[evse_id - 1] - start
+
+    def end_transaction(self, evse_id: int) -> float:
+        """트랜잭션 종료 - 트랜잭션 에너지(Wh) 반환"""
+        energy = self.transaction_energy(evse_id)
+        self.transaction_start_wh[evse_id - 1] = None
+        return energy
+
+def build_energy_sample(energy_wh: float, context: Optional[str] = None) -> Dict:
+    """누적 에너지 레지스터 sampledValue (context: Transaction.Begin / Transaction.End 등)"""
+    sample = {
+        "value": round(energy_wh, 3),
+        "measurand": "Energy.Active.Import.Register",
+        "unitOfMeasure": {"unit": "Wh"}
+    }
+    if context is not None:
+        sample["context"] = context
+    return sample
+
+def build_sampled_values(power: float, voltage: float, current: float,
+                         energy_wh: Optional[float] = None) -> List[Dict]:
+    """전력/전압/전류(및 누적 에너지)를 한 샘플의 sampledValue 목록으로 구성 (전력이 첫 항목)"""
+    sampled_values = [
+        {
+            "value": power,
+            "measurand": "Power.Active.Import",
+            "unitOfMeasure": {"unit": "W"}
+        },
+        {
+            "value": round(voltage, 2),
+            "measurand": "Voltage",
+            "unitOfMeasure": {"unit": "V"}
+        },
+        {
+            "value": round(current, 3),
+            "measurand": "Current.Import",
+            "unitOfMeasure": {"unit": "A"}
+        }
+    ]
+    if energy_wh is not None:
+        sampled_values.append(build_energy_sample(energy_wh))
+    return sampled_values
+
+def build_interval_sampled_values(stats: IntervalStats, energy_wh: Optional[float] = None,
+                                  vendor_id: str = "Quarterback") -> List[Dict]:
+    """구간 통계(전력, 전압, 전류 순)를 sampledValue 목록으로 구성
+
+    value는 구간 평균이고, 최소/최대/마지막 값과 샘플 수는 customData에 담는다.
+    """
+    sampled_values = build_sampled_values(stats.avg[0], stats.avg[1], stats.avg[2], energy_wh)
+    for f, (sample, digits) in enumerate(zip(sampled_values, (1, 2, 3))):
+        sample["value"] = round(stats.avg[f], digits)
+        sample["context"] = "Sample.Periodic"
+        sample["customData"] = {
+            "vendorId": vendor_id,
+            "min": round(stats.min[f], digits),
+            "max": round(stats.max[f], digits),
+            "last": round(stats.last[f], digits),
+            "count": stats.count
+        }
+    return sampled_values
@@ -3,33 +3,102 @@ OCPP 충전소 시뮬레이터 - 통신 모듈
 """
 
 import asyncio
+import time
 import serial
 import websockets
 import json
-from typing import Optional, Dict, Any
+from collections import deque
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable
+
+from ocpp_queue import PriorityMessageQueue, RetryScheduler, backoff_delay, ordering_key
+from ocpp_journal import MessageJournal
+from ocpp_message import encode_call, decode_json
+from ocpp_metrics import CommMetrics
+from serial_capture import ReplaySerial, REPLAY_PREFIX
+
+# 연결이 끊긴 것으로 볼 예외 (그 외 예외는 해당 메시지만 실패 처리)
+CONNECTION_ERRORS = (ConnectionError, OSError, websockets.ConnectionClosed)
 
 class OcppComm:
     """OCPP 통신 클래스"""
     
-    def __init__(self, websocket_url, serial_port=None, baud_rate=2400, max_retries=3, retry_delay=2.0):
+    def __init__(self, websocket_url, serial_port=None, baud_rate=2400, max_retries=3, retry_delay=2.0, max_retry_delay=30.0,
+                 max_in_flight=4, response_timeout=10.0, starvation_timeout=5.0, journal_path=None,
+                 connect_timeout=10.0, reconnect_min_delay=1.0, reconnect_max_delay=60.0,
+                 ping_interval=20.0, ping_timeout=10.0):
         self.websocket_url = websocket_url
         self.serial_port = serial_port
         self.baud_rate = baud_rate
         self.websocket = None
         self.serial_conn = None
-        self.receive_lock = asyncio.Lock()  # 락 추가
-        self.message_queue = asyncio.Queue()  # 메시지 큐 추가
-        self.is_sending = False  # 메시지 전송 중 상태 플래그
-        self.last_response = None  # 마지막 응답 저장
-        self.response_event = asyncio.Event()  # 응답 대기를 위한 이벤트
+        self.message_queue = PriorityMessageQueue(starvation_timeout)  # 레인별 우선순위 메시지 큐
         
         # 재시도 관련 설정
-        self.max_retries = max_retries  # 최대 재시도 횟수
-        self.retry_delay = retry_delay  # 재시도 간격(초)
+        self.max_retries = max_retries  # 최대 재시도 횟수 (저널에 기록된 메시지는 응답을 받을 때까지 계속 재시도)
+        self.retry_delay = retry_delay  # 첫 재시도 간격(초), 이후 지수적으로 증가
+        self.retry_scheduler = RetryScheduler(self._requeue, retry_delay, max_retry_delay)
+        
+        # 파이프라이닝 관련 설정
+        self.max_in_flight = max_in_flight  # 응답을 동시에 기다릴 수 있는 최대 메시지 수
+        self.response_timeout = response_timeout  # 기본 응답 대기 시간(초), 메시지별 "timeout"으로 변경 가능
+        self.in_flight = asyncio.Semaphore(max_in_flight)  # 전송 윈도우
+        self.pending_requests: Dict[str, asyncio.Future] = {}  # messageId -> 응답 프레임 Future
+        self.result_futures: Dict[str, asyncio.Future] = {}  # messageId -> 최종 결과 Future (send_request용)
+        self.in_flight_tasks = set()  # 응답 대기 중인 전송 태스크
+        
+        # EVSE별 순서 유지 (같은 EVSE의 트랜잭션/상태 메시지는 앞 메시지가 응답을 받거나 포기된 뒤에 전송)
+        self.ordering_owners: Dict[tuple, str] = {}  # 순서 키 -> 전송(재시도 대기 포함) 중인 messageId
+        self.held_messages: Dict[tuple, deque] = {}  # 순서 키 -> 앞 메시지를 기다리는 메시지
+        
+        # 오프라인 대비 송신 저널 (경로를 지정한 경우에만 사용)
+        self.journal = MessageJournal(journal_path) if journal_path else None
+        self.journaled_in_memory = set()  # 저널 메시지 중 메모리 큐에 있거나 전송 중인 messageId
+        self.replay_task = None
+        self.journal_flush_handle = None
+        self.replay_batch_size = 100  # 재전송 시 한 번에 큐에 올릴 메시지 수
+        # 항상 저널에 기록할 액션 (MeterValues는 연결 중에는 큐에서 EVSE별로 합쳐서 보냄)
+        self.journal_actions = {"TransactionEvent"}
+        # 오프라인 중 저널에 기록할 액션 (상태성 메시지는 재연결 시 최신 상태만 다시 보냄)
+        self.offline_journal_actions = {"TransactionEvent", "MeterValues"}
+        self.journal_backlog = False  # 큐가 가득 차서 저널에만 기록된 메시지가 있음
+        
+        # 송신 큐 혼잡(백프레셔) 알림 설정 - 가장 많이 찬 레인의 사용률 기준
+        self.backpressure_high = 0.8  # 이 이상이면 혼잡
+        self.backpressure_low = 0.3  # 이 이하로 내려가면 해소
+        self.backpressure = False
+        self.backpressure_callback = None  # 혼잡 상태가 바뀔 때 호출 - callback(active)
+        
+        # 연결 감시 설정
+        self.connect_timeout = connect_timeout  # 연결 시도 제한 시간(초)
+        self.reconnect_min_delay = reconnect_min_delay  # 첫 재연결 대기(초), 실패할수록 증가
+        self.reconnect_max_delay = reconnect_max_delay  # 최대 재연결 대기(초)
+        self.reconnect_reset_after = reconnect_max_delay  # 이 시간(초) 이상 유지된 연결이 끊겨야 재연결 대기를 처음부터 다시 셈
+        self.ping_interval = ping_interval  # ping 전송 간격(초)
+        self.ping_timeout = ping_timeout  # pong 대기 시간(초), 초과 시 연결 끊김으로 처리
+        self.supervisor_task = None
+        self.connection_lost = asyncio.Event()  # 연결이 끊기면 설정
+        self.on_connected = None  # (재)연결 직후 호출할 코루틴 함수
+        self.message_acked_callback = None  # 메시지가 응답(CALLRESULT)을 받았을 때 호출
+        
+        # 계측 (액션별 지연 히스토그램, 전송 카운터)
+        self.metrics = CommMetrics()
         
         # 메시지 처리 태스크 시작
         self.message_processor_task = None
         
+        # 수신 태스크 (연결당 1개) 및 프레임 디스패처
+        self.reader_task = None
+        self.frame_handlers = {
+            2: self._handle_call,  # CALL (서버 요청)
+            3: self._handle_call_result,  # CALLRESULT
+            4: self._handle_call_error,  # CALLERROR
+        }
+        self.call_handlers: Dict[str, Callable[[str, dict], Awaitable[None]]] = {
+            "ChangeAvailability": self.handle_change_availability,
+            "RequestStopTransaction": self.handle_request_stop_transaction,
+        }
+        self.handler_tasks = set()  # 실행 중인 서버 요청 처리 태스크
+        
         # 가격 정보 저장
         self.price_per_wh = 10  # 기본값 10원/Wh로 설정
         
@@ -42,22 +111,100 @@ class OcppComm:
     async def connect_websocket(self) -> bool:
         """WebSocket 연결"""
         try:
-            self.websocket = await websockets.connect(self.websocket_url)
+            self.websocket = await asyncio.wait_for(
+                websockets.connect(
+                    self.websocket_url,
+                    ping_interval=self.ping_interval,
+                    ping_timeout=self.ping_timeout
+                ),
+                timeout=self.connect_timeout
+            )
+            self.connection_lost.clear()
+            self.metrics.count("reconnects" if self.metrics.counters["connects"] else "connects")
             print(f"WebSocket 연결 성공: {self.websocket_url}")
             
+            # 수신 태스크 시작 (이전 연결의 수신 태스크는 정리)
+            if self.reader_task and not self.reader_task.done():
+                self.reader_task.cancel()
+            self.reader_task = asyncio.create_task(self._reader_loop(self.websocket))
+            
             # 메시지 처리 태스크 시작
             if self.message_processor_task is None or self.message_processor_task.done():
                 self.message_processor_task = asyncio.create_task(self.process_message_queue())
                 
+            # 연결이 끊긴 동안 저널에 쌓인 메시지 재전송
+            if self.journal is not None and not self._replaying():
+                self.replay_task = asyncio.create_task(self._replay_journal())
+                
             return True
         except Exception as e:
-            print(f"WebSocket 연결 실패: {e}")
+            self.metrics.count("connect_failures")
+            print(f"WebSocket 연결 실패: {e!r}")
             return False
 
+    def start_supervisor(self, on_connected: Optional[Callable[[], Awaitable[None]]] = None):
+        """연결 감시 태스크 시작 (끊기면 백오프 후 재연결하고 on_connected 호출)"""
+        self.on_connected = on_connected
+        if self.supervisor_task is None or self.supervisor_task.done():
+            self.supervisor_task = asyncio.create_task(self._supervise_connection())
+
+    async def _supervise_connection(self):
+        """연결 감시 루프
+
+        연결 직후 곧바로 끊기는 서버(핸드셰이크 후 종료, ping 실패 등)에 재연결 폭주가 생기지 않도록
+        연결이 reconnect_reset_after초 이상 유지된 뒤에 끊긴 경우에만 재연결 대기를 초기화한다.
+        """
+        attempt = 0
+        connected_at = None  # 감시 태스크가 마지막으로 연결한 시각
+        try:
+            while True:
+                if self.websocket is not None:
+                    # 연결이 끊길 때까지 대기 (수신 태스크의 ping/pong 실패도 여기로 전달됨)
+                    await self.connection_lost.wait()
+                    continue
+                    
+                if connected_at is not None:
+                    # 연결이 끊김 - 오래 유지된 연결이었으면 첫 대기부터, 아니면 대기를 계속 늘림
+                    uptime = time.monotonic() - connected_at
+                    connected_at = None
+                    attempt = 1 if uptime >= self.reconnect_reset_after else attempt + 1
+                    delay = backoff_delay(attempt, self.reconnect_min_delay, self.reconnect_max_delay)
+                    print(f"WebSocket 연결 끊김 ({uptime:.1f}초 유지) - {delay:.1f}초 후 재연결 시도")
+                    await asyncio.sleep(delay)
+                    
+                if not await self.connect_websocket():
+                    attempt += 1
+                    delay = backoff_delay(attempt, self.reconnect_min_delay, self.reconnect_max_delay)
+                    print(f"{delay:.1f}초 후 WebSocket 재연결 시도 ({attempt}회 실패)")
+                    await asyncio.sleep(delay)
+                    continue
+                    
+                connected_at = time.monotonic()
+                if self.on_connected is not None:
+                    try:
+                        await self.on_connected()
+                    except Exception as e:
+                        print(f"연결 후 처리 중 오류: {e}")
+        except asyncio.CancelledError:
+            print("연결 감시 태스크가 취소되었습니다.")
+
+    def _mark_disconnected(self, websocket):
+        """연결 끊김 처리 (같은 연결에 대해 한 번만)"""
+        if self.websocket is not websocket or websocket is None:
+            return
+        self.websocket = None
+        self.connection_lost.set()
+        self.metrics.count("disconnects")
+        asyncio.create_task(websocket.close())
+
     def connect_serial(self) -> bool:
         """시리얼 포트 연결"""
         try:
-            self.serial_conn = serial.Serial(self.serial_port, self.baud_rate, timeout=1)
+            if self.serial_port.startswith(REPLAY_PREFIX):
+                # 캡처 파일 재생 (실제 포트 대신)
+                self.serial_conn = ReplaySerial.from_port(self.serial_port)
+            else:
+                self.serial_conn = serial.Serial(self.serial_port, self.baud_rate, timeout=1)
             print(f"시리얼 포트 연결 성공: {self.serial_port}")
             return True
         except Exception as e:
@@ -71,72 +218,308 @@ class OcppComm:
         if self.serial_conn:
             self.serial_conn.close()
         
-        # 메시지 처리 태스크 취소
+        # 연결 감시 / 메시지 처리 / 수신 태스크 취소
+        if self.supervisor_task and not self.supervisor_task.done():
+            self.supervisor_task.cancel()
         if self.message_processor_task and not self.message_processor_task.done():
             self.message_processor_task.cancel()
+        if self.reader_task and not self.reader_task.done():
+            self.reader_task.cancel()
+        if self.replay_task and not self.replay_task.done():
+            self.replay_task.cancel()
+        self.retry_scheduler.cancel()
+        self.ordering_owners.clear()
+        self.held_messages.clear()
+        for task in list(self.in_flight_tasks):
+            task.cancel()
+        
+        # 저널 커밋 후 닫기
+        if self.journal is not None:
+            if self.journal_flush_handle:
+                self.journal_flush_handle.cancel()
+            self.journal.close()
+            self.journal = None
 
     async def send_message(self, message: dict) -> bool:
-        """메시지 전송 (큐에 추가)"""
+        """메시지 전송 (큐에 추가, 저널 사용 시 디스크에도 기록)"""
         if not self.websocket:
-            success = await self.connect_websocket()
+            # 연결 감시 태스크가 있으면 재연결은 맡기고, 없으면 직접 연결 시도
+            supervised = self.supervisor_task is not None and not self.supervisor_task.done()
+            success = False if supervised else await self.connect_websocket()
             if not success:
-                return False
+                if self.journal is None or message.get("action") not in self.offline_journal_actions:
+                    return False
+                # 연결이 없으면 저널에만 기록하고 재연결 후 재전송
+                self._journal_append(message, offline=True)
+                self.metrics.count("journaled_offline")
+                print(f"오프라인 상태 - 메시지를 저널에 기록했습니다: {message.get('action')} ({message['messageId']})")
+                return True
                 
         # 재시도 카운터 초기화 (새 메시지)
         if "retry_count" not in message:
             message["retry_count"] = 0
+            
+        if self.journal is not None and message.get("action") in self.journal_actions:
+            self._journal_append(message, offline=False)
+            # 재전송 중이거나 저널에만 남은 메시지가 있으면 저널 순서(seq)를 지키기 위해 재전송 태스크가 큐에 올림
+            if self._replaying() or self.journal_backlog:
+                return True
+            # 큐가 가득 차면 메모리에 올리지 않고 저널에만 남겨둠 (큐가 비워지면 재전송)
+            if self.message_queue.is_full(message):
+                self.journal_backlog = True
+                self.metrics.count("journal_spills")
+                print(f"송신 큐가 가득 참 - 메시지를 저널에만 기록했습니다: {message.get('action')} ({message['messageId']})")
+                return True
+            self.journaled_in_memory.add(message["messageId"])
                 
-        # 메시지를 큐에 추가
+        # 메시지를 큐에 추가 (텔레메트리는 EVSE별로 합쳐지고, 합칠 수 없는 메시지는 빈 자리가 생길 때까지 대기)
+        message["enqueued_at"] = time.monotonic()
         await self.message_queue.put(message)
+        self._update_backpressure()
         return True
         
+    async def send_request(self, message: dict, timeout: Optional[float] = None) -> Tuple[bool, Optional[list]]:
+        """메시지를 큐에 추가하고 같은 messageId의 응답 프레임을 대기
+        
+        반환값: (큐 추가 성공 여부, 응답 프레임 또는 None)
+        """
+        message_id = message["messageId"]
+        future = asyncio.get_running_loop().create_future()
+        self.result_futures[message_id] = future
+        try:
+            if not await self.send_message(message):
+                return False, None
+            try:
+                return True, await asyncio.wait_for(future, timeout=timeout)
+            except asyncio.TimeoutError:
+                print(f"응답 대기 시간 초과: {message_id}")
+                return True, None
+        finally:
+            self.result_futures.pop(message_id, None)
+        
     async def process_message_queue(self):
-        """메시지 큐 처리 (순차적으로 메시지 전송)"""
+        """메시지 큐 처리 (우선순위 레인 순으로, 전송 윈도우 크기만큼 응답 대기를 겹쳐서 전송)"""
         try:
             while True:
-                # 큐에서 메시지 가져오기
-                message = await self.message_queue.get()
-                
-                # 메시지 전송 및 응답 대기
-                success = await self._send_message_and_wait_response(message)
+                # 전송 윈도우에 여유가 생긴 뒤에 큐에서 꺼냄
+                # (먼저 꺼내 두면 그동안 들어온 높은 우선순위 메시지가 그 뒤로 밀리고, 합치기/기아 방지에서도 빠짐)
+                await self.in_flight.acquire()
+                try:
+                    message = await self.message_queue.get()
+                except asyncio.CancelledError:
+                    self.in_flight.release()
+                    raise
+                self._update_backpressure()
                 
-                if not success:
-                    # 재시도 횟수 증가
-                    if "retry_count" not in message:
-                        message["retry_count"] = 0
-                    message["retry_count"] += 1
+                # 큐가 가득 차서 저널에만 기록된 메시지가 있으면 여유가 생겼을 때 재전송
+                if self.journal_backlog and not self._replaying() and self.message_queue.qsize() < self.replay_batch_size:
+                    self.replay_task = asyncio.create_task(self._replay_journal())
                     
-                    # 최대 재시도 횟수 이내인 경우 다시 큐에 추가
-                    if message["retry_count"] <= self.max_retries:
-                        print(f"메시지 전송 실패, {message['retry_count']}번째 재시도 예정 (최대 {self.max_retries}회)")
-                        # 재시도 간격 대기
-                        await asyncio.sleep(self.retry_delay)
-                        await self.message_queue.put(message)
-                    else:
-                        print(f"메시지 전송 실패, 최대 재시도 횟수({self.max_retries}회) 초과로 포기합니다.")
+                # 같은 EVSE의 앞 메시지가 아직 끝나지 않았으면 보류 (윈도우 슬롯은 돌려줌)
+                if self._hold_for_order(message):
+                    self.in_flight.release()
+                    continue
                 
-                # 큐 작업 완료 표시
-                self.message_queue.task_done()
+                task = asyncio.create_task(self._process_message(message))
+                self.in_flight_tasks.add(task)
+                task.add_done_callback(self.in_flight_tasks.discard)
                 
         except asyncio.CancelledError:
             print("메시지 처리 태스크가 취소되었습니다.")
         except Exception as e:
             print(f"메시지 처리 중 오류 발생: {e}")
 
-    async def _send_message_and_wait_response(self, message: dict) -> bool:
-        """메시지 전송 및 응답 대기"""
+    async def _process_message(self, message: dict):
+        """메시지 한 건 전송 및 결과 처리"""
         try:
-            # 응답 이벤트 초기화
-            self.response_event.clear()
-            self.last_response = None
+            response = await self._send_message_and_wait_response(message)
+        except Exception as e:
+            # 인코딩 오류 등 메시지 자체의 문제 - 연결은 유지하고 이 메시지만 실패 처리 (재시도해도 같은 결과)
+            self.metrics.count("send_errors")
+            print(f"메시지 처리 오류로 전송을 포기합니다: {message.get('action')} ({message['messageId']}): {e!r}")
+            self.journaled_in_memory.discard(message["messageId"])  # 저널 기록분은 지우지 않음 (재연결 시 재전송)
+            self._release_order(message)
+            self._resolve_result(message, None)
+            return
+        finally:
+            # 윈도우 슬롯 반환
+            self.in_flight.release()
+            
+        if response is not None:
+            self._journal_ack(message["messageId"])
+            self._release_order(message)
+            self._resolve_result(message, response)
+            if self.message_acked_callback is not None:
+                self.message_acked_callback(message, response)
+            return
+            
+        # 연결이 끊긴 경우 저널에 남겨두고 재연결 후 재전송
+        if message["messageId"] in self.journaled_in_memory and self.websocket is None:
+            self.journaled_in_memory.discard(message["messageId"])
+            self._release_order(message)
+            print(f"연결 끊김 - 재연결 후 재전송 예정: {message.get('action')} ({message['messageId']})")
+            return
             
-            # 메시지 전송
-            json_message = json.dumps([
-                message["messageTypeId"],
-                message["messageId"],
-                message["action"],
-                message["payload"]
-            ], ensure_ascii=False)
+        # 재시도 횟수 증가
+        message["retry_count"] = message.get("retry_count", 0) + 1
+        
+        # 최대 재시도 횟수 이내인 경우 백오프 후 다시 큐에 추가
+        # (대기 중에도 다른 메시지는 계속 전송되며, 같은 EVSE의 트랜잭션/상태 메시지만 이 메시지를 기다림)
+        if message["retry_count"] <= self.max_retries:
+            delay = self.retry_scheduler.backoff(message["retry_count"])
+            self.metrics.count("retries")
+            print(f"메시지 전송 실패, {delay:.1f}초 후 {message['retry_count']}번째 재시도 예정 (최대 {self.max_retries}회)")
+            self.retry_scheduler.schedule(message, delay)
+        elif message["messageId"] in self.journaled_in_memory:
+            # 저널에 기록된 메시지(과금 기록)는 포기하지 않고 최대 지연 간격으로 계속 재시도 (저널에서도 지우지 않음)
+            delay = self.retry_scheduler.backoff(message["retry_count"])
+            self.metrics.count("retries")
+            print(f"저널 메시지 전송 실패, {delay:.1f}초 후 다시 시도합니다 ({message['retry_count']}번째): "
+                  f"{message.get('action')} ({message['messageId']})")
+            self.retry_scheduler.schedule(message, delay)
+        else:
+            self.metrics.count("gave_up")
+            print(f"메시지 전송 실패, 최대 재시도 횟수({self.max_retries}회) 초과로 포기합니다.")
+            self._release_order(message)
+            self._resolve_result(message, None)
+
+    def _hold_for_order(self, message: dict) -> bool:
+        """같은 EVSE의 앞 메시지가 전송 중이거나 재시도 대기 중이면 보류 (보류했으면 True)"""
+        key = ordering_key(message)
+        if key is None:
+            return False
+        owner = self.ordering_owners.get(key)
+        if owner is None or owner == message["messageId"]:
+            self.ordering_owners[key] = message["messageId"]
+            return False
+        self.held_messages.setdefault(key, deque()).append(message)
+        return True
+
+    def _release_order(self, message: dict):
+        """메시지 처리가 끝나면 같은 EVSE의 다음 보류 메시지를 큐에 올림"""
+        key = ordering_key(message)
+        if key is None or self.ordering_owners.get(key) != message["messageId"]:
+            return
+        held = self.held_messages.get(key)
+        if not held:
+            del self.ordering_owners[key]
+            self.held_messages.pop(key, None)
+            return
+        # 다음 메시지를 미리 차례로 지정해 두어, 큐에 남아 있던 같은 EVSE의 메시지가 끼어들지 않게 함
+        next_message = held.popleft()
+        self.ordering_owners[key] = next_message["messageId"]
+        self._requeue(next_message)
+
+    def _requeue(self, message: dict):
+        """재시도 대기가 끝났거나 보류가 풀린 메시지를 큐에 다시 추가 (이미 큐를 거친 메시지이므로 한도 무시)"""
+        message["enqueued_at"] = time.monotonic()
+        self.message_queue.put_nowait(message, force=True)
+        self._update_backpressure()
+
+    def _update_backpressure(self):
+        """큐 사용률이 기준을 넘거나 내려가면 백프레셔 콜백 호출"""
+        ratio = self.message_queue.fill_ratio()
+        if not self.backpressure and ratio >= self.backpressure_high:
+            self.backpressure = True
+        elif self.backpressure and ratio <= self.backpressure_low:
+            self.backpressure = False
+        else:
+            return
+        print(f"송신 큐 혼잡 {'발생' if self.backpressure else '해소'} (사용률 {ratio:.0%}, 레인별 {self.message_queue.lane_depths()})")
+        if self.backpressure_callback is not None:
+            self.backpressure_callback(self.backpressure)
+
+    def _journal_append(self, message: dict, offline: bool):
+        """저널에 메시지 기록 (오프라인 중 발생한 TransactionEvent에는 offline 플래그 설정)"""
+        if offline and message.get("action") == "TransactionEvent":
+            message["payload"]["offline"] = True
+            message.pop("encoded_payload", None)  # 페이로드가 바뀌었으므로 다시 인코딩
+        message["journaled"] = True  # 큐에서 다른 메시지와 합치지 않음
+        self.journal.append(message)
+        self._schedule_journal_flush()
+
+    def _journal_ack(self, message_id: str):
+        """응답을 받은 메시지를 저널에서 제거"""
+        if self.journal is None or message_id not in self.journaled_in_memory:
+            return
+        self.journaled_in_memory.discard(message_id)
+        self.journal.ack(message_id)
+        self._schedule_journal_flush()
+
+    def _schedule_journal_flush(self):
+        """flush_interval 뒤에 저널 커밋 예약 (이미 예약된 경우 무시)"""
+        if self.journal is None or self.journal.pending_changes == 0:
+            return
+        if self.journal_flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self.journal_flush_handle = loop.call_later(self.journal.flush_interval, self._flush_journal)
+
+    def _flush_journal(self):
+        """예약된 저널 커밋 실행"""
+        self.journal_flush_handle = None
+        if self.journal is not None:
+            self.journal.flush()
+
+    def _replaying(self) -> bool:
+        """저널 재전송 중인지 확인"""
+        return self.replay_task is not None and not self.replay_task.done()
+
+    async def _replay_journal(self):
+        """저널에 남은 메시지를 seq 순서로 큐에 다시 올림 (한 번에 replay_batch_size개씩)"""
+        try:
+            last_seq = 0
+            replayed = 0
+            while self.journal is not None and self.websocket is not None:
+                batch = self.journal.read_batch(last_seq, self.replay_batch_size)
+                if not batch:
+                    # 끝까지 올렸으므로 새 메시지는 다시 바로 큐에 추가
+                    self.journal_backlog = False
+                    break
+                for seq, message in batch:
+                    last_seq = seq
+                    if message["messageId"] in self.journaled_in_memory:
+                        continue
+                    message["retry_count"] = 0
+                    message["enqueued_at"] = time.monotonic()
+                    self.journaled_in_memory.add(message["messageId"])
+                    await self.message_queue.put(message)
+                    replayed += 1
+                    
+                # 큐가 비워질 때까지 다음 묶음을 읽지 않음 (메모리 사용량 제한)
+                while self.message_queue.qsize() >= self.replay_batch_size and self.websocket is not None:
+                    await asyncio.sleep(0.1)
+                    
+            if replayed:
+                print(f"저널에 기록된 메시지 {replayed}건을 재전송 큐에 추가했습니다.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"저널 재전송 중 오류: {e}")
+
+    def _resolve_result(self, message: dict, response: Optional[list]):
+        """send_request로 대기 중인 호출자에게 최종 결과 전달 (큐에서 이 메시지에 합쳐진 messageId 포함)"""
+        for message_id in (message["messageId"], *message.get("merged_ids", ())):
+            future = self.result_futures.get(message_id)
+            if future is not None and not future.done():
+                future.set_result(response)
+
+    def _fail_pending_requests(self, error: Exception):
+        """응답 대기 중인 모든 요청을 실패 처리"""
+        for future in self.pending_requests.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def _send_message_and_wait_response(self, message: dict) -> Optional[list]:
+        """메시지 전송 및 응답 대기 (CALLRESULT 프레임 반환, 실패 시 None)
+
+        연결 오류만 연결 끊김으로 처리하고, 그 외 예외(인코딩 오류 등)는 호출한 쪽으로 전달한다.
+        """
+        message_id = message["messageId"]
+        future = asyncio.get_running_loop().create_future()
+        self.pending_requests[message_id] = future
+        try:
+            # 메시지 전송 (템플릿 메시지는 미리 인코딩된 페이로드 사용)
+            json_message = encode_call(message)
             
             retry_info = f" (재시도: {message.get('retry_count', 0)}/{self.max_retries})" if message.get('retry_count', 0) > 0 else ""
             print(f"[WebSocket sending]{retry_info} {json_message}")
@@ -146,108 +529,140 @@ class OcppComm:
             if is_tx_ended:
                 print("트랜잭션 종료 이벤트 전송 - 응답에서 총 금액 정보 확인 예정")
             
-            await self.websocket.send(json_message)
-            
-            # 응답 수신 태스크 시작
-            receive_task = asyncio.create_task(self.receive_message())
+            await self._send_raw(json_message)
+            sent_at = time.monotonic()
+            enqueued_at = message.get("enqueued_at")
+            self.metrics.record_sent(message.get("action"), sent_at - enqueued_at if enqueued_at else None)
             
-            # 응답 대기 (최대 10초)
+            # 응답 대기 (메시지별 타임아웃, 기본 10초)
+            timeout = message.get("timeout", self.response_timeout)
             try:
-                await asyncio.wait_for(self.response_event.wait(), timeout=10.0)
-                
-                # "수신완료" 메시지 확인
-                if self.last_response and "3" in str(self.last_response):
-                    print(f"'수신완료' 응답을 받았습니다. 메시지 전송 성공.")
-                    return True
-                else:
-                    print(f"'수신완료' 응답을 받지 못했습니다. 응답: {self.last_response}")
-                    return False
+                response = await asyncio.wait_for(future, timeout=timeout)
             except asyncio.TimeoutError:
-                print("응답 대기 시간 초과")
-                return False
-            finally:
-                # 응답 수신 태스크가 아직 실행 중이면 취소
-                if not receive_task.done():
-                    receive_task.cancel()
+                self.metrics.count("timeouts")
+                print(f"응답 대기 시간 초과: {message['action']} ({message_id})")
+                return None
+                
+            self.metrics.record_response(message.get("action"), time.monotonic() - sent_at, error=response[0] != 3)
+            if response[0] == 3:
+                print(f"'수신완료' 응답을 받았습니다. 메시지 전송 성공. ({message_id})")
+                return response
+            print(f"오류 응답을 받았습니다: {response}")
+            return None
                     
-        except Exception as e:
+        except CONNECTION_ERRORS as e:
             print(f"메시지 전송 실패: {e}")
-            self.websocket = None
-            return False
+            self._mark_disconnected(self.websocket)
+            return None
+        finally:
+            self.pending_requests.pop(message_id, None)
 
-    async def receive_message(self):
-        """메시지 수신"""
-        async with self.receive_lock:  # 락 획득
-            try:
-                response = await self.websocket.recv()
-                print(f"서버 응답: {response}")
+    async def _reader_loop(self, websocket):
+        """연결당 하나의 수신 루프 (모든 프레임을 한 번만 디코딩하여 유형별 핸들러로 전달)"""
+        try:
+            while True:
+                raw = await websocket.recv()
+                self.metrics.bytes_received += len(raw) if isinstance(raw, bytes) else len(raw.encode("utf-8"))
+                print(f"서버 응답: {raw}")
                 
-                # 응답 파싱
                 try:
-                    response_data = json.loads(response)
-                    
-                    # 요청 메시지 처리 (CALL - messageTypeId = 2)
-                    if len(response_data) >= 4 and response_data[0] == 2:
-                        message_id = response_data[1]
-                        action = response_data[2]
-                        payload = response_data[3]
-                        
-                        # 요청 처리 완료 후 응답 이벤트 설정 (중요: 응답 대기 타임아웃 방지)
-                        self.last_response = "request_handled"
-                        self.response_event.set()
-                        
-                        # ChangeAvailability 요청 처리
-                        if action == "ChangeAvailability":
-                            await self.handle_change_availability(message_id, payload)
-                            return
-                            
-                        # RequestStopTransaction 요청 처리 추가
-                        if action == "RequestStopTransaction":
-                            await self.handle_request_stop_transaction(message_id, payload)
-                            return
-                    
-                    # 일반 응답 처리 (기존 로직)
-                    self.last_response = response
-                    self.response_event.set()
+                    frame = decode_json(raw)
+                except ValueError as e:
+                    print(f"응답 파싱 중 오류: {e}")
+                    continue
                     
-                    if len(response_data) >= 3 and response_data[0] == 3:  # 응답 메시지인 경우
-                        payload = response_data[2]  # 응답 페이로드
-                        message_id = response_data[1]  # 메시지 ID
-                        
-                        # pricePermWh 값 추출
-                        if "customData" in payload and "pricePermWh" in payload["customData"]:
-                            self.price_per_wh = payload["customData"]["pricePermWh"]
-                            print(f"가격 정보 업데이트: {self.price_per_wh}원/Wh")
-                        
-                        # Response에서 transactionId 추출 (메시지 ID 형식과 상관없이 추출)
-                        if "customData" in payload and "transactionId" in payload["customData"]:
-                            tx_id = payload["customData"]["transactionId"]
-                            # tx_id가 문자열이 아니면 문자열로 변환 (예: tx-003 대신 단순 숫자인 경우)
-                            if not isinstance(tx_id, str):
-                                tx_id = f"tx-{int(tx_id):03d}"
-                            self.last_transaction_id = tx_id
-                            print(f"트랜잭션 ID 업데이트: {self.last_transaction_id}")
-                            
-                        # 총 금액 정보 추출 (TransactionEvent.Ended 응답에 포함)
-                        if "totalPrice" in payload:
-                            price_value = payload["totalPrice"]
-                            # 숫자인지 확인하고 유효한 경우에만 설정
-                            if isinstance(price_value, (int, float)) and price_value >= 0:
-                                # total_price 설정 (이 값은 send_transaction_event_ended에서 확인됨)
-                                self.total_price = price_value
-                                print(f"총 금액 정보 수신: {self.total_price}원")
-                            else:
-                                print(f"유효하지 않은 금액 정보: {price_value}")
+                handler = self.frame_handlers.get(frame[0]) if isinstance(frame, list) and frame else None
+                if handler is None:
+                    print(f"알 수 없는 메시지 유형: {raw}")
+                    continue
+                try:
+                    handler(frame)
                 except Exception as e:
-                    print(f"응답 파싱 중 오류: {e}")
+                    print(f"메시지 처리 중 오류: {e}")
+                    
+        except asyncio.CancelledError:
+            print("메시지 수신 태스크가 취소되었습니다.")
+            raise
+        except Exception as e:
+            print(f"메시지 수신 실패: {e}")
+            self._mark_disconnected(websocket)
+            # 대기 중인 요청을 모두 실패 처리 (타임아웃까지 기다리지 않도록)
+            self._fail_pending_requests(ConnectionError(f"연결 끊김: {e}"))
+
+    def register_call_handler(self, action: str, handler: Callable[[str, dict], Awaitable[None]]):
+        """서버 요청(CALL) 핸들러 등록 - handler(message_id, payload)"""
+        self.call_handlers[action] = handler
+
+    def _handle_call(self, frame: list):
+        """CALL 처리 (핸들러는 별도 태스크로 실행하여 수신 루프를 막지 않음)"""
+        if len(frame) < 4:
+            print(f"잘못된 CALL 형식: {frame}")
+            return
+        message_id, action, payload = frame[1], frame[2], frame[3]
+        handler = self.call_handlers.get(action)
+        if handler is None:
+            coro = self.send_call_error(message_id, "NotImplemented", f"지원하지 않는 요청: {action}")
+        else:
+            coro = handler(message_id, payload)
+        task = asyncio.create_task(coro)
+        self.handler_tasks.add(task)
+        task.add_done_callback(self.handler_tasks.discard)
+
+    def _handle_call_result(self, frame: list):
+        """CALLRESULT 처리"""
+        if len(frame) < 3:
+            print(f"잘못된 응답 형식: {frame}")
+            return
+        message_id = frame[1]  # 메시지 ID
+        payload = frame[2]  # 응답 페이로드
+        
+        # pricePermWh 값 추출
+        if "customData" in payload and "pricePermWh" in payload["customData"]:
+            self.price_per_wh = payload["customData"]["pricePermWh"]
+            print(f"가격 정보 업데이트: {self.price_per_wh}원/Wh")
+        
+        # Response에서 transactionId 추출 (메시지 ID 형식과 상관없이 추출)
+        if "customData" in payload and "transactionId" in payload["customData"]:
+            tx_id = payload["customData"]["transactionId"]
+            # tx_id가 문자열이 아니면 문자열로 변환 (예: tx-003 대신 단순 숫자인 경우)
+            if not isinstance(tx_id, str):
+                tx_id = f"tx-{int(tx_id):03d}"
+            self.last_transaction_id = tx_id
+            print(f"트랜잭션 ID 업데이트: {self.last_transaction_id}")
+            
+        # 총 금액 정보 추출 (TransactionEvent.Ended 응답에 포함)
+        if "totalPrice" in payload:
+            price_value = payload["totalPrice"]
+            # 숫자인지 확인하고 유효한 경우에만 설정
+            if isinstance(price_value, (int, float)) and price_value >= 0:
+                self.total_price = price_value
+                print(f"총 금액 정보 수신: {self.total_price}원")
+            else:
+                print(f"유효하지 않은 금액 정보: {price_value}")
                 
-            except asyncio.CancelledError:
-                print("메시지 수신 태스크가 취소되었습니다.")
-            except Exception as e:
-                print(f"메시지 수신 실패: {e}")
-                self.websocket = None
-                # 오류 발생 시에도 이벤트 설정 (대기 중인 태스크가 진행되도록)
-                self.response_event.set()
+        self._complete_pending_request(message_id, frame)
+
+    def _handle_call_error(self, frame: list):
+        """CALLERROR 처리"""
+        if len(frame) < 3:
+            print(f"잘못된 오류 응답 형식: {frame}")
+            return
+        self._complete_pending_request(frame[1], frame)
+
+    def _complete_pending_request(self, message_id: str, frame: list):
+        """messageId로 대기 중인 요청에 응답 프레임 전달"""
+        future = self.pending_requests.get(message_id)
+        if future is not None and not future.done():
+            future.set_result(frame)
+        else:
+            print(f"대기 중인 요청이 없는 응답: {message_id}")
+
+    async def send_call_error(self, message_id, error_code, description):
+        """CALLERROR 응답 전송"""
+        response = json.dumps([4, message_id, error_code, description, {}], ensure_ascii=False)
+        
+        print(f"오류 응답 전송: {response}")
+        await self._send_raw(response)
                 
     async def handle_change_availability(self, message_id, payload):
         """ChangeAvailability 요청 처리"""
@@ -319,7 +734,7 @@ class OcppComm:
         response = json.dumps([3, message_id, {"status": status}])
         
         print(f"RequestStopTransaction 응답 전송: {response}")
-        await self.websocket.send(response)
+        await self._send_raw(response)
         
     def set_stop_transaction_callback(self, callback):
         """RequestStopTransaction 콜백 설정"""
@@ -331,7 +746,41 @@ class OcppComm:
         response = json.dumps([3, message_id, {"status": status}])
         
         print(f"ChangeAvailability 응답 전송: {response}")
-        await self.websocket.send(response)
+        await self._send_raw(response)
+        
+    async def _send_raw(self, data: str):
+        """인코딩된 프레임 전송 (전송 바이트 수 기록)"""
+        websocket = self.websocket
+        if websocket is None:
+            raise ConnectionError("WebSocket 연결 없음")
+        await websocket.send(data)
+        self.metrics.bytes_sent += len(data.encode("utf-8"))
+        
+    def _transport_state(self) -> Dict[str, Any]:
+        """현재 큐/전송 상태 (계측 값과 함께 보고)"""
+        return {
+            "queue": self.message_queue.get_stats(),
+            "in_flight": len(self.pending_requests),
+            "retry_pending": len(self.retry_scheduler),
+            "journal_pending": self.journal.count() if self.journal is not None else 0,
+            "connected": self.websocket is not None,
+        }
+        
+    def get_metrics(self, **extra) -> Dict[str, Any]:
+        """계측 값과 현재 큐/전송 상태 (extra는 그대로 추가)"""
+        return self.metrics.snapshot(**self._transport_state(), **extra)
+        
+    def dump_metrics(self, path: str, **extra):
+        """계측 값을 JSON 파일로 저장 (extra는 그대로 추가)"""
+        self.metrics.dump(path, **self._transport_state(), **extra)
+        
+    def set_backpressure_callback(self, callback):
+        """송신 큐 혼잡 상태 변경 콜백 설정 - callback(active)"""
+        self.backpressure_callback = callback
+        
+    def set_message_acked_callback(self, callback):
+        """메시지 응답 수신 콜백 설정 - callback(message, response)"""
+        self.message_acked_callback = callback
         
     def set_change_availability_callback(self, callback):
         """ChangeAvailability 콜백 설정"""
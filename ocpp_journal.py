@@ -0,0 +1,115 @@
+"""
+OCPP 충전소 시뮬레이터 - 디스크 기반 송신 저널
+"""
+
+import json
+import sqlite3
+import time
+from typing import List
+
+class MessageJournal:
+    """SQLite(WAL) 기반 송신 저널
+
+    전송할 CALL 메시지를 등록 순서(seq)대로 디스크에 기록하고, 응답을 받은 항목은
+    삭제한다. 커밋(fsync)은 batch_size개 또는 flush_interval초 단위로 묶어서 수행한다.
+    """
+
+    def __init__(self, path: str, batch_size: int = 50, flush_interval: float = 1.0,
+                 compact_every: int = 1000):
+        self.path = path
+        self.batch_size = batch_size  # 한 번에 커밋할 최대 변경 수
+        self.flush_interval = flush_interval  # 커밋 간격(초)
+        self.compact_every = compact_every  # 이 수만큼 삭제되면 파일 정리
+
+        # 연결은 GUI 스레드에서 만들고 이벤트 루프 스레드에서 사용
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")  # 커밋마다 fsync (커밋은 묶어서 수행)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " message_id TEXT UNIQUE NOT NULL,"
+            " action TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+
+        self.pending_changes = 0  # 커밋되지 않은 변경 수
+        self.last_flush = time.monotonic()
+        self.acked_since_compact = 0
+        self.in_transaction = False
+
+    def _begin(self):
+        """커밋 묶음 시작"""
+        if not self.in_transaction:
+            self.conn.execute("BEGIN")
+            self.in_transaction = True
+
+    def _changed(self):
+        """변경 수를 세고 기준을 넘으면 커밋"""
+        self.pending_changes += 1
+        if self.pending_changes >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def append(self, message: dict) -> bool:
+        """메시지 기록 (이미 기록된 messageId면 False)"""
+        # 미리 인코딩된 페이로드는 payload와 중복되므로 저장하지 않음
+        body = json.dumps({k: v for k, v in message.items() if k != "encoded_payload"}, ensure_ascii=False)
+        self._begin()
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO outbox (message_id, action, body, created) VALUES (?, ?, ?, ?)",
+            (message["messageId"], message.get("action", ""), body, time.time())
+        )
+        if cursor.rowcount == 0:
+            return False
+        self._changed()
+        return True
+
+    def ack(self, message_id: str):
+        """전송 완료된 메시지 삭제"""
+        self._begin()
+        cursor = self.conn.execute("DELETE FROM outbox WHERE message_id = ?", (message_id,))
+        if cursor.rowcount:
+            self.acked_since_compact += 1
+            self._changed()
+
+    def _commit(self):
+        """진행 중인 커밋 묶음 반영"""
+        if self.in_transaction:
+            self.conn.execute("COMMIT")
+            self.in_transaction = False
+        self.pending_changes = 0
+        self.last_flush = time.monotonic()
+
+    def flush(self):
+        """커밋되지 않은 변경을 디스크에 반영 (삭제가 충분히 쌓였으면 정리)"""
+        self._commit()
+        if self.acked_since_compact >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """삭제된 항목이 차지하던 공간 정리"""
+        self._commit()
+        self.conn.execute("PRAGMA incremental_vacuum")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.acked_since_compact = 0
+
+    def count(self) -> int:
+        """기록된 (미전송) 메시지 수"""
+        return self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def read_batch(self, after_seq: int = 0, limit: int = 100) -> List[tuple]:
+        """seq 순서로 메시지 일부 읽기 - [(seq, message), ...]"""
+        rows = self.conn.execute(
+            "SELECT seq, body FROM outbox WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after_seq, limit)
+        ).fetchall()
+        return [(seq, json.loads(body)) for seq, body in rows]
+
+    def close(self):
+        """커밋 후 닫기"""
+        try:
+            self._commit()
+        finally:
+            self.conn.close()
@@ -2,8 +2,16 @@
 OCPP 충전소 시뮬레이터 - 메시지 유틸리티
 """
 
+import json
 import uuid
 from datetime import datetime
+from json.encoder import encode_basestring
+from typing import Any, Dict
+
+try:
+    import orjson  # 선택 의존성: 설치되어 있으면 JSON 인코딩/디코딩에 사용
+except ImportError:
+    orjson = None
 
 def generate_message_id() -> str:
     """고유한 메시지 ID 생성"""
@@ -16,3 +24,57 @@ def generate_timestamp() -> str:
 def generate_transaction_id(transaction_num: int) -> str:
     """트랜잭션 ID 생성"""
     return f"tx-{transaction_num:03d}"
+
+if orjson is not None:
+    def encode_json(obj: Any) -> str:
+        """JSON 문자열 인코딩 (orjson 사용)"""
+        return orjson.dumps(obj).decode("utf-8")
+
+    decode_json = orjson.loads
+else:
+    # json.dumps는 옵션을 줄 때마다 인코더를 새로 만들므로 미리 만들어 둔 인코더를 재사용
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def encode_json(obj: Any) -> str:
+        """JSON 문자열 인코딩 (표준 json 사용)"""
+        return _encoder.encode(obj)
+
+    decode_json = json.loads
+
+def encode_call(message: dict) -> str:
+    """CALL 메시지를 [2, messageId, action, payload] 프레임 문자열로 인코딩
+
+    템플릿으로 만든 메시지는 미리 인코딩된 페이로드(encoded_payload)를 그대로 사용한다.
+    """
+    payload_json = message.get("encoded_payload")
+    if payload_json is None:
+        payload_json = encode_json(message["payload"])
+    return f'[{message["messageTypeId"]},{encode_basestring(message["messageId"])},{encode_basestring(message["action"])},{payload_json}]'
+
+class CallTemplate:
+    """고정 필드를 미리 인코딩해 둔 CALL 메시지 템플릿
+
+    EVSE나 트랜잭션마다 바뀌지 않는 필드(evse, idToken, transactionInfo 등)는 생성 시 한 번만
+    인코딩하고, build()에서는 가변 필드(seqNo, timestamp, meterValue 등)만 인코딩해 이어 붙인다.
+    """
+
+    def __init__(self, action: str, fixed: Dict[str, Any]):
+        self.action = action
+        self.fixed = fixed  # 고정 필드 (생성된 메시지들이 공유하므로 수정하지 않음)
+        self.prefix = encode_json(fixed)[:-1]  # 닫는 중괄호를 뺀 고정 부분 '{"k":v,...'
+        self.separator = "," if fixed else ""
+
+    def build(self, **fields) -> dict:
+        """가변 필드를 채운 메시지 생성"""
+        if fields:
+            # '{"k":v,...}'에서 여는 중괄호를 떼고 고정 부분 뒤에 붙임
+            payload_json = self.prefix + self.separator + encode_json(fields)[1:]
+        else:
+            payload_json = self.prefix + "}"
+        return {
+            "messageTypeId": 2,
+            "messageId": generate_message_id(),
+            "action": self.action,
+            "payload": {**self.fixed, **fields},
+            "encoded_payload": payload_json
+        }
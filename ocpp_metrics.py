@@ -0,0 +1,113 @@
+"""
+OCPP 충전소 시뮬레이터 - 통신 계측 (지연 히스토그램, 전송 카운터)
+"""
+
+import asyncio
+import json
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Any, Optional, Sequence
+
+# 지연 히스토그램 버킷 상한(초) - 마지막 버킷 이후는 초과 구간
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class LatencyHistogram:
+    """고정 버킷 지연 히스토그램 (관측값을 저장하지 않으므로 메모리 사용량 일정)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 버킷별 관측 수 (마지막은 초과 구간)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        """관측값 추가"""
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q(0~1) 분위수가 속한 버킷의 상한 (최대값을 넘지 않음)"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """요약 (관측 수, 평균/최대, p50/p90/p99 버킷 상한, 버킷별 관측 수)"""
+        labels = [f"le_{b:g}" for b in self.buckets] + ["inf"]
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+class CommMetrics:
+    """OcppComm 계측 값
+
+    액션별로 큐 대기 시간(send_message → 실제 전송)과 응답 지연(전송 → 응답)을
+    나누어 기록하므로 지연이 큐에서 생긴 것인지 서버에서 생긴 것인지 구분할 수 있다.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.queue_wait: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)  # 액션별 큐 대기 시간
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)  # 액션별 응답 지연
+        self.counters: Dict[str, int] = defaultdict(int)  # 전송/응답/재시도/타임아웃/연결 등 누적 횟수
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.loop_lag = LatencyHistogram()  # 이벤트 루프 지연 (monitor_loop_lag로 측정)
+
+    def count(self, name: str, n: int = 1):
+        """카운터 증가"""
+        self.counters[name] += n
+
+    def record_sent(self, action: str, queue_wait: Optional[float] = None):
+        """CALL 전송 기록 (queue_wait: 큐에 들어온 뒤 전송까지 걸린 시간)"""
+        self.counters["sent"] += 1
+        if queue_wait is not None:
+            self.queue_wait[action].observe(queue_wait)
+
+    def record_response(self, action: str, seconds: float, error: bool = False):
+        """응답 수신 기록 (CALLERROR면 error=True)"""
+        self.latency[action].observe(seconds)
+        self.counters["errors" if error else "acked"] += 1
+
+    def snapshot(self, **extra) -> Dict[str, Any]:
+        """현재 계측 값 (extra로 큐 깊이 등 호출 시점 상태 추가)"""
+        return {
+            "uptime": time.time() - self.started,
+            "counters": dict(self.counters),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency": {action: h.snapshot() for action, h in self.latency.items()},
+            "queue_wait": {action: h.snapshot() for action, h in self.queue_wait.items()},
+            "loop_lag": self.loop_lag.snapshot(),
+            **extra,
+        }
+
+    def dump(self, path: str, **extra):
+        """계측 값을 JSON 파일로 저장"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(**extra), f, ensure_ascii=False, indent=2)
+
+async def monitor_loop_lag(histogram: LatencyHistogram, interval: float = 0.1):
+    """이벤트 루프 지연 측정 (interval마다 깨어나 예정보다 늦어진 시간을 기록)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, loop.time() - expected))
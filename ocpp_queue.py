@@ -0,0 +1,284 @@
+"""
+OCPP 충전소 시뮬레이터 - 우선순위 송신 큐 및 재시도 스케줄러
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Dict, Any, Callable, Optional
+
+class MessageLane(IntEnum):
+    """송신 레인 (값이 작을수록 먼저 처리)"""
+    TRANSACTION = 0  # 트랜잭션/과금, 커넥터 상태 알림
+    STATUS = 1  # 부트 알림 등
+    TELEMETRY = 2  # 미터 값, 하트비트
+
+# 액션별 레인 매핑
+# TransactionEvent는 seqNo 순서를 지키기 위해 Updated도 트랜잭션 레인으로 보냄
+# StatusNotification도 같은 레인(FIFO)으로 보내야 같은 EVSE의 Occupied → Started, Ended → Available 순서가 유지됨
+ACTION_LANES = {
+    "TransactionEvent": MessageLane.TRANSACTION,
+    "Authorize": MessageLane.TRANSACTION,
+    "StatusNotification": MessageLane.TRANSACTION,
+    "BootNotification": MessageLane.STATUS,
+    "MeterValues": MessageLane.TELEMETRY,
+    "Heartbeat": MessageLane.TELEMETRY,
+}
+
+# 레인별 최대 대기 메시지 수
+DEFAULT_LANE_LIMITS = {
+    MessageLane.TRANSACTION: 500,
+    MessageLane.STATUS: 50,
+    MessageLane.TELEMETRY: 100,
+}
+
+MAX_COALESCED_SAMPLES = 60  # MeterValues를 합칠 때 보관할 최대 샘플 수 (오래된 샘플부터 버림)
+
+def classify_message(message: dict) -> MessageLane:
+    """메시지의 송신 레인 결정 (알 수 없는 액션은 상태 레인)"""
+    return ACTION_LANES.get(message.get("action"), MessageLane.STATUS)
+
+def coalesce_key(message: dict) -> Optional[tuple]:
+    """합칠 수 있는 메시지의 키 (같은 키의 메시지는 큐에 하나만 유지)
+
+    트랜잭션 레인과 저널에 기록된 메시지(messageId별로 저널에서 지워야 함)는 합치지 않는다.
+    """
+    if classify_message(message) == MessageLane.TRANSACTION or message.get("journaled"):
+        return None
+    return (message.get("action"), message.get("payload", {}).get("evseId"))
+
+def ordering_key(message: dict) -> Optional[tuple]:
+    """순서를 지켜야 하는 메시지의 키 (같은 키의 메시지는 앞 메시지가 끝난 뒤에 전송)
+
+    트랜잭션 레인의 메시지 중 EVSE가 정해진 것(TransactionEvent, StatusNotification)만 해당한다.
+    """
+    if classify_message(message) != MessageLane.TRANSACTION:
+        return None
+    payload = message.get("payload", {})
+    evse_id = payload.get("evseId", payload.get("evse", {}).get("id"))
+    return None if evse_id is None else ("evse", evse_id)
+
+def merge_messages(queued: dict, new: dict):
+    """큐에 있는 메시지에 같은 키의 새 메시지를 합침 (queued를 직접 수정)
+
+    합쳐져 사라지는 messageId는 남는 메시지의 "merged_ids"에 기록하여, 남은 메시지가 응답을
+    받으면 그 messageId로 응답을 기다리던 호출자도 함께 완료되도록 한다.
+    """
+    action = new.get("action")
+    merged_ids = [*queued.get("merged_ids", ()), *new.get("merged_ids", ())]
+    if action == "MeterValues":
+        # 샘플은 버리지 않고 시간 순으로 이어 붙임
+        merged = queued["payload"]["meterValue"] + new["payload"]["meterValue"]
+        merged.sort(key=lambda meter_value: meter_value["timestamp"])
+        queued["payload"] = {**queued["payload"], "meterValue": merged[-MAX_COALESCED_SAMPLES:]}
+        queued.pop("encoded_payload", None)  # 페이로드가 바뀌었으므로 다시 인코딩
+        merged_ids.append(new["messageId"])
+    elif action == "Heartbeat":
+        # 하트비트는 하나만 보내면 충분
+        merged_ids.append(new["messageId"])
+    else:
+        # 상태성 메시지는 최신 메시지로 교체 (큐에서의 순서는 유지)
+        merged_ids.append(queued["messageId"])
+        queued.clear()
+        queued.update(new)
+    queued["merged_ids"] = merged_ids
+
+class PriorityMessageQueue:
+    """레인별 우선순위 송신 큐
+
+    높은 우선순위 레인부터 꺼내되, 하위 레인의 맨 앞 메시지가
+    starvation_timeout 이상 기다렸다면 그 메시지를 먼저 꺼내 기아를 방지한다.
+
+    레인마다 최대 크기가 있으며, 상태/텔레메트리 레인은 같은 EVSE의 같은 액션을
+    하나로 합치고 가득 차면 가장 오래된 메시지를 버린다. 합칠 수 없는 메시지(트랜잭션,
+    저널 기록분)는 버리지 않고 put()이 빈 자리가 생길 때까지 기다린다.
+    """
+
+    def __init__(self, starvation_timeout: float = 5.0, lane_limits: Optional[Dict[MessageLane, int]] = None):
+        self.starvation_timeout = starvation_timeout  # 하위 레인 최대 대기 시간(초)
+        self.lane_limits = {**DEFAULT_LANE_LIMITS, **(lane_limits or {})}  # 레인별 최대 크기
+        self.lanes = {lane: deque() for lane in MessageLane}  # 레인별 (등록 시각, 메시지)
+        self.coalesce_index: Dict[tuple, dict] = {}  # 합칠 키 -> 큐에 있는 메시지
+        self.stats = {
+            lane: {"enqueued": 0, "dequeued": 0, "max_depth": 0, "promoted": 0, "coalesced": 0, "dropped": 0}
+            for lane in MessageLane
+        }
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+
+    def qsize(self) -> int:
+        """전체 대기 메시지 수"""
+        return sum(len(queue) for queue in self.lanes.values())
+
+    def empty(self) -> bool:
+        """큐가 비었는지 확인"""
+        return self.qsize() == 0
+
+    def is_full(self, message: dict) -> bool:
+        """메시지가 들어갈 레인이 가득 찼는지 확인"""
+        lane = classify_message(message)
+        return len(self.lanes[lane]) >= self.lane_limits[lane]
+
+    def fill_ratio(self) -> float:
+        """가장 많이 찬 레인의 사용률 (0.0 ~ 1.0 이상)"""
+        return max(len(self.lanes[lane]) / self.lane_limits[lane] for lane in MessageLane)
+
+    def put_nowait(self, message: dict, force: bool = False):
+        """메시지를 해당 레인에 추가
+
+        합칠 수 없는 메시지의 레인이 가득 차면 asyncio.QueueFull을 발생시킨다 (force=True면 한도를 무시).
+        """
+        lane = classify_message(message)
+        queue = self.lanes[lane]
+        stats = self.stats[lane]
+
+        # 같은 키의 메시지가 이미 있으면 합침
+        key = coalesce_key(message)
+        if key is not None:
+            queued = self.coalesce_index.get(key)
+            if queued is not None:
+                merge_messages(queued, message)
+                stats["coalesced"] += 1
+                return
+
+        if len(queue) >= self.lane_limits[lane] and not force:
+            if key is None:
+                raise asyncio.QueueFull
+            # 상태/텔레메트리 레인은 가장 오래된 메시지를 버리고 최신 메시지를 보관
+            idx = next((i for i, (_, queued) in enumerate(queue) if coalesce_key(queued) is not None), None)
+            if idx is None:
+                raise asyncio.QueueFull
+            _, dropped = queue[idx]
+            del queue[idx]
+            self._forget(dropped)
+            stats["dropped"] += 1
+
+        queue.append((time.monotonic(), message))
+        if key is not None:
+            self.coalesce_index[key] = message
+
+        stats["enqueued"] += 1
+        stats["max_depth"] = max(stats["max_depth"], len(queue))
+        self._not_empty.set()
+
+    async def put(self, message: dict):
+        """메시지 추가 (합칠 수 없는 메시지의 레인이 가득 차면 빈 자리가 생길 때까지 대기)"""
+        while True:
+            try:
+                self.put_nowait(message)
+                return
+            except asyncio.QueueFull:
+                self._not_full.clear()
+                await self._not_full.wait()
+
+    def _forget(self, message: dict):
+        """큐에서 빠진 메시지를 합치기 대상에서 제거"""
+        key = coalesce_key(message)
+        if key is not None and self.coalesce_index.get(key) is message:
+            del self.coalesce_index[key]
+
+    def get_nowait(self) -> dict:
+        """다음에 보낼 메시지 꺼내기 (비어 있으면 IndexError)"""
+        candidates = [lane for lane in MessageLane if self.lanes[lane]]
+        if not candidates:
+            raise IndexError("빈 큐")
+
+        lane = candidates[0]
+
+        # 기아 방지: 기준 시간 이상 기다린 하위 레인 메시지 중 가장 오래된 것을 먼저 처리
+        now = time.monotonic()
+        starved = [l for l in candidates[1:] if now - self.lanes[l][0][0] >= self.starvation_timeout]
+        if starved:
+            lane = min(starved, key=lambda l: self.lanes[l][0][0])
+            self.stats[lane]["promoted"] += 1
+
+        _, message = self.lanes[lane].popleft()
+        self._forget(message)
+        self.stats[lane]["dequeued"] += 1
+        self._not_full.set()
+        return message
+
+    async def get(self) -> dict:
+        """메시지가 들어올 때까지 기다렸다가 꺼내기"""
+        while self.empty():
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def lane_depths(self) -> Dict[str, int]:
+        """레인별 현재 대기 메시지 수"""
+        return {lane.name: len(queue) for lane, queue in self.lanes.items()}
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """레인별 통계 (현재 깊이, 누적 추가/처리 수, 최대 깊이, 기아 방지로 먼저 처리된 수, 합친 수, 버린 수)"""
+        return {
+            lane.name: {"depth": len(self.lanes[lane]), **self.stats[lane]}
+            for lane in MessageLane
+        }
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """지수 백오프 + 지터 (attempt는 1부터 시작)"""
+    delay = min(max_delay, base_delay * (2 ** min(attempt - 1, 32)))  # 재시도가 길어져도 지수가 넘치지 않도록 제한
+    # 지연의 절반은 고정, 나머지 절반은 무작위로 분산 (동시 재시도 방지)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class RetryScheduler:
+    """재시도 지연 스케줄러
+
+    재전송할 메시지를 만료 시각 기준 힙에 보관하고, 만료된 메시지만 on_due로 넘긴다.
+    대기 중인 메시지가 송신 큐를 막지 않으므로 다른 메시지는 계속 전송된다.
+    """
+
+    def __init__(self, on_due: Callable[[dict], None], base_delay: float = 2.0,
+                 max_delay: float = 60.0):
+        self.on_due = on_due  # 만료된 메시지를 넘겨받을 콜백
+        self.base_delay = base_delay  # 첫 재시도 지연(초)
+        self.max_delay = max_delay  # 최대 재시도 지연(초)
+        self.heap = []  # (만료 시각, 순번, 메시지)
+        self.counter = itertools.count()
+        self.task = None
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def backoff(self, attempt: int) -> float:
+        """attempt번째 재시도까지의 지연(초)"""
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+    def schedule(self, message: dict, delay: float):
+        """delay초 뒤에 message 재시도 예약"""
+        heapq.heappush(self.heap, (time.monotonic() + delay, next(self.counter), message))
+        self._wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """만료된 메시지를 꺼내 on_due로 전달"""
+        try:
+            while self.heap:
+                now = time.monotonic()
+                while self.heap and self.heap[0][0] <= now:
+                    _, _, message = heapq.heappop(self.heap)
+                    self.on_due(message)
+                if not self.heap:
+                    break
+
+                # 가장 빠른 만료 시각까지 대기 (더 빠른 메시지가 추가되면 즉시 깨어남)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.heap[0][0] - now)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            pass
+
+    def cancel(self):
+        """예약된 재시도 모두 취소"""
+        if self.task and not self.task.done():
+            self.task.cancel()
+        self.heap.clear()
@@ -0,0 +1,196 @@
+"""
+OCPP 충전소 시뮬레이터 - 아두이노 전력 제어 명령 채널
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from ocpp_metrics import LatencyHistogram
+from serial_link import PowerAck, encode_power_command
+
+class _InFlight(NamedTuple):
+    """응답을 기다리는 명령"""
+    changes: Dict[int, bool]  # 포트별 목표 상태
+    sent_at: float
+    attempt: int
+    timer: asyncio.TimerHandle
+
+class PowerCommandChannel:
+    """순번과 응답 확인이 있는 전력 제어 명령 채널 (이벤트 루프 스레드에서만 사용)
+
+    같은 이벤트 루프 반복 안에서 요청된 포트 변경은 'S,순번,포트,상태,...' 명령 한 줄로
+    묶어 보낸다. 아두이노는 처리 후 전체 릴레이 상태를 담은 응답(PowerAck)을 보내며,
+    요청한 상태가 응답에 반영되어야 set()의 결과가 True가 된다. 응답이 ack_timeout 안에
+    오지 않으면 다시 보내고, max_attempts번 모두 실패하면 False가 된다.
+    응답을 한 번도 받지 못한 채 시간이 초과되면 응답을 지원하지 않는 펌웨어로 보고
+    기존 'P,포트,상태' 명령으로 전환한다 (이후로는 전환을 확인하지 않고 True).
+    """
+
+    def __init__(self, write: Callable[[bytes], object], ack_timeout: float = 0.5, max_attempts: int = 3,
+                 require_ack: bool = True, log: Callable[[str], None] = print):
+        self.write = write  # 시리얼 쓰기 함수
+        self.ack_timeout = ack_timeout
+        self.max_attempts = max_attempts
+        self.ack_mode = require_ack  # False면 기존 'P,포트,상태' 명령 (응답 확인 없음)
+        self.log = log
+        self.seq = 0
+        self.pending: Dict[int, bool] = {}  # 아직 보내지 않은 포트별 목표 상태
+        self.flush_handle = None
+        self.in_flight: Dict[int, _InFlight] = {}  # 순번 -> 응답을 기다리는 명령
+        self.waiters: Dict[int, List[Tuple[bool, asyncio.Future]]] = defaultdict(list)  # 포트 -> (목표 상태, 결과)
+        self.confirmed: Dict[int, bool] = {}  # 응답으로 확인된 포트별 릴레이 상태
+        self.ack_latency = LatencyHistogram()  # 명령 전송 -> 응답 처리
+        self.counters: Dict[str, int] = defaultdict(int)  # requests/coalesced/frames/acks/retries/timeouts/failed
+
+    def set(self, port: int, enable: bool) -> asyncio.Future:
+        """포트 전력 공급/차단 요청 (결과: 확인되면 True, 실패하거나 새 요청으로 대체되면 False)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # 같은 포트의 반대 상태 요청은 이 요청으로 대체됨
+        self._resolve(port, not enable, False)
+        self.waiters[port].append((enable, future))
+        if port in self.pending:
+            self.counters["coalesced"] += 1
+        self.pending[port] = enable
+        self.counters["requests"] += 1
+        if self.flush_handle is None:
+            # 지연 없이 이번 루프 반복에서 들어온 요청만 묶음
+            self.flush_handle = loop.call_soon(self.flush)
+        return future
+
+    def flush(self):
+        """모아 둔 포트 변경을 명령 한 줄로 전송"""
+        self.flush_handle = None
+        if not self.pending:
+            return
+        changes, self.pending = self.pending, {}
+        if self.ack_mode:
+            self._send(changes, 1)
+            return
+
+        try:
+            self.write(b"".join(f"P,{port},{1 if enable else 0}\n".encode("ascii") for port, enable in changes.items()))
+            self.counters["frames"] += 1
+            result = True
+        except Exception as e:
+            self.log(f"전력 제어 명령 전송 오류: {e}")
+            result = False
+        for port, enable in changes.items():
+            self._resolve(port, enable, result)
+
+    def _send(self, changes: Dict[int, bool], attempt: int):
+        """순번을 붙여 명령 전송 후 응답 대기 시작"""
+        seq = self.seq
+        self.seq = (seq + 1) & 0xFF
+        try:
+            self.write(encode_power_command(seq, changes))
+        except Exception as e:
+            self.log(f"전력 제어 명령 전송 오류: {e}")
+            for port, enable in changes.items():
+                self._resolve(port, enable, False)
+            return
+        self.counters["frames"] += 1
+        timer = asyncio.get_running_loop().call_later(self.ack_timeout, self._on_timeout, seq)
+        self.in_flight[seq] = _InFlight(changes, time.monotonic(), attempt, timer)
+
+    def handle_ack(self, ack: PowerAck):
+        """아두이노 응답 처리 (SerialReader의 on_ack 콜백)"""
+        self.counters["acks"] += 1
+        entry = self.in_flight.pop(ack.seq, None)
+        if entry is not None:
+            entry.timer.cancel()
+            self.ack_latency.observe(time.monotonic() - entry.sent_at)
+
+        # 응답은 전체 릴레이 상태이므로 이 명령과 상관없이 기다리던 요청도 확인됨
+        for port in list(self.waiters):
+            actual = bool(ack.relay_mask >> (port - 1) & 1)
+            self.confirmed[port] = actual
+            self._resolve(port, actual, True)
+
+        if entry is not None:
+            # 명령을 받았는데 전환되지 않은 포트 (뒤에 보낸 명령이 아직 없으면 실패)
+            for port, enable in entry.changes.items():
+                if self.confirmed.get(port) != enable and not self._outstanding(port):
+                    self._resolve(port, enable, False)
+
+    def _on_timeout(self, seq: int):
+        """응답 시간 초과 - 재전송, 실패 처리 또는 기존 명령 형식으로 전환"""
+        entry = self.in_flight.pop(seq, None)
+        if entry is None:
+            return
+        self.counters["timeouts"] += 1
+
+        if self.counters["acks"] == 0:
+            self.log("전력 제어 응답이 없어 기존 명령 형식(P,포트,상태)으로 전환합니다.")
+            self.ack_mode = False
+            for other in self.in_flight.values():
+                other.timer.cancel()
+            entries = [entry] + list(self.in_flight.values())
+            self.in_flight.clear()
+            pending = {}
+            for item in entries:
+                pending.update(item.changes)
+            pending.update(self.pending)
+            self.pending = pending
+            self.flush()
+            return
+
+        # 아직 같은 상태를 기다리는 포트만 다시 보냄
+        changes = {port: enable for port, enable in entry.changes.items()
+                   if any(want == enable for want, _ in self.waiters.get(port, ()))}
+        if not changes:
+            return
+        if entry.attempt < self.max_attempts:
+            self.counters["retries"] += 1
+            self._send(changes, entry.attempt + 1)
+        else:
+            self.counters["failed"] += 1
+            for port, enable in changes.items():
+                self._resolve(port, enable, False)
+
+    def _outstanding(self, port: int) -> bool:
+        """포트에 대해 보내지 않았거나 응답을 기다리는 명령이 있는지 확인"""
+        return port in self.pending or any(port in entry.changes for entry in self.in_flight.values())
+
+    def _resolve(self, port: int, enable: bool, result: bool):
+        """포트의 enable 상태를 기다리는 요청에 결과 전달"""
+        waiters = self.waiters.get(port)
+        if not waiters:
+            return
+        remaining = []
+        for want, future in waiters:
+            if want != enable:
+                remaining.append((want, future))
+            elif not future.done():
+                future.set_result(result)
+        if remaining:
+            self.waiters[port] = remaining
+        else:
+            del self.waiters[port]
+
+    def stats(self) -> Dict[str, object]:
+        """명령 통계 (요청/전송/응답/재전송/실패 수, 응답 지연, 확인된 릴레이 상태)"""
+        return {
+            "ack_mode": self.ack_mode,
+            **self.counters,
+            "in_flight": len(self.in_flight),
+            "ack_latency": self.ack_latency.snapshot(),
+            "confirmed": {str(port): state for port, state in sorted(self.confirmed.items())},
+        }
+
+    def close(self):
+        """대기 중인 명령을 모두 실패 처리"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        for entry in self.in_flight.values():
+            entry.timer.cancel()
+        self.in_flight.clear()
+        self.pending.clear()
+        for waiters in self.waiters.values():
+            for _, future in waiters:
+                if not future.done():
+                    future.set_result(False)
+        self.waiters.clear()
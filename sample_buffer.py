@@ -0,0 +1,128 @@
+"""
+OCPP 충전소 시뮬레이터 - 측정값 시계열 링 버퍼
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import List, NamedTuple, Optional, Tuple
+
+SAMPLE_FIELDS = ("timestamp", "voltage", "current", "power")  # 샘플 필드 (timestamp는 time.monotonic)
+
+class WindowSummary(NamedTuple):
+    """시간 구간의 측정값 요약 (충전 세션 분석용)"""
+    count: int  # 샘플 수
+    duration: float  # 첫 샘플부터 마지막 샘플까지(초)
+    avg_power: float  # 시간 가중 평균 전력(W)
+    peak_power: float  # 최대 전력(W)
+    energy_wh: float  # 샘플을 사다리꼴 공식으로 적분한 에너지(Wh)
+
+class SampleRing:
+    """고정 용량 측정값 링 버퍼 (EVSE 1개분)
+
+    필드별로 array('d') 하나에 값을 연속 저장하므로 샘플당 파이썬 객체가 생기지 않는다.
+    추가는 O(1)이고, 가득 차면 가장 오래된 샘플을 덮어쓴다. view()는 복사 없이
+    memoryview 구간(최대 2개)을 돌려주며 numpy.frombuffer로 그대로 감쌀 수 있다.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.columns = {field: array("d", bytes(8 * capacity)) for field in SAMPLE_FIELDS}
+        self.head = 0  # 다음에 쓸 위치
+        self.size = 0  # 저장된 샘플 수
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, timestamp: float, voltage: float, current: float, power: float):
+        """샘플 추가 (가득 차면 가장 오래된 샘플을 덮어씀)"""
+        head = self.head
+        columns = self.columns
+        columns["timestamp"][head] = timestamp
+        columns["voltage"][head] = voltage
+        columns["current"][head] = current
+        columns["power"][head] = power
+        self.head = (head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def latest(self) -> Optional[Tuple[float, float, float, float]]:
+        """가장 최근 샘플 (timestamp, voltage, current, power)"""
+        if self.size == 0:
+            return None
+        idx = self.head - 1
+        return tuple(self.columns[field][idx] for field in SAMPLE_FIELDS)
+
+    def segments(self, count: Optional[int] = None) -> List[Tuple[int, int]]:
+        """최근 count개 샘플의 저장 구간 [(시작, 끝), ...] (오래된 것부터, 최대 2개)"""
+        count = self.size if count is None else max(0, min(count, self.size))
+        if count == 0:
+            return []
+        start = (self.head - count) % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            return [(start, end)]
+        return [(start, self.capacity), (0, end - self.capacity)]
+
+    def view(self, field: str, count: Optional[int] = None) -> List[memoryview]:
+        """최근 count개 샘플의 필드 값 (복사 없는 memoryview 구간 목록, 오래된 것부터)"""
+        buffer = memoryview(self.columns[field])
+        return [buffer[start:end] for start, end in self.segments(count)]
+
+    def values(self, field: str, count: Optional[int] = None) -> array:
+        """최근 count개 샘플의 필드 값 (시간 순으로 이어 붙인 사본)"""
+        result = array("d")
+        for segment in self.view(field, count):
+            result.frombytes(segment.tobytes())
+        return result
+
+    def count_since(self, timestamp: float) -> int:
+        """timestamp 이후(포함)에 추가된 샘플 수 (window 크기 계산용, 이진 탐색)"""
+        times = self.columns["timestamp"]
+        count = 0
+        # 구간은 오래된 것부터이므로 뒤 구간부터 확인
+        for start, end in reversed(self.segments()):
+            idx = bisect_left(times, timestamp, start, end)
+            count += end - idx
+            if idx > start:
+                break
+        return count
+
+class StationHistory:
+    """EVSE별 측정값 링 버퍼 모음 (evse_id는 1부터)"""
+
+    def __init__(self, num_evse: int, capacity: int):
+        self.rings = [SampleRing(capacity) for _ in range(num_evse)]
+
+    def __getitem__(self, evse_id: int) -> SampleRing:
+        return self.rings[evse_id - 1]
+
+    def append(self, evse_id: int, timestamp: float, voltage: float, current: float, power: float):
+        """EVSE 샘플 추가"""
+        self.rings[evse_id - 1].append(timestamp, voltage, current, power)
+
+    def window(self, evse_id: int, field: str, seconds: float, now: float) -> List[memoryview]:
+        """최근 seconds초 동안의 필드 값 (복사 없는 memoryview 구간 목록)"""
+        ring = self.rings[evse_id - 1]
+        return ring.view(field, ring.count_since(now - seconds))
+
+    def summary(self, evse_id: int, since: float) -> Optional[WindowSummary]:
+        """since 이후 샘플의 요약 (window 구간을 복사 없이 순회, 샘플이 없으면 None)"""
+        ring = self.rings[evse_id - 1]
+        count = ring.count_since(since)
+        if count == 0:
+            return None
+        energy = 0.0
+        peak = float("-inf")
+        first = prev_time = prev_power = None
+        for times, powers in zip(ring.view("timestamp", count), ring.view("power", count)):
+            for timestamp, power in zip(times, powers):
+                if prev_time is None:
+                    first = timestamp
+                else:
+                    energy += (prev_power + power) / 2 * (timestamp - prev_time)
+                if power > peak:
+                    peak = power
+                prev_time, prev_power = timestamp, power
+        duration = prev_time - first
+        avg_power = energy / duration if duration > 0 else prev_power
+        return WindowSummary(count, duration, avg_power, peak, energy / 3600)
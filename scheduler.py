@@ -0,0 +1,114 @@
+"""
+OCPP 충전소 시뮬레이터 - 예정 작업 스케줄러 (단조 시계 기반 힙)
+"""
+
+import heapq
+import inspect
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+class _Timer:
+    """예약 한 건 (힙 항목, 취소되거나 실행되면 key가 None)"""
+    __slots__ = ("when", "seq", "key", "callback", "args")
+
+    def __init__(self, when: float, seq: int, key: Hashable, callback: Optional[Callable], args: tuple):
+        self.when = when
+        self.seq = seq
+        self.key = key
+        self.callback = callback
+        self.args = args
+
+    def __lt__(self, other: "_Timer") -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+class TimerScheduler:
+    """키별 예정 작업 스케줄러 (이벤트 루프 스레드에서만 사용)
+
+    미터 샘플 구간, 하트비트, 응답 기한, 디바운스 구간처럼 주기적이거나 기한이 있는 작업을
+    키 하나당 하나씩 예약한다. 같은 키로 다시 예약하면 이전 예약은 힙에서 바로 빼지 않고
+    무효로 표시만 하므로 예약/취소는 O(log n)이다. 시각은 time.monotonic 기준이라 시스템
+    시계가 바뀌어도(NTP 보정 등) 간격이 틀어지지 않는다. 호출하는 쪽은 next_delay()만큼
+    기다렸다가 run_due()를 부르면 되며, 그 사이에 폴링하지 않는다.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, notify: Optional[Callable[[], None]] = None):
+        self.clock = clock
+        self.notify = notify  # 가장 가까운 예약이 앞당겨지면 호출 (기다리는 쪽을 깨워 대기 시간을 다시 계산)
+        self.heap: List[_Timer] = []
+        self.timers: Dict[Hashable, _Timer] = {}  # 키 -> 유효한 예약
+        self.seq = 0  # 같은 시각 예약의 순서 유지용
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.timers
+
+    def schedule(self, key: Hashable, delay: float, callback: Optional[Callable] = None, *args: Any):
+        """delay초 뒤에 callback(*args) 실행 예약 (같은 키의 이전 예약은 대체, callback이 None이면 깨우기만)"""
+        self.schedule_at(key, self.clock() + delay, callback, *args)
+
+    def schedule_at(self, key: Hashable, when: float, callback: Optional[Callable] = None, *args: Any):
+        """clock() 기준 when 시각에 실행 예약 (같은 키의 이전 예약은 대체)"""
+        self.cancel(key)
+        timer = _Timer(when, self.seq, key, callback, args)
+        self.seq += 1
+        self.timers[key] = timer
+        heapq.heappush(self.heap, timer)
+        if len(self.heap) > 2 * len(self.timers) + 64:
+            # 무효가 된 항목이 쌓이면 한 번에 정리
+            self.heap = list(self.timers.values())
+            heapq.heapify(self.heap)
+        if self.notify is not None and self.heap[0] is timer:
+            self.notify()
+
+    def cancel(self, key: Hashable) -> bool:
+        """예약 취소 (예약이 있었으면 True)"""
+        timer = self.timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.callback = None
+        timer.key = None
+        return True
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        """예약된 시각 (clock() 기준, 없으면 None)"""
+        timer = self.timers.get(key)
+        return timer.when if timer is not None else None
+
+    def next_delay(self) -> Optional[float]:
+        """가장 가까운 예약까지 남은 시간(초, 0 이상, 예약이 없으면 None)"""
+        heap = self.heap
+        while heap and heap[0].key is None:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return max(0.0, heap[0].when - self.clock())
+
+    async def run_due(self) -> int:
+        """시각이 된 예약을 시각 순서대로 실행 (코루틴이면 완료까지 대기, 실행한 수 반환)
+
+        실행 중에 같은 키로 다시 예약할 수 있다 (주기 작업). 실행 중 새로 예약된 작업은
+        이미 시각이 지났더라도 다음 호출에서 실행된다.
+        """
+        now = self.clock()
+        due = []
+        heap = self.heap
+        while heap and heap[0].when <= now:
+            timer = heapq.heappop(heap)
+            if timer.key is not None:
+                due.append(timer)
+
+        ran = 0
+        for timer in due:
+            if timer.key is None:
+                continue  # 앞선 작업이 취소하거나 다시 예약함
+            del self.timers[timer.key]
+            timer.key = None
+            ran += 1
+            if timer.callback is None:
+                continue
+            result = timer.callback(*timer.args)
+            if inspect.isawaitable(result):
+                await result
+        return ran
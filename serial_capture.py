@@ -0,0 +1,144 @@
+"""
+OCPP 충전소 시뮬레이터 - 시리얼 바이트 캡처 및 재생
+
+캡처 파일 형식
+- 헤더: MAGIC(8) | 캡처 시작 시각(float64, epoch)
+- 레코드: 시작 후 경과 시간(float64, 초) | 길이(uint32) | 수신 바이트
+"""
+
+import struct
+import time
+from typing import Iterator, List, Optional, Tuple
+
+CAPTURE_MAGIC = b"SERCAP1\0"
+CAPTURE_HEADER = struct.Struct("<8sd")
+CAPTURE_RECORD = struct.Struct("<dI")
+REPLAY_PREFIX = "replay:"  # 시리얼 포트 대신 "replay:<파일>[,<배속>]"을 지정하면 캡처 파일 재생 (배속 0은 최대 속도)
+
+class CaptureWriter:
+    """수신한 원본 바이트를 시각과 함께 파일에 기록 (수신 스레드에서만 사용)"""
+
+    def __init__(self, path: str, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.file = open(path, "wb")
+        self.file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, time.time()))
+        self.start = clock()
+        self.bytes_written = 0
+
+    def write(self, data: bytes, timestamp: Optional[float] = None):
+        """수신 바이트 기록 (timestamp는 clock 기준 수신 시각)"""
+        if timestamp is None:
+            timestamp = self.clock()
+        self.file.write(CAPTURE_RECORD.pack(timestamp - self.start, len(data)))
+        self.file.write(data)
+        self.bytes_written += len(data)
+
+    def close(self):
+        """파일 닫기"""
+        self.file.close()
+
+def read_capture(path: str) -> Tuple[float, Iterator[Tuple[float, bytes]]]:
+    """캡처 파일 열기 - (캡처 시작 시각, (경과 시간, 바이트) 반복자)"""
+    f = open(path, "rb")
+    header = f.read(CAPTURE_HEADER.size)
+    if len(header) < CAPTURE_HEADER.size:
+        f.close()
+        raise ValueError(f"캡처 파일이 아님: {path}")
+    magic, started = CAPTURE_HEADER.unpack(header)
+    if magic != CAPTURE_MAGIC:
+        f.close()
+        raise ValueError(f"캡처 파일이 아님: {path}")
+
+    def records():
+        with f:
+            while True:
+                head = f.read(CAPTURE_RECORD.size)
+                if len(head) < CAPTURE_RECORD.size:
+                    return
+                offset, length = CAPTURE_RECORD.unpack(head)
+                data = f.read(length)
+                if len(data) < length:
+                    return
+                yield offset, data
+
+    return started, records()
+
+class ReplaySerial:
+    """캡처 파일을 재생하는 pyserial 대용 데이터 원본
+
+    SerialReader의 연결로 그대로 쓸 수 있다. speed배 빠르기로 바이트를 내보내며
+    (0이면 기다리지 않음), 재생 시계 now()는 배속과 상관없이 캡처 당시의 시간 간격을
+    따르므로 에너지 적산 등은 실제 수신과 같은 결과를 낸다. 수신 시각 기록과 수신 끊김
+    판단에 모두 now()를 써야 배속 재생에서도 끊김 판단이 맞다. 캡처가 끝나면 read()가
+    EOFError를 발생시킨다. 전력 제어 등 쓰기 명령은 written에 기록만 한다.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, timeout: float = 1.0):
+        self.path = path
+        self.speed = speed  # 재생 배속 (0이면 최대 속도)
+        self.timeout = timeout  # read()가 다음 데이터를 기다리는 최대 시간(초)
+        self.started, self.records = read_capture(path)
+        self.base = time.monotonic()  # 재생 시작 시각
+        self.pending = b""  # 읽고 남은 바이트
+        self.pending_offset = 0.0
+        self.next_record: Optional[Tuple[float, bytes]] = next(self.records, None)
+        self.offset = 0.0  # 마지막으로 내보낸 데이터의 캡처 경과 시간
+        self.written: List[bytes] = []
+        self.is_open = True
+
+    @classmethod
+    def from_port(cls, port: str) -> "ReplaySerial":
+        """"replay:<파일>[,<배속>]" 형식의 포트 이름으로 생성"""
+        path, _, speed = port[len(REPLAY_PREFIX):].partition(",")
+        return cls(path, float(speed) if speed else 1.0)
+
+    def now(self) -> float:
+        """재생 시계 (time.monotonic 기준, 캡처 당시의 시간 간격 유지)
+
+        배속 재생 중에는 다음 데이터를 기다리는 동안에도 배속에 맞춰 흐르고, 최대 속도
+        재생에서는 마지막으로 내보낸 데이터의 캡처 시각을 따른다.
+        """
+        if self.speed <= 0:
+            return self.base + self.offset
+        return self.base + max(self.offset, (time.monotonic() - self.base) * self.speed)
+
+    def _due_in(self) -> float:
+        """다음 레코드를 내보낼 때까지 남은 시간(초)"""
+        if self.speed <= 0:
+            return 0.0
+        return self.base + self.next_record[0] / self.speed - time.monotonic()
+
+    @property
+    def in_waiting(self) -> int:
+        if self.pending:
+            return len(self.pending)
+        if self.next_record is not None and self._due_in() <= 0:
+            return len(self.next_record[1])
+        return 0
+
+    def read(self, size: int = 1) -> bytes:
+        """최대 size바이트 읽기 (다음 데이터까지 최대 timeout초 대기, 재생이 끝나면 EOFError)"""
+        if not self.pending:
+            if self.next_record is None:
+                raise EOFError(f"캡처 재생 완료: {self.path}")
+            wait = self._due_in()
+            if wait > 0:
+                time.sleep(min(wait, self.timeout))
+                if wait > self.timeout:
+                    return b""
+            self.pending_offset, self.pending = self.next_record
+            self.next_record = next(self.records, None)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        self.offset = self.pending_offset
+        return data
+
+    def write(self, data: bytes) -> int:
+        """쓰기 명령 기록"""
+        self.written.append(bytes(data))
+        return len(data)
+
+    def close(self):
+        """재생 종료"""
+        self.is_open = False
+        self.records.close()
@@ -0,0 +1,318 @@
+"""
+OCPP 충전소 시뮬레이터 - 아두이노 시리얼 프레임 처리
+
+지원하는 프레임 형식 (수신 측에서 자동 판별)
+- ASCII: '!v1 i1 v2 i2 ...@'
+- 바이너리: SYNC(2) | 길이(1) | 순번(1) | 값(float32 LE x N) | CRC-16/CCITT(2, LE)
+  CRC는 길이부터 값까지를 대상으로 하며, 값의 순서는 ASCII 형식과 같다.
+- 전력 제어 응답: ACK_SYNC(2) | 순번(1) | 릴레이 상태 비트(uint32 LE, 포트 1이 최하위) | CRC-16/CCITT(2, LE)
+  'S,순번,포트,상태[,포트,상태...]' 명령을 처리한 뒤 보내며, 두 프레임 형식 어느 쪽과도 섞여 올 수 있다.
+"""
+
+import asyncio
+import binascii
+import struct
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+FRAME_START = ord("!")  # ASCII 프레임 시작 문자
+FRAME_END = ord("@")  # ASCII 프레임 끝 문자
+FRAME_CHARS = b"0123456789. "  # ASCII 프레임 본문에서 인정하는 문자 (나머지 출력 가능 문자는 무시)
+NON_FRAME_CHARS = bytes(b for b in range(256) if b not in FRAME_CHARS)
+TEXT_CHARS = bytes(range(0x20, 0x7F)) + b"\t\r\n"  # ASCII 프레임에 나올 수 있는 문자
+MAX_FRAME_LENGTH = 1024  # 끝 문자 없이 이보다 길어지면 잡음으로 보고 버림 (EVSE 31개의 ASCII 프레임이 들어가는 길이)
+
+BINARY_SYNC = b"\xa5\x5a"  # 바이너리 프레임 시작 표시
+BINARY_HEADER = struct.Struct("<2sBB")  # SYNC, 값 영역 길이(바이트), 순번
+BINARY_CRC = struct.Struct("<H")
+MAX_BINARY_VALUES = 255 // 4  # 바이너리 프레임 하나에 담을 수 있는 값 수 (EVSE당 2개)
+ACK_SYNC = b"\xa5\x5b"  # 전력 제어 응답 시작 표시
+POWER_ACK = struct.Struct("<2sBI")  # ACK_SYNC, 순번, 릴레이 상태 비트
+BINARY_MODE_COMMAND = b"F,1\n"  # 아두이노에 바이너리 프레임 전송을 요청하는 명령 (모르는 펌웨어는 무시)
+
+_value_structs: Dict[int, struct.Struct] = {}
+
+def _values_struct(count: int) -> struct.Struct:
+    """값 count개를 읽는 Struct (개수별로 재사용)"""
+    fmt = _value_structs.get(count)
+    if fmt is None:
+        fmt = _value_structs[count] = struct.Struct(f"<{count}f")
+    return fmt
+
+def crc16(data) -> int:
+    """CRC-16/CCITT-FALSE (초기값 0xFFFF)"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+def encode_binary_frame(seq: int, values: List[float]) -> bytes:
+    """바이너리 프레임 생성 (아두이노 펌웨어/에뮬레이터와 같은 형식)"""
+    body = struct.pack("<BB", len(values) * 4, seq & 0xFF) + _values_struct(len(values)).pack(*values)
+    return BINARY_SYNC + body + BINARY_CRC.pack(crc16(body))
+
+def encode_power_command(seq: int, changes: Dict[int, bool]) -> bytes:
+    """여러 포트의 전력 제어를 담은 명령 한 줄 ('S,순번,포트,상태,...')"""
+    fields = [f"S,{seq & 0xFF}"] + [f"{port},{1 if enable else 0}" for port, enable in changes.items()]
+    return (",".join(fields) + "\n").encode("ascii")
+
+def encode_power_ack(seq: int, relay_mask: int) -> bytes:
+    """전력 제어 응답 생성 (아두이노 펌웨어/에뮬레이터와 같은 형식)"""
+    packet = POWER_ACK.pack(ACK_SYNC, seq & 0xFF, relay_mask)
+    return packet + BINARY_CRC.pack(crc16(packet[2:]))
+
+class PowerAck(NamedTuple):
+    """수신된 전력 제어 응답"""
+    received_at: float  # 수신 시각
+    seq: int  # 처리한 명령의 순번
+    relay_mask: int  # 처리 후 전체 릴레이 상태 (포트 n은 n-1번 비트)
+
+class SerialFrame(NamedTuple):
+    """수신된 측정 프레임"""
+    received_at: float  # 수신 시각 (time.monotonic)
+    values: List[Optional[float]]  # 전압/전류 값 (EVSE 순서대로 전압, 전류 반복, 잘못된 값은 None)
+    seq: Optional[int] = None  # 바이너리 프레임 순번 (ASCII 프레임은 None)
+
+class FrameParser:
+    """ASCII/바이너리 프레임의 점진적 파서
+
+    읽은 바이트를 그대로 넣으면 완성된 프레임만 돌려주고, 아직 끝나지 않은
+    프레임은 다음 feed()까지 보관한다. CRC가 맞는 바이너리 프레임을 한 번 받으면
+    그 뒤로는 바이너리 형식으로 고정하여, 바이너리 데이터가 ASCII 프레임으로
+    잘못 해석되지 않게 한다.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.format: Optional[str] = None  # 판별된 형식 ("ascii" / "binary")
+        self.frames_parsed = 0
+        self.bytes_discarded = 0  # 프레임 밖에서 버린 바이트 수
+        self.crc_errors = 0  # CRC가 맞지 않아 버린 바이너리 프레임 수
+        self.frames_lost = 0  # 순번으로 확인한 누락 프레임 수
+        self.last_seq: Optional[int] = None
+        self.acks: List[PowerAck] = []  # feed()에서 받은 전력 제어 응답 (가져간 쪽이 비움)
+        self.acks_parsed = 0
+
+    def feed(self, data: bytes, received_at: float = None) -> List[SerialFrame]:
+        """수신 바이트 추가 후 완성된 프레임 목록 반환"""
+        if received_at is None:
+            received_at = time.monotonic()
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        pos = 0  # 처리가 끝난 위치
+        ack_start = buffer.find(ACK_SYNC)  # 응답은 드물게 오므로 위치를 기억해 두고 지나친 뒤에만 다시 탐색
+
+        while True:
+            binary_start = buffer.find(BINARY_SYNC, pos)
+            ascii_start = -1 if self.format == "binary" else buffer.find(FRAME_START, pos)
+            if 0 <= ack_start < pos:
+                ack_start = buffer.find(ACK_SYNC, pos)
+            if ack_start >= 0 and (binary_start < 0 or ack_start < binary_start):
+                binary_start = ack_start
+
+            if binary_start >= 0 and (ascii_start < 0 or binary_start < ascii_start):
+                self.bytes_discarded += binary_start - pos
+                pos = binary_start
+                if binary_start == ack_start:
+                    result = self._parse_ack(buffer, pos, received_at)
+                else:
+                    result = self._parse_binary(buffer, pos, received_at)
+                if result is None:
+                    break  # 끝나지 않은 프레임
+                frame, pos = result
+                if frame is not None:
+                    frames.append(frame)
+                continue
+
+            if ascii_start < 0:
+                # 프레임 시작이 없으면 버림 (SYNC 첫 바이트가 끝에 걸쳐 있으면 보관)
+                keep = 1 if buffer.endswith(BINARY_SYNC[:1]) else 0
+                self.bytes_discarded += max(0, len(buffer) - pos - keep)
+                pos = max(pos, len(buffer) - keep)
+                break
+
+            self.bytes_discarded += ascii_start - pos
+            pos = ascii_start
+            end = buffer.find(FRAME_END, pos + 1)
+            if end < 0:
+                if binary_start >= 0:
+                    # 끝나지 않은 ASCII 프레임 뒤에 바이너리 프레임이 있으면 형식이 바뀐 것으로 보고 건너뜀
+                    pos += 1
+                    continue
+                if len(buffer) - pos > MAX_FRAME_LENGTH:
+                    self.bytes_discarded += len(buffer) - pos
+                    pos = len(buffer)
+                break
+
+            frame = self._parse_ascii(buffer, pos, end, received_at)
+            if frame is None:
+                # 본문이 ASCII가 아니면 시작 문자만 건너뛰고 다시 탐색 (안에 바이너리 프레임이 있을 수 있음)
+                pos += 1
+                continue
+            frames.append(frame)
+            pos = end + 1
+
+        del buffer[:pos]
+        return frames
+
+    def _parse_ascii(self, buffer: bytearray, start: int, end: int, received_at: float) -> Optional[SerialFrame]:
+        """buffer[start:end+1]의 ASCII 프레임 해석 (ASCII가 아니면 None)"""
+        # 본문 중간에 시작 문자가 다시 나오면 그 뒤부터가 프레임
+        start = buffer.rfind(FRAME_START, start, end)
+        body = bytes(buffer[start + 1:end])
+        if body.translate(None, TEXT_CHARS):
+            return None  # 출력 가능한 문자 외의 바이트가 있으면 ASCII 프레임이 아님
+        values = []
+        for token in body.translate(None, NON_FRAME_CHARS).split():
+            try:
+                values.append(float(token))
+            except ValueError:
+                values.append(None)  # 위치를 유지하기 위해 None으로 표시
+        if not values:
+            return None
+        if self.format is None:
+            self.format = "ascii"
+        self.frames_parsed += 1
+        return SerialFrame(received_at, values)
+
+    def _parse_binary(self, buffer: bytearray, start: int, received_at: float):
+        """buffer[start:]의 바이너리 프레임 해석
+
+        반환값: None(끝나지 않음) 또는 (프레임 또는 None(CRC 오류), 다음 위치)
+        """
+        if len(buffer) - start < BINARY_HEADER.size:
+            return None
+        _, length, seq = BINARY_HEADER.unpack_from(buffer, start)
+        end = start + BINARY_HEADER.size + length + BINARY_CRC.size
+        if len(buffer) < end:
+            return None
+
+        (crc,) = BINARY_CRC.unpack_from(buffer, end - BINARY_CRC.size)
+        with memoryview(buffer) as view, view[start + 2:end - BINARY_CRC.size] as body:
+            valid = length % 4 == 0 and crc16(body) == crc
+        if not valid:
+            # 잘못된 프레임: SYNC 다음 바이트부터 다시 탐색
+            self.crc_errors += 1
+            return None, start + 1
+        values = list(_values_struct(length // 4).unpack_from(buffer, start + BINARY_HEADER.size))
+
+        self.format = "binary"
+        if self.last_seq is not None:
+            self.frames_lost += (seq - self.last_seq - 1) & 0xFF
+        self.last_seq = seq
+        self.frames_parsed += 1
+        return SerialFrame(received_at, values, seq), end
+
+    def _parse_ack(self, buffer: bytearray, start: int, received_at: float):
+        """buffer[start:]의 전력 제어 응답 해석 (acks에 추가)
+
+        반환값: None(끝나지 않음) 또는 (None, 다음 위치)
+        """
+        end = start + POWER_ACK.size + BINARY_CRC.size
+        if len(buffer) < end:
+            return None
+        (crc,) = BINARY_CRC.unpack_from(buffer, end - BINARY_CRC.size)
+        with memoryview(buffer) as view, view[start + 2:end - BINARY_CRC.size] as body:
+            valid = crc16(body) == crc
+        if not valid:
+            self.crc_errors += 1
+            return None, start + 1
+        _, seq, relay_mask = POWER_ACK.unpack_from(buffer, start)
+        self.acks.append(PowerAck(received_at, seq, relay_mask))
+        self.acks_parsed += 1
+        return None, end
+
+class SerialReader:
+    """시리얼 수신 전용 스레드
+
+    블로킹 read()는 별도 스레드에서 수행하고, 완성된 프레임만 스레드 간 채널(deque)에
+    넣은 뒤 call_soon_threadsafe로 이벤트 루프에 알린다. 이벤트 루프는 drain()으로
+    대기 없이 프레임을 꺼내므로 시리얼 수신이 다른 코루틴을 막지 않는다.
+    """
+
+    def __init__(self, conn, loop: asyncio.AbstractEventLoop, max_frames: int = 1000,
+                 capture=None, clock: Callable[[], float] = time.monotonic,
+                 on_ack: Optional[Callable[[PowerAck], None]] = None,
+                 frame_ready: Optional[asyncio.Event] = None):
+        self.conn = conn  # pyserial Serial (timeout 설정 필요, read가 그 시간까지만 대기)
+        self.loop = loop
+        self.capture = capture  # 수신 원본 바이트 기록 (serial_capture.CaptureWriter, 선택)
+        self.clock = clock  # 수신 시각 기준 (캡처 재생 시에는 재생 시계)
+        self.on_ack = on_ack  # 전력 제어 응답 콜백 (이벤트 루프에서 호출)
+        self.parser = FrameParser()
+        self.frames = deque(maxlen=max_frames)  # 수신 스레드 -> 이벤트 루프 채널 (가득 차면 오래된 프레임부터 버림)
+        # 새 프레임이 들어오면 설정 (이벤트 루프에서만 접근, 다른 깨우기 이벤트와 함께 쓰려면 넘겨받음)
+        self.frame_ready = frame_ready if frame_ready is not None else asyncio.Event()
+        self.frames_dropped = 0
+        self.error: Optional[Exception] = None  # 수신 스레드를 멈추게 한 오류
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """수신 스레드 시작"""
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="serial-reader", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """수신 스레드 본체 (쌓인 바이트를 한 번에 읽고, 없으면 1바이트를 timeout까지 대기)"""
+        while self.running:
+            try:
+                data = self.conn.read(self.conn.in_waiting or 1)
+            except Exception as e:
+                if self.running:
+                    self.error = e
+                break
+            if not data:
+                continue
+            received_at = self.clock()
+            if self.capture is not None:
+                self.capture.write(data, received_at)
+            frames = self.parser.feed(data, received_at)
+            if self.parser.acks:
+                if self.on_ack is not None:
+                    for ack in self.parser.acks:
+                        self.loop.call_soon_threadsafe(self.on_ack, ack)
+                self.parser.acks.clear()
+            if frames:
+                self.frames_dropped += max(0, len(self.frames) + len(frames) - self.frames.maxlen)
+                self.frames.extend(frames)
+                self.loop.call_soon_threadsafe(self.frame_ready.set)
+
+    def drain(self) -> List[SerialFrame]:
+        """도착한 프레임을 모두 꺼내기 (이벤트 루프 스레드에서 호출)"""
+        self.frame_ready.clear()
+        frames = []
+        while self.frames:
+            frames.append(self.frames.popleft())
+        return frames
+
+    def stats(self) -> Dict[str, object]:
+        """수신 통계 (판별된 형식, 프레임/CRC 오류/누락/버린 바이트 수)"""
+        parser = self.parser
+        return {
+            "format": parser.format,
+            "frames_parsed": parser.frames_parsed,
+            "crc_errors": parser.crc_errors,
+            "frames_lost": parser.frames_lost,
+            "acks": parser.acks_parsed,
+            "frames_dropped": self.frames_dropped,
+            "bytes_discarded": parser.bytes_discarded,
+        }
+
+    def reset_format(self):
+        """프레임 형식을 다시 판별 (아두이노 재시작 등으로 형식이 바뀌었을 때)"""
+        self.parser.format = None
+        self.parser.last_seq = None
+
+    def is_alive(self) -> bool:
+        """수신 스레드가 동작 중인지 확인"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def stop(self, timeout: float = 2.0):
+        """수신 스레드 중지 (진행 중인 read가 끝날 때까지 최대 timeout초 대기)"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.capture is not None:
+            self.capture.close()
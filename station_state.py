@@ -0,0 +1,133 @@
+"""
+OCPP 충전소 시뮬레이터 - 충전소 EVSE별 상태 (필드별 열 저장)
+"""
+
+from array import array
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from enums import ConnectorStatus
+from serial_link import MAX_BINARY_VALUES
+from utils import load_config
+
+try:
+    import numpy as np  # 선택 의존성: 설치되어 있으면 EVSE 전체의 전력/상태 변화를 배열 연산으로 계산
+except ImportError:
+    np = None
+
+DEFAULT_NUM_EVSE = 3
+MAX_EVSE = MAX_BINARY_VALUES // 2  # 바이너리 프레임 하나에 담을 수 있는 EVSE 수 (전력 제어 응답 비트 수보다 작음)
+
+def configured_num_evse(config: Optional[Dict[str, Any]] = None) -> int:
+    """설정 파일의 EVSE 수 ("num_evse", 없거나 잘못되면 기본값, 1~MAX_EVSE로 제한)"""
+    if config is None:
+        config = load_config() or {}
+    try:
+        num_evse = int(config.get("num_evse", DEFAULT_NUM_EVSE))
+    except (TypeError, ValueError):
+        return DEFAULT_NUM_EVSE
+    return min(max(num_evse, 1), MAX_EVSE)
+
+class StationState:
+    """충전소의 EVSE별 상태 (evse_id - 1 위치로 O(1) 접근)
+
+    필드마다 EVSE 수만큼의 열 하나를 둔다. 수치는 array('d'), 플래그는 bytearray(0/1)로
+    저장하므로 EVSE가 늘어도 필드당 객체는 하나뿐이다. 플래그 열은 indices()로 켜진
+    EVSE만 C 수준 탐색으로 찾을 수 있어, 대부분 쉬고 있는 EVSE는 반복에서 빠진다.
+    """
+
+    def __init__(self, num_evse: int):
+        self.num_evse = num_evse
+
+        # 측정값 (아두이노 프레임과 같은 순서: EVSE별 전압, 전류) - voltage/current는 복사 없는 열 보기
+        self.load3_mv = array("d", bytes(16 * num_evse))
+        self.voltage = memoryview(self.load3_mv)[0::2]
+        self.current = memoryview(self.load3_mv)[1::2]
+
+        # 전력(W)
+        self.power_data = array("d", bytes(8 * num_evse))  # 이번 주기 전력
+        self.prev_power_data = array("d", bytes(8 * num_evse))  # 지난 주기 전력
+        self.manual_power = array("d", bytes(8 * num_evse))  # 수동 입력 전력
+
+        # 플래그 (0/1)
+        self.charging_active = bytearray(num_evse)  # 충전 활성화
+        self.cable_connected = bytearray(num_evse)  # 케이블 연결
+        self.transaction_started = bytearray(num_evse)  # 트랜잭션 시작 이벤트 전송됨
+        self.powered = bytearray(num_evse)  # 지난 주기에 전력이 있었음 (충전 종료 감지용)
+        self.charger_available = bytearray(b"\x01" * num_evse)  # 사용 가능 (ChangeAvailability)
+
+        # 트랜잭션 / 커넥터 상태
+        self.seq_num_counter = array("q", [1] * num_evse)  # TransactionEvent 시퀀스 넘버
+        self.transaction_started_at = array("d", bytes(8 * num_evse))  # 트랜잭션 시작 시각 (샘플 시각 기준, 종료 시 세션 요약)
+        self.transaction_ids: List[Optional[int]] = [None] * num_evse  # 현재 트랜잭션 번호
+        self.connector_status = [ConnectorStatus.AVAILABLE] * num_evse  # 현재 커넥터 상태
+        self.reported_status: List[Optional[ConnectorStatus]] = [None] * num_evse  # 서버가 응답한 마지막 상태
+
+    def __len__(self) -> int:
+        return self.num_evse
+
+    def is_valid(self, evse_id: int) -> bool:
+        """유효한 EVSE 번호인지 확인"""
+        return 1 <= evse_id <= self.num_evse
+
+    @staticmethod
+    def indices(flags: bytearray) -> Iterator[int]:
+        """플래그가 켜진 위치 (evse_id - 1, 오름차순)"""
+        idx = flags.find(1)
+        while idx >= 0:
+            yield idx
+            idx = flags.find(1, idx + 1)
+
+    def numpy_views(self) -> Dict[str, Any]:
+        """열을 복사 없이 감싼 numpy 배열 (numpy가 있을 때만, 처음 호출 시 만들어 재사용)"""
+        views = getattr(self, "_numpy_views", None)
+        if views is None:
+            load3_mv = np.frombuffer(self.load3_mv, dtype=np.float64)
+            views = self._numpy_views = {
+                "voltage": load3_mv[0::2],
+                "current": load3_mv[1::2],
+                "charging_active": np.frombuffer(self.charging_active, dtype=np.uint8),
+                "powered": np.frombuffer(self.powered, dtype=np.uint8),
+            }
+        return views
+
+class PowerScan(NamedTuple):
+    """EVSE 전체 전력 계산 결과 (위치는 evse_id - 1, 모두 파이썬 int)
+
+    지난 주기 전력 유무는 두 구현 모두 powered 플래그로만 판단한다 (update_power_edges가 갱신).
+    """
+    power: List[int]  # EVSE별 전력(W) - 충전이 활성화되지 않았거나 최소 전력 미만이면 0
+    started: List[int]  # powered가 꺼져 있음 -> 이번 주기 전력 있음
+    ended: List[int]  # powered가 켜져 있음 -> 이번 주기 전력 0
+
+def scan_power_python(station: StationState, min_power: float) -> PowerScan:
+    """전력/전력 변화 계산 (순수 파이썬, 충전이 활성화된 EVSE와 지난 주기에 전력이 있던 EVSE만 확인)"""
+    voltage, current = station.voltage, station.current
+    powered = station.powered
+    power = [0] * station.num_evse
+    started = []
+    for i in station.indices(station.charging_active):
+        value = int(voltage[i] * current[i])
+        if value >= min_power:
+            power[i] = value
+            if not powered[i]:
+                started.append(i)
+    ended = [i for i in station.indices(powered) if power[i] == 0]
+    return PowerScan(power, started, ended)
+
+if np is not None:
+    def scan_power_numpy(station: StationState, min_power: float) -> PowerScan:
+        """전력/전력 변화 계산 (numpy, EVSE 전체를 한 번에)"""
+        views = station.numpy_views()
+        power = (views["voltage"] * views["current"]).astype(np.int64)  # int()와 같이 0 쪽으로 버림
+        power[(views["charging_active"] == 0) | (power < min_power)] = 0
+        powered = views["powered"] != 0
+        # 결과는 tolist()로 파이썬 int로 바꿈 (numpy 스칼라는 JSON 인코딩이 안 됨)
+        return PowerScan(
+            power.tolist(),
+            np.flatnonzero(~powered & (power > 0)).tolist(),
+            np.flatnonzero(powered & (power == 0)).tolist(),
+        )
+
+    scan_power = scan_power_numpy
+else:
+    scan_power = scan_power_python
@@ -0,0 +1,66 @@
+"""
+OCPP 충전소 시뮬레이터 - 아두이노 에뮬레이터 테스트
+"""
+
+import os
+import select
+import sys
+import time
+
+import pytest
+
+if not sys.platform.startswith("linux"):
+    pytest.skip("PTY 에뮬레이터는 Linux 전용", allow_module_level=True)
+
+from arduino_emulator import COMMAND_HISTORY, ArduinoEmulator
+from serial_link import FrameParser, encode_power_ack
+
+@pytest.fixture
+def emulator():
+    emulator = ArduinoEmulator(num_evse=2, rate=50.0, noise=0.0)
+    yield emulator
+    emulator.stop()
+
+def test_power_command_switches_relay(emulator):
+    emulator.handle_command("P,2,1")
+    assert emulator.relay == [False, True]
+    assert emulator.measure()[2:] == [220.0, 13.6]
+    emulator.handle_command("P,2,0")
+    assert emulator.relay == [False, False]
+
+@pytest.mark.parametrize("command", ["P,0,1", "P,3,1", "P,-1,1", "P,x,1", "S,1,3,1", "S,x,1,1"])
+def test_out_of_range_commands_are_ignored(emulator, command):
+    emulator.handle_command(command)
+    assert emulator.relay == [False, False]
+
+def test_batched_command_acks_relay_mask(emulator):
+    assert emulator.handle_command("S,7,1,1,2,1") == encode_power_ack(7, 0b11)
+    assert emulator.handle_command("S,8,1,0") == encode_power_ack(8, 0b10)
+    assert emulator.acks_sent == 2
+
+def test_command_history_is_bounded(emulator):
+    for i in range(COMMAND_HISTORY * 3):
+        emulator.handle_command(f"P,1,{i % 2}")
+    assert len(emulator.commands) == COMMAND_HISTORY
+    assert emulator.commands_received == COMMAND_HISTORY * 3
+
+def test_delayed_ack_does_not_stall_frames():
+    """응답 지연 중에도 측정 프레임은 계속 나옴"""
+    emulator = ArduinoEmulator(num_evse=2, rate=50.0, noise=0.0, binary=True, ack_delay=0.3)
+    fd = os.open(emulator.port, os.O_RDWR | os.O_NOCTTY)
+    parser = FrameParser()
+    frames = []
+    emulator.start()
+    try:
+        os.write(fd, b"S,1,1,1\n")
+        deadline = time.monotonic() + 1.0
+        while not parser.acks and time.monotonic() < deadline:
+            if select.select([fd], [], [], 0.05)[0]:
+                frames += parser.feed(os.read(fd, 4096), time.monotonic())
+    finally:
+        emulator.stop()
+        os.close(fd)
+
+    assert [ack.relay_mask for ack in parser.acks] == [0b01]
+    before_ack = [frame for frame in frames if frame.received_at < parser.acks[0].received_at]
+    assert len(before_ack) >= 5  # 0.3초 동안 50Hz 프레임
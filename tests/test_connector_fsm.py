@@ -0,0 +1,80 @@
+"""
+OCPP 충전소 시뮬레이터 - 커넥터 상태 머신 테스트
+"""
+
+from connector_fsm import ConnectorStateMachine, DebouncedSignal, Hysteresis
+from enums import ConnectorState
+
+PLUG = Hysteresis(on=200.0, off=100.0, on_dwell=1.0, off_dwell=1.0)  # 전압(V)
+CHARGE = Hysteresis(on=100.0, off=50.0, on_dwell=2.0, off_dwell=2.0)  # 전력(W)
+
+def feed(fsm: ConnectorStateMachine, start: float, end: float, voltage: float, power: float, step: float = 0.5):
+    """start부터 end까지 step 간격으로 같은 샘플을 넣고 상태 전이를 모음"""
+    transitions = []
+    t = start
+    while t <= end:
+        transitions += fsm.update(t, voltage, power)
+        t += step
+    return [(tr.new, tr.timestamp) for tr in transitions]
+
+def test_single_spike_is_ignored():
+    signal = DebouncedSignal(CHARGE)
+    assert not signal.update(500.0, 0.0)
+    assert signal.settles_at() == 2.0
+    assert not signal.update(0.0, 0.5)  # off 아래로 돌아가면 취소
+    assert signal.settles_at() is None
+    assert not signal.update(0.0, 5.0)
+    assert signal.value is False
+
+def test_in_band_samples_keep_pending_change():
+    """두 기준 사이의 샘플은 유지를 끊지 않음"""
+    signal = DebouncedSignal(CHARGE)
+    assert not signal.update(150.0, 0.0)
+    assert not signal.update(75.0, 1.0)
+    assert not signal.update(60.0, 1.5)
+    assert signal.update(120.0, 2.0)
+    assert signal.value is True
+
+    # 꺼질 때도 같은 규칙 (on 위로 돌아가야만 취소)
+    assert not signal.update(10.0, 3.0)
+    assert not signal.update(90.0, 4.0)
+    assert signal.update(10.0, 5.0)
+    assert signal.value is False
+
+def test_full_charging_session():
+    fsm = ConnectorStateMachine(1, PLUG, CHARGE)
+    assert feed(fsm, 0.0, 2.0, 230.0, 0.0) == [(ConnectorState.PLUGGED, 1.0)]
+    assert [tr.new for tr in fsm.authorize(2.5)] == [ConnectorState.AUTHORIZED]
+    assert feed(fsm, 3.0, 6.0, 230.0, 1500.0) == [(ConnectorState.CHARGING, 5.0)]
+    assert fsm.last_power == 1500.0
+    assert feed(fsm, 6.5, 9.0, 230.0, 0.0) == [(ConnectorState.SUSPENDED_EV, 8.5)]
+    assert fsm.last_power == 1500.0  # 마지막 충전 전력 유지
+    assert feed(fsm, 9.5, 12.0, 230.0, 800.0) == [(ConnectorState.CHARGING, 11.5)]
+
+    assert [tr.new for tr in fsm.deauthorize(12.5)] == [ConnectorState.FINISHING]
+    assert feed(fsm, 13.0, 16.0, 230.0, 0.0) == []  # finish()를 기다림
+    assert [tr.new for tr in fsm.finish(16.0)] == [ConnectorState.PLUGGED]
+    assert fsm.last_power == 0.0 and not fsm.authorized
+    assert feed(fsm, 16.5, 18.0, 0.0, 0.0) == [(ConnectorState.AVAILABLE, 17.5)]
+
+def test_unplug_while_charging_goes_to_finishing():
+    fsm = ConnectorStateMachine(2, PLUG, CHARGE)
+    feed(fsm, 0.0, 1.0, 230.0, 0.0)
+    fsm.authorize(1.0)
+    feed(fsm, 1.5, 4.0, 230.0, 2000.0)
+    assert fsm.state is ConnectorState.CHARGING
+
+    assert feed(fsm, 4.5, 6.0, 0.0, 0.0) == [(ConnectorState.FINISHING, 5.5)]
+    assert [(tr.old, tr.new) for tr in fsm.finish(6.0)] == [(ConnectorState.FINISHING, ConnectorState.AVAILABLE)]
+    assert fsm.finish(6.5) == []
+
+def test_settles_at_reports_earliest_pending_change():
+    fsm = ConnectorStateMachine(1, PLUG, CHARGE)
+    assert fsm.settles_at() is None
+    fsm.update(10.0, 230.0, 0.0)
+    assert fsm.settles_at() == 11.0
+    fsm.update(10.5, 230.0, 500.0)
+    assert fsm.settles_at() == 11.0  # 전압(1초)이 전력(2초)보다 먼저 확정
+    fsm.update(11.0, 230.0, 500.0)
+    assert fsm.state is ConnectorState.PLUGGED
+    assert fsm.settles_at() == 12.5
@@ -0,0 +1,110 @@
+"""
+OCPP 충전소 시뮬레이터 - GUI 클라이언트 충전 처리 테스트 (가짜 앱/시계 사용)
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("serial")
+pytest.importorskip("websockets")
+
+import gui_client
+
+class FakeApp:
+    """GUI 대신 로그만 모으는 앱"""
+
+    def __init__(self):
+        self.logs = []
+
+    def log(self, message: str):
+        self.logs.append(message)
+
+    def update_charger_status(self, evse_id, status):
+        pass
+
+    def update_power_display(self, evse_id, power):
+        pass
+
+    def update_total_price(self, price):
+        pass
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def make_client(tmp_path, monkeypatch):
+    """서버 주소를 받아 시리얼 없는 클라이언트를 만듦 (저널/계측 파일은 임시 디렉터리에)"""
+    monkeypatch.chdir(tmp_path)
+    clients = []
+
+    def make(websocket_url: str = ""):
+        client = gui_client.GuiOcppClient(FakeApp(), websocket_url, None, num_evse=2)
+        clock = FakeClock()
+        client.sample_clock = clock
+        client.timers.clock = clock
+        clients.append(client)
+        return client, clock
+
+    yield make
+    for client in clients:
+        client.comm.close_connections()
+
+def wake(client, clock):
+    """메인 루프 한 번 처리 후 다음 예정 작업 시각까지 시계 진행 (예약이 없으면 False)"""
+    client.get_load3_data(client.num_evse)
+    client.update_power_edges(client.scan_power())
+    asyncio.run(client.timers.run_due())
+    delay = client.timers.next_delay()
+    if delay is None:
+        return False
+    clock.now += delay
+    return True
+
+def test_offline_manual_charging_integrates_every_second(make_client):
+    """서버 주소가 없어도 충전 중에는 주기적으로 깨어나 에너지를 빠짐없이 적산"""
+    client, clock = make_client()
+    client.station.charging_active[0] = True
+    client.station.manual_power[0] = 1000
+    start = clock.now
+    while clock.now - start < 120.0:
+        assert wake(client, clock), "충전 중인데 깨어날 예약이 없음"
+    client.get_load3_data(client.num_evse)  # 마지막으로 깨어난 시각의 샘플
+    assert client.energy.register(1) == pytest.approx(1000 * (clock.now - start) / 3600, rel=1e-6)
+    assert client.energy.register(2) == 0.0
+
+def test_sampling_scheduled_regardless_of_server(make_client):
+    offline, _ = make_client()
+    online, _ = make_client("ws://test")
+    for client in (offline, online):
+        client.station.charging_active[1] = True
+        client.station.manual_power[1] = 2000
+        client.get_load3_data(client.num_evse)
+        client.update_power_edges(client.scan_power())
+        assert client.timers.next_delay() <= client.energy.max_gap
+    assert ("sample", 2) in offline.timers and ("meter", 2) not in offline.timers
+    assert ("sample", 2) in online.timers and ("meter", 2) in online.timers
+
+    # 전력이 끊기면 예약 취소
+    offline.station.charging_active[1] = False
+    offline.get_load3_data(offline.num_evse)
+    offline.update_power_edges(offline.scan_power())
+    assert ("sample", 2) not in offline.timers
+
+def test_session_summary_reads_history_since_transaction_start(make_client):
+    client, clock = make_client()
+    client.station.charging_active[0] = True
+    client.station.manual_power[0] = 1100
+    wake(client, clock)
+    client.station.transaction_started_at[0] = clock.now
+    for _ in range(30):
+        wake(client, clock)
+    client.log_session_summary(1)
+    summary = client.history.summary(1, client.station.transaction_started_at[0])
+    assert summary.peak_power == pytest.approx(1100.0)
+    assert summary.duration == pytest.approx(29.0)
+    assert "충전 세션 요약 - 29초" in client.app.logs[-1]
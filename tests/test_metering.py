@@ -0,0 +1,147 @@
+"""
+OCPP 충전소 시뮬레이터 - 미터 값 처리 테스트
+"""
+
+import pytest
+
+import metering
+from metering import DeadbandFilter, EnergyAccumulator, IntervalAggregator, MeterBatcher
+
+def test_batcher_flushes_when_full(monkeypatch):
+    monkeypatch.setattr(metering.time, "monotonic", lambda: 100.0)
+    batcher = MeterBatcher(2, flush_interval=10.0, max_samples=3)
+    for second in range(3):
+        assert not batcher.is_due(1, now=100.0)
+        batcher.add(1, f"t{second}", [{"value": second}])
+    assert batcher.is_due(1, now=100.0)
+    assert not batcher.is_due(2, now=100.0)  # 다른 EVSE는 따로 모음
+    meter_values = batcher.flush(1)
+    assert [value["timestamp"] for value in meter_values] == ["t0", "t1", "t2"]
+    assert batcher.pending(1) == 0 and not batcher.is_due(1, now=200.0)
+
+def test_batcher_flushes_after_interval_from_first_sample(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(metering.time, "monotonic", lambda: now[0])
+    batcher = MeterBatcher(1, flush_interval=10.0, max_samples=10)
+    batcher.add(1, "t0", [])
+    now[0] = 105.0
+    batcher.add(1, "t1", [])
+    assert not batcher.is_due(1, now=109.9)
+    assert batcher.is_due(1, now=110.0)  # 첫 샘플 기준
+
+def test_energy_trapezoid():
+    energy = EnergyAccumulator(1)
+    energy.add_sample(1, 0.0, 0.0)
+    energy.add_sample(1, 1.0, 3600.0)
+    energy.add_sample(1, 2.0, 3600.0)
+    # 0 -> 3600 W 구간 0.5 Wh + 3600 W 유지 구간 1 Wh
+    assert energy.register(1) == pytest.approx(1.5)
+
+def test_energy_gap_clamped_to_max_gap():
+    """수신이 끊긴 동안은 max_gap초만큼만 적분"""
+    energy = EnergyAccumulator(1, max_gap=5.0)
+    energy.add_sample(1, 0.0, 7200.0)
+    energy.add_sample(1, 60.0, 7200.0)
+    assert energy.register(1) == pytest.approx(10.0)
+
+def test_energy_ignores_out_of_order_sample():
+    energy = EnergyAccumulator(1)
+    energy.add_sample(1, 10.0, 1000.0)
+    energy.add_sample(1, 9.0, 1000.0)
+    assert energy.register(1) == 0.0
+
+def test_transaction_energy_is_register_delta():
+    energy = EnergyAccumulator(2)
+    energy.add_sample(1, 0.0, 3600.0)
+    energy.add_sample(1, 1.0, 3600.0)
+    assert energy.start_transaction(1) == pytest.approx(1.0)
+    assert energy.transaction_energy(1) == 0.0
+    energy.add_sample(1, 3.0, 3600.0)
+    assert energy.transaction_energy(1) == pytest.approx(2.0)
+    assert energy.end_transaction(1) == pytest.approx(2.0)
+    assert energy.transaction_energy(1) == 0.0
+    assert energy.register(1) == pytest.approx(3.0)  # 레지스터는 계속 증가
+    assert energy.register(2) == 0.0
+
+def test_interval_stats():
+    aggregator = IntervalAggregator(2, 3)
+    assert aggregator.take(1) is None
+    for values in ([1000.0, 220.0, 4.5], [3000.0, 218.0, 13.8], [2000.0, 222.0, 9.0]):
+        aggregator.add(1, values)
+    assert aggregator.pending(1) == 3 and aggregator.pending(2) == 0
+    stats = aggregator.take(1)
+    assert stats.count == 3
+    assert stats.avg == pytest.approx([2000.0, 220.0, 9.1])
+    assert stats.min == [1000.0, 218.0, 4.5]
+    assert stats.max == [3000.0, 222.0, 13.8]
+    assert stats.last == [2000.0, 222.0, 9.0]
+
+def test_interval_take_starts_new_interval():
+    aggregator = IntervalAggregator(1, 1)
+    aggregator.add(1, [5.0])
+    aggregator.add(1, [1.0])
+    assert aggregator.take(1).max == [5.0]
+    assert aggregator.take(1) is None
+    aggregator.add(1, [2.0])
+    stats = aggregator.take(1)  # 지난 구간 값이 남지 않음
+    assert (stats.count, stats.min, stats.max, stats.avg) == (1, [2.0], [2.0], [2.0])
+
+def test_interval_peek_keeps_interval():
+    aggregator = IntervalAggregator(1, 1)
+    assert aggregator.peek(1) is None
+    aggregator.add(1, [1.0])
+    assert aggregator.peek(1).count == 1
+    aggregator.add(1, [3.0])
+    assert aggregator.peek(1).avg == [2.0]
+    assert aggregator.take(1).count == 2
+
+def test_interval_sampled_values_carry_min_max_last():
+    aggregator = IntervalAggregator(1, 3)
+    aggregator.add(1, [1000.0, 220.0, 4.5])
+    aggregator.add(1, [3000.0, 221.0, 13.6])
+    sampled_values = metering.build_interval_sampled_values(aggregator.take(1), energy_wh=12.34567)
+    power = sampled_values[0]
+    assert power["measurand"] == "Power.Active.Import"
+    assert power["value"] == 2000.0
+    assert power["customData"]["min"] == 1000.0
+    assert power["customData"]["max"] == 3000.0
+    assert power["customData"]["count"] == 2
+    assert sampled_values[-1]["measurand"] == "Energy.Active.Import.Register"
+    assert sampled_values[-1]["value"] == 12.346
+
+def stats_of(*values) -> "metering.IntervalStats":
+    aggregator = IntervalAggregator(1, len(values[0]))
+    for sample in values:
+        aggregator.add(1, sample)
+    return aggregator.take(1)
+
+def test_deadband_reports_first_sample_then_only_changes():
+    deadband = DeadbandFilter(1, absolute=[50.0, 2.0], max_silence=60.0)
+    assert deadband.should_report(1, stats_of([1000.0, 220.0]), now=100.0)
+    deadband.mark_sent(1, [1000.0, 220.0], now=100.0)
+    assert not deadband.should_report(1, stats_of([1040.0, 221.5]), now=110.0)
+    assert deadband.should_report(1, stats_of([1060.0, 220.0]), now=110.0)
+    assert deadband.should_report(1, stats_of([1000.0, 217.0]), now=110.0)
+
+def test_deadband_checks_interval_extremes():
+    """구간 안의 짧은 변화도 최소/최대 값으로 보고"""
+    deadband = DeadbandFilter(1, absolute=[50.0])
+    deadband.mark_sent(1, [1000.0], now=0.0)
+    assert deadband.should_report(1, stats_of([1000.0], [0.0], [1000.0]), now=1.0)
+
+def test_deadband_relative_band_uses_larger_limit():
+    deadband = DeadbandFilter(1, absolute=[10.0], relative=0.05)
+    deadband.mark_sent(1, [1000.0], now=0.0)
+    assert not deadband.exceeds(1, [1049.0])  # 5% = 50 W
+    assert deadband.exceeds(1, [1051.0])
+    deadband.mark_sent(1, [100.0], now=0.0)
+    assert deadband.exceeds(1, [111.0])  # 5% = 5 W보다 절대값 10 W가 큼
+    assert not deadband.exceeds(1, [109.0])
+
+def test_deadband_max_silence_and_reset():
+    deadband = DeadbandFilter(1, absolute=[50.0], max_silence=60.0)
+    deadband.mark_sent(1, [1000.0], now=100.0)
+    assert not deadband.should_report(1, stats_of([1000.0]), now=159.9)
+    assert deadband.should_report(1, stats_of([1000.0]), now=160.0)
+    deadband.reset(1)
+    assert deadband.exceeds(1, [1000.0])
@@ -0,0 +1,373 @@
+"""
+OCPP 충전소 시뮬레이터 - 통신 모듈 테스트 (가짜 WebSocket 사용)
+"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("serial")
+pytest.importorskip("websockets")
+
+import ocpp_comm
+from ocpp_comm import OcppComm
+
+class FakeSocket:
+    """테스트용 WebSocket (보낸 프레임을 기록하고, 받을 프레임은 직접 넣음)"""
+
+    def __init__(self, lifetime=None, auto_reply=False):
+        self.sent = []
+        self.auto_reply = auto_reply  # CALL마다 바로 CALLRESULT로 응답
+        self.ignore = set()  # 한 번 응답하지 않을 messageId (응답 유실 흉내)
+        self.inbox = asyncio.Queue()
+        self.closed = False
+        if lifetime is not None:
+            # lifetime초 뒤에 서버가 연결을 끊음 (0이면 연결 직후)
+            asyncio.get_running_loop().call_later(lifetime, self.inbox.put_nowait, ConnectionError("서버 종료"))
+
+    async def send(self, data: str):
+        if self.closed:
+            raise ConnectionError("닫힌 연결")
+        frame = json.loads(data)
+        self.sent.append(frame)
+        if self.auto_reply and frame[0] == 2:
+            if frame[1] in self.ignore:
+                self.ignore.discard(frame[1])
+            else:
+                self.reply(frame[1])
+
+    async def recv(self) -> str:
+        item = await self.inbox.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def close(self):
+        self.closed = True
+        self.inbox.put_nowait(ConnectionError("닫힘"))
+
+    def reply(self, message_id: str, payload=None):
+        self.inbox.put_nowait(json.dumps([3, message_id, payload or {}]))
+
+    def sent_calls(self) -> list:
+        """보낸 CALL 프레임 목록 - [(messageId, action, payload), ...]"""
+        return [tuple(frame[1:]) for frame in self.sent if frame[0] == 2]
+
+def call(message_id: str, action: str, **payload) -> dict:
+    return {"messageTypeId": 2, "messageId": message_id, "action": action, "payload": payload}
+
+def install_server(monkeypatch, make_socket):
+    """websockets.connect 대신 make_socket()이 만든 가짜 연결을 돌려줌 (만든 연결 목록 반환)"""
+    sockets = []
+
+    async def connect(url, **kwargs):
+        sockets.append(make_socket())
+        return sockets[-1]
+
+    monkeypatch.setattr(ocpp_comm.websockets, "connect", connect)
+    return sockets
+
+def record_backoff(monkeypatch) -> list:
+    """재연결 대기 계산을 기록 - [(attempt, delay), ...]"""
+    calls = []
+    real = ocpp_comm.backoff_delay
+
+    def backoff_delay(attempt, base_delay, max_delay):
+        calls.append((attempt, real(attempt, base_delay, max_delay)))
+        return calls[-1][1]
+
+    monkeypatch.setattr(ocpp_comm, "backoff_delay", backoff_delay)
+    return calls
+
+async def run_supervisor(comm: OcppComm, until, timeout: float = 5.0):
+    comm.start_supervisor()
+    try:
+        async def wait():
+            while not until():
+                await asyncio.sleep(0.005)
+        await asyncio.wait_for(wait(), timeout)
+    finally:
+        comm.close_connections()
+        await asyncio.sleep(0)
+
+def test_responses_matched_by_message_id_out_of_order(monkeypatch):
+    """응답이 보낸 순서와 반대로 와도 messageId로 각 요청에 전달"""
+    async def scenario():
+        sockets = install_server(monkeypatch, FakeSocket)
+        comm = OcppComm("ws://test", max_in_flight=3)
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        actions = {"boot": "BootNotification", "auth": "Authorize", "data": "DataTransfer"}
+        requests = [asyncio.ensure_future(comm.send_request(call(message_id, action)))
+                    for message_id, action in actions.items()]
+        while len(server.sent_calls()) < 3:  # 응답을 기다리지 않고 윈도우만큼 전송
+            await asyncio.sleep(0.005)
+        server.reply("unknown")  # 대기 중인 요청이 없는 응답은 무시
+        for message_id in reversed(list(actions)):
+            server.reply(message_id, {"echo": message_id})
+        results = await asyncio.wait_for(asyncio.gather(*requests), 2.0)
+        comm.close_connections()
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [(True, [3, message_id, {"echo": message_id}]) for message_id in ("boot", "auth", "data")]
+
+def test_window_limits_requests_in_flight(monkeypatch):
+    async def scenario():
+        sockets = install_server(monkeypatch, FakeSocket)
+        comm = OcppComm("ws://test", max_in_flight=2)
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        requests = [asyncio.ensure_future(comm.send_request(call(message_id, "Authorize", idToken={"idToken": message_id})))
+                    for message_id in ("a", "b", "c")]
+        await asyncio.sleep(0.05)
+        in_flight = [message_id for message_id, _, _ in server.sent_calls()]
+        server.reply("b")
+        while len(server.sent_calls()) < 3:
+            await asyncio.sleep(0.005)
+        server.reply("a")
+        server.reply("c")
+        await asyncio.wait_for(asyncio.gather(*requests), 2.0)
+        comm.close_connections()
+        return in_flight, [message_id for message_id, _, _ in server.sent_calls()]
+
+    in_flight, sent = asyncio.run(scenario())
+    assert in_flight == ["a", "b"]
+    assert sent == ["a", "b", "c"]
+
+def test_server_call_handled_while_waiting_for_response(monkeypatch):
+    """응답을 기다리는 동안 들어온 서버 요청도 같은 수신 루프에서 처리"""
+    async def scenario():
+        sockets = install_server(monkeypatch, FakeSocket)
+        comm = OcppComm("ws://test")
+        stopped = []
+
+        async def stop_transaction(evse_id):
+            stopped.append(evse_id)
+            return True
+
+        comm.set_stop_transaction_callback(stop_transaction)
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        request = asyncio.ensure_future(comm.send_request(call("boot", "BootNotification")))
+        while not server.sent_calls():
+            await asyncio.sleep(0.005)
+        server.inbox.put_nowait(json.dumps([2, "srv-1", "RequestStopTransaction", {"evseId": "2"}]))
+        server.inbox.put_nowait(json.dumps([2, "srv-2", "Reset", {"type": "Immediate"}]))
+        server.inbox.put_nowait("not json")
+        server.reply("boot")
+        result = await asyncio.wait_for(request, 2.0)
+        while len(server.sent) < 3:
+            await asyncio.sleep(0.005)
+        comm.close_connections()
+        return result, stopped, [frame for frame in server.sent if frame[0] != 2]
+
+    result, stopped, answers = asyncio.run(scenario())
+    assert result == (True, [3, "boot", {}])
+    assert stopped == [2]
+    assert [3, "srv-1", {"status": "Accepted"}] in answers
+    assert [frame[:3] for frame in answers if frame[0] == 4] == [[4, "srv-2", "NotImplemented"]]
+
+def test_dropped_connection_fails_pending_requests(monkeypatch):
+    """연결이 끊기면 응답 대기 시간까지 기다리지 않고 실패 처리"""
+    async def scenario():
+        sockets = install_server(monkeypatch, FakeSocket)
+        comm = OcppComm("ws://test", max_retries=0, response_timeout=5.0)
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        request = asyncio.ensure_future(comm.send_request(call("auth", "Authorize")))
+        while not server.sent_calls():
+            await asyncio.sleep(0.005)
+        server.inbox.put_nowait(ConnectionError("서버 종료"))
+        result = await asyncio.wait_for(request, 1.0)
+        comm.close_connections()
+        return result, comm.websocket
+
+    result, websocket = asyncio.run(scenario())
+    assert result == (True, None)
+    assert websocket is None
+
+def test_full_window_leaves_next_message_in_queue(monkeypatch):
+    """윈도우가 가득 찬 동안 들어온 트랜잭션 메시지가 먼저 들어온 하트비트보다 먼저 나감"""
+    async def scenario():
+        sockets = install_server(monkeypatch, FakeSocket)
+        comm = OcppComm("ws://test", max_in_flight=1)
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        first = asyncio.ensure_future(comm.send_request(call("boot", "BootNotification", reason="PowerUp")))
+        await asyncio.sleep(0.01)
+        await comm.send_message(call("hb", "Heartbeat"))
+        await asyncio.sleep(0.01)
+        await comm.send_message(call("tx", "TransactionEvent", eventType="Started", evse={"id": 1}))
+        assert comm.message_queue.qsize() == 2  # 윈도우가 빌 때까지 둘 다 큐에 남아 있음
+        for message_id in ("boot", "tx", "hb"):
+            while message_id not in [sent_id for sent_id, _, _ in server.sent_calls()]:
+                await asyncio.sleep(0.005)
+            server.reply(message_id)
+        await first
+        comm.close_connections()
+        return [message_id for message_id, _, _ in server.sent_calls()]
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 5.0)) == ["boot", "tx", "hb"]
+
+def test_offline_transaction_events_replayed_in_order(monkeypatch, tmp_path):
+    """연결이 없는 동안 저널에 기록한 트랜잭션 이벤트는 연결 후 기록 순서대로 전송"""
+    async def scenario():
+        sockets = []
+        online = False
+
+        async def connect(url, **kwargs):
+            if not online:
+                raise OSError("서버 없음")
+            sockets.append(FakeSocket(auto_reply=True))
+            return sockets[-1]
+
+        monkeypatch.setattr(ocpp_comm.websockets, "connect", connect)
+        comm = OcppComm("ws://test", journal_path=str(tmp_path / "outbox.db"))
+        queued = [await comm.send_message(call(f"tx{seq_no}", "TransactionEvent", eventType="Updated",
+                                                seqNo=seq_no, evse={"id": 1}))
+                  for seq_no in range(3)]
+        online = True
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        while len(server.sent_calls()) < 3 or comm.journal.read_batch(0, 10):
+            await asyncio.sleep(0.005)
+        comm.close_connections()
+        return queued, [message_id for message_id, _, _ in server.sent_calls()]
+
+    queued, sent = asyncio.run(asyncio.wait_for(scenario(), 5.0))
+    assert queued == [True, True, True]
+    assert sent == ["tx0", "tx1", "tx2"]
+
+def test_offline_state_messages_are_not_journaled(monkeypatch, tmp_path):
+    """오프라인 중 상태성 메시지는 저널에 남기지 않음 (재연결 후 최신 상태를 다시 보냄)"""
+    async def scenario():
+        async def connect(url, **kwargs):
+            raise OSError("서버 없음")
+
+        monkeypatch.setattr(ocpp_comm.websockets, "connect", connect)
+        comm = OcppComm("ws://test", journal_path=str(tmp_path / "outbox.db"))
+        queued = [
+            await comm.send_message(call("hb", "Heartbeat")),
+            await comm.send_message(call("status", "StatusNotification", evseId=1, connectorStatus="Available")),
+            await comm.send_message(call("meter", "MeterValues", evseId=1, meterValue=[])),
+        ]
+        journaled = [message["messageId"] for _, message in comm.journal.read_batch(0, 10)]
+        comm.close_connections()
+        return queued, journaled
+
+    queued, journaled = asyncio.run(scenario())
+    assert queued == [False, False, True]
+    assert journaled == ["meter"]
+
+def test_journaled_message_outlives_max_retries(monkeypatch, tmp_path):
+    """저널에 기록된 메시지는 최대 재시도 횟수를 넘겨도 응답을 받을 때까지 재시도"""
+    async def scenario():
+        sockets = install_server(monkeypatch, FakeSocket)
+        comm = OcppComm("ws://test", max_retries=1, retry_delay=0.01, max_retry_delay=0.02,
+                        response_timeout=0.03, journal_path=str(tmp_path / "outbox.db"))
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        requests = [
+            asyncio.ensure_future(comm.send_request(call("tx", "TransactionEvent", eventType="Updated", seqNo=0))),
+            asyncio.ensure_future(comm.send_request(call("auth", "Authorize"))),
+        ]
+        while not requests[0].done():
+            # 세 번 응답하지 않은 뒤부터 응답 (재시도 대기 중에 간 응답은 무시되므로 전송될 때마다 다시 응답)
+            if [message_id for message_id, _, _ in server.sent_calls()].count("tx") >= 4:
+                server.reply("tx")
+            await asyncio.sleep(0.005)
+        results = await asyncio.wait_for(asyncio.gather(*requests), 2.0)
+        comm.close_connections()
+        return results, [message_id for message_id, _, _ in server.sent_calls()]
+
+    (tx, auth), sent = asyncio.run(scenario())
+    assert tx == (True, [3, "tx", {}])
+    assert sent.count("tx") >= 4
+    assert auth == (True, None)  # 저널 대상이 아니면 max_retries 후 포기
+    assert sent.count("auth") == 2
+
+def test_retry_keeps_evse_order_after_timeout(monkeypatch):
+    """응답을 못 받은 Started가 재시도되는 동안 같은 EVSE의 Ended는 기다리고, 다른 EVSE는 계속 전송"""
+    async def scenario():
+        sockets = install_server(monkeypatch, lambda: FakeSocket(auto_reply=True))
+        comm = OcppComm("ws://test", response_timeout=0.05, retry_delay=0.01, max_retry_delay=0.02)
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        server.ignore.add("started")
+        acked = []
+        comm.set_message_acked_callback(lambda message, response: acked.append(message["messageId"]))
+
+        messages = [
+            call("occupied", "StatusNotification", evseId=1, connectorStatus="Occupied"),
+            call("started", "TransactionEvent", eventType="Started", seqNo=0, evse={"id": 1}),
+            call("other", "TransactionEvent", eventType="Started", seqNo=0, evse={"id": 2}),
+            call("ended", "TransactionEvent", eventType="Ended", seqNo=1, evse={"id": 1}),
+            call("available", "StatusNotification", evseId=1, connectorStatus="Available"),
+        ]
+        results = await asyncio.gather(*(comm.send_request(message, timeout=2.0) for message in messages))
+        comm.close_connections()
+        return [message_id for message_id, _, _ in server.sent_calls()], acked, results
+
+    sent, acked, results = asyncio.run(scenario())
+    assert all(response is not None for _, response in results)
+    assert acked.index("other") < acked.index("started")  # 다른 EVSE는 막히지 않음
+    evse1 = [message_id for message_id in acked if message_id != "other"]
+    assert evse1 == ["occupied", "started", "ended", "available"]
+    assert sent.count("started") == 2
+    # Ended는 Started 재전송 뒤에야 처음 전송됨
+    assert sent.index("ended") > len(sent) - 1 - sent[::-1].index("started")
+
+def test_supervisor_backs_off_when_server_drops_right_away(monkeypatch):
+    """연결 직후 끊는 서버에는 재연결 대기가 계속 늘어남"""
+    backoffs = record_backoff(monkeypatch)
+
+    async def scenario():
+        sockets = install_server(monkeypatch, lambda: FakeSocket(lifetime=0))
+        comm = OcppComm("ws://test", reconnect_min_delay=0.005, reconnect_max_delay=1.0)
+        await run_supervisor(comm, lambda: len(sockets) >= 6)
+        return sockets
+
+    sockets = asyncio.run(scenario())
+    attempts = [attempt for attempt, _ in backoffs]
+    assert attempts[:5] == [1, 2, 3, 4, 5]
+    delays = [delay for _, delay in backoffs]
+    assert all(later > earlier for earlier, later in zip(delays[:3], delays[2:5]))
+
+def test_supervisor_restarts_backoff_after_stable_connection(monkeypatch):
+    backoffs = record_backoff(monkeypatch)
+
+    async def scenario():
+        sockets = install_server(monkeypatch, lambda: FakeSocket(lifetime=0.05))
+        comm = OcppComm("ws://test", reconnect_min_delay=0.005, reconnect_max_delay=1.0)
+        comm.reconnect_reset_after = 0.02
+        await run_supervisor(comm, lambda: len(sockets) >= 4)
+
+    asyncio.run(scenario())
+    assert [attempt for attempt, _ in backoffs][:3] == [1, 1, 1]
+
+def test_coalesced_callers_get_survivor_response(monkeypatch):
+    """큐에서 합쳐진 메시지를 기다리던 호출자도 남은 메시지의 응답을 받음"""
+    async def scenario():
+        sockets = install_server(monkeypatch, FakeSocket)
+        comm = OcppComm("ws://test", max_in_flight=1)
+        assert await comm.connect_websocket()
+        server = sockets[0]
+        boot = asyncio.ensure_future(comm.send_request(call("boot", "BootNotification")))
+        await asyncio.sleep(0.01)
+        heartbeats = [asyncio.ensure_future(comm.send_request(call(message_id, "Heartbeat")))
+                      for message_id in ("hb1", "hb2")]
+        await asyncio.sleep(0.01)
+        server.reply("boot")
+        while len(server.sent_calls()) < 2:
+            await asyncio.sleep(0.005)
+        survivor = server.sent_calls()[1][0]
+        server.reply(survivor)
+        results = await asyncio.wait_for(asyncio.gather(boot, *heartbeats), 2.0)
+        comm.close_connections()
+        return results, survivor, len(server.sent_calls())
+
+    results, survivor, sent = asyncio.run(scenario())
+    assert sent == 2
+    assert results[1:] == [(True, [3, survivor, {}])] * 2
@@ -0,0 +1,93 @@
+"""
+OCPP 충전소 시뮬레이터 - 송신 저널 테스트
+"""
+
+import os
+
+import pytest
+
+from ocpp_journal import MessageJournal
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "outbox.db")
+
+def tx_event(message_id: str, seq_no: int) -> dict:
+    return {
+        "messageTypeId": 2, "messageId": message_id, "action": "TransactionEvent",
+        "payload": {"eventType": "Updated", "seqNo": seq_no},
+    }
+
+def replay(journal: MessageJournal, batch: int = 3) -> list:
+    """저널 전체를 batch개씩 seq 순서로 읽은 messageId 목록"""
+    ids, last_seq = [], 0
+    while True:
+        rows = journal.read_batch(last_seq, batch)
+        if not rows:
+            return ids
+        ids += [message["messageId"] for _, message in rows]
+        last_seq = rows[-1][0]
+
+def test_replay_in_append_order_across_restart(path):
+    journal = MessageJournal(path, batch_size=1000, flush_interval=3600)
+    for i in range(10):
+        assert journal.append(tx_event(f"m{i}", i))
+    journal.ack("m3")
+    journal.ack("m7")
+    journal.close()
+
+    journal = MessageJournal(path)
+    assert journal.count() == 8
+    assert replay(journal) == [f"m{i}" for i in range(10) if i not in (3, 7)]
+    journal.close()
+
+def test_replay_keeps_payload_and_drops_encoded_copy(path):
+    journal = MessageJournal(path)
+    journal.append({**tx_event("m0", 5), "encoded_payload": '{"eventType":"Updated"}', "journaled": True})
+    (_, message), = journal.read_batch()
+    assert message["payload"] == {"eventType": "Updated", "seqNo": 5}
+    assert message["journaled"] is True
+    assert "encoded_payload" not in message
+    journal.close()
+
+def test_duplicate_message_id_ignored(path):
+    journal = MessageJournal(path)
+    assert journal.append(tx_event("m0", 0))
+    assert not journal.append(tx_event("m0", 1))
+    journal.ack("m0")
+    journal.ack("m0")  # 두 번째 삭제는 무시
+    assert journal.count() == 0
+    assert journal.acked_since_compact == 1
+    journal.close()
+
+def test_changes_committed_in_batches(path):
+    journal = MessageJournal(path, batch_size=3, flush_interval=3600)
+    journal.append(tx_event("m0", 0))
+    journal.append(tx_event("m1", 1))
+    assert journal.in_transaction and journal.pending_changes == 2
+    journal.append(tx_event("m2", 2))
+    assert not journal.in_transaction and journal.pending_changes == 0
+
+    # 커밋된 내용은 다른 연결에서도 보임
+    reader = MessageJournal(path)
+    assert replay(reader) == ["m0", "m1", "m2"]
+    reader.close()
+    journal.close()
+
+def test_compaction_after_enough_acks(path):
+    journal = MessageJournal(path, batch_size=1, compact_every=20)
+    for i in range(40):
+        journal.append(tx_event(f"m{i}", i))
+    for i in range(19):
+        journal.ack(f"m{i}")
+    assert journal.acked_since_compact == 19
+
+    journal.ack("m19")
+    assert journal.acked_since_compact == 0
+    assert os.path.getsize(path + "-wal") == 0  # 체크포인트 후 WAL 비움
+    assert replay(journal) == [f"m{i}" for i in range(20, 40)]
+
+    # 정리 후에도 seq는 계속 증가
+    journal.append(tx_event("late", 40))
+    assert replay(journal)[-1] == "late"
+    journal.close()
@@ -0,0 +1,204 @@
+"""
+OCPP 충전소 시뮬레이터 - 우선순위 송신 큐 테스트
+"""
+
+import asyncio
+
+import pytest
+
+import ocpp_queue
+from ocpp_queue import (
+    MAX_COALESCED_SAMPLES, MessageLane, PriorityMessageQueue, RetryScheduler, backoff_delay,
+    classify_message, ordering_key,
+)
+
+class FakeClock:
+    """time.monotonic 대신 쓰는 수동 시계"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ocpp_queue.time, "monotonic", fake)
+    return fake
+
+def call(message_id: str, action: str, **payload) -> dict:
+    return {"messageTypeId": 2, "messageId": message_id, "action": action, "payload": payload}
+
+def meter(message_id: str, evse_id: int, *timestamps: str) -> dict:
+    samples = [{"timestamp": ts, "sampledValue": [{"value": 1.0}]} for ts in timestamps]
+    return call(message_id, "MeterValues", evseId=evse_id, meterValue=samples)
+
+def drain(queue: PriorityMessageQueue) -> list:
+    """큐에서 꺼낸 순서대로 messageId 목록"""
+    ids = []
+    while not queue.empty():
+        ids.append(queue.get_nowait()["messageId"])
+    return ids
+
+def test_lane_classification():
+    assert classify_message(call("1", "TransactionEvent")) is MessageLane.TRANSACTION
+    assert classify_message(call("2", "StatusNotification")) is MessageLane.TRANSACTION
+    assert classify_message(call("3", "MeterValues")) is MessageLane.TELEMETRY
+    assert classify_message(call("4", "BootNotification")) is MessageLane.STATUS
+    assert classify_message(call("5", "DataTransfer")) is MessageLane.STATUS  # 알 수 없는 액션
+
+def test_ordering_key_per_evse():
+    assert ordering_key(call("1", "TransactionEvent", evse={"id": 2})) == ("evse", 2)
+    assert ordering_key(call("2", "StatusNotification", evseId=2)) == ("evse", 2)
+    assert ordering_key(call("3", "Authorize", idToken={})) is None
+    assert ordering_key(call("4", "MeterValues", evseId=2)) is None
+
+def test_higher_lane_first(clock):
+    queue = PriorityMessageQueue()
+    queue.put_nowait(call("hb", "Heartbeat"))
+    queue.put_nowait(call("boot", "BootNotification"))
+    queue.put_nowait(call("tx", "TransactionEvent", eventType="Updated"))
+    assert drain(queue) == ["tx", "boot", "hb"]
+
+def test_status_and_transaction_keep_causal_order(clock):
+    """같은 EVSE의 상태 알림과 트랜잭션 이벤트는 넣은 순서대로 나감"""
+    queue = PriorityMessageQueue()
+    queue.put_nowait(call("occupied", "StatusNotification", evseId=1, connectorStatus="Occupied"))
+    queue.put_nowait(call("started", "TransactionEvent", eventType="Started"))
+    queue.put_nowait(call("ended", "TransactionEvent", eventType="Ended"))
+    queue.put_nowait(call("available", "StatusNotification", evseId=1, connectorStatus="Available"))
+    assert drain(queue) == ["occupied", "started", "ended", "available"]
+
+def test_starved_lane_is_promoted(clock):
+    """하위 레인 메시지가 starvation_timeout 이상 기다리면 먼저 꺼냄"""
+    queue = PriorityMessageQueue(starvation_timeout=5.0)
+    queue.put_nowait(call("mv", "MeterValues", evseId=1, meterValue=[]))
+    clock.now += 1.0
+    for i in range(3):
+        queue.put_nowait(call(f"tx{i}", "TransactionEvent"))
+    assert queue.get_nowait()["messageId"] == "tx0"
+    clock.now += 5.0
+    assert queue.get_nowait()["messageId"] == "mv"
+    assert queue.get_stats()["TELEMETRY"]["promoted"] == 1
+    assert drain(queue) == ["tx1", "tx2"]
+
+def test_oldest_starved_lane_wins(clock):
+    queue = PriorityMessageQueue(starvation_timeout=1.0)
+    queue.put_nowait(call("hb", "Heartbeat"))
+    clock.now += 0.5
+    queue.put_nowait(call("boot", "BootNotification"))
+    queue.put_nowait(call("tx", "TransactionEvent"))
+    clock.now += 2.0
+    assert drain(queue) == ["hb", "boot", "tx"]
+
+def test_retry_scheduler_releases_in_due_order():
+    """만료 시각 순으로 넘기고, 대기 중에 더 이른 예약이 들어오면 먼저 넘김"""
+    async def scenario():
+        due = []
+        scheduler = RetryScheduler(lambda message: due.append(message["messageId"]), 0.01, 0.1)
+        scheduler.schedule(call("late", "Authorize"), 0.2)
+        scheduler.schedule(call("early", "Authorize"), 0.1)
+        await asyncio.sleep(0.01)
+        scheduler.schedule(call("now", "Authorize"), 0)
+        await asyncio.sleep(0.02)
+        first = list(due)
+        await asyncio.sleep(0.25)
+        return first, due, len(scheduler)
+
+    assert asyncio.run(scenario()) == (["now"], ["now", "early", "late"], 0)
+
+def test_retry_backoff_is_capped_and_jittered():
+    scheduler = RetryScheduler(lambda message: None, 2.0, 30.0)
+    for attempt, full in ((1, 2.0), (2, 4.0), (4, 16.0), (5, 30.0), (9, 30.0)):
+        assert full / 2 <= scheduler.backoff(attempt) <= full
+
+def test_backoff_delay_survives_endless_retries():
+    """저널 메시지는 포기하지 않으므로 재시도 횟수가 아주 커져도 최대 지연 안에서 계산됨"""
+    for attempt in (64, 1025, 10_000):
+        assert 15.0 <= backoff_delay(attempt, 2.0, 30.0) <= 30.0
+
+def test_meter_values_merge_keeps_samples_and_ids(clock):
+    queue = PriorityMessageQueue()
+    queue.put_nowait(meter("a", 1, "T02"))
+    queue.put_nowait(meter("b", 1, "T01"))
+    queue.put_nowait(meter("c", 1, "T03"))
+    queue.put_nowait(meter("other", 2, "T01"))
+    assert queue.qsize() == 2
+    assert queue.get_stats()["TELEMETRY"]["coalesced"] == 2
+
+    merged = queue.get_nowait()
+    assert merged["messageId"] == "a"
+    assert merged["merged_ids"] == ["b", "c"]
+    assert [mv["timestamp"] for mv in merged["payload"]["meterValue"]] == ["T01", "T02", "T03"]
+
+def test_meter_values_merge_caps_samples(clock):
+    queue = PriorityMessageQueue()
+    for i in range(MAX_COALESCED_SAMPLES + 10):
+        queue.put_nowait(meter(f"m{i}", 1, f"T{i:04d}"))
+    merged = queue.get_nowait()
+    samples = merged["payload"]["meterValue"]
+    assert len(samples) == MAX_COALESCED_SAMPLES
+    assert samples[0]["timestamp"] == "T0010"  # 오래된 샘플부터 버림
+    assert len(merged["merged_ids"]) == MAX_COALESCED_SAMPLES + 9  # 샘플은 버려도 응답 대기 id는 유지
+
+def test_state_message_replaced_in_place(clock):
+    """상태성 메시지는 최신 내용으로 바뀌되 큐 위치와 이전 messageId를 유지"""
+    queue = PriorityMessageQueue()
+    queue.put_nowait(call("boot1", "BootNotification", reason="PowerUp"))
+    queue.put_nowait(call("hb", "Heartbeat"))
+    queue.put_nowait(call("boot2", "BootNotification", reason="Triggered"))
+    queue.put_nowait(call("boot3", "BootNotification", reason="Watchdog"))
+    first = queue.get_nowait()
+    assert first["messageId"] == "boot3"
+    assert first["payload"]["reason"] == "Watchdog"
+    assert first["merged_ids"] == ["boot1", "boot2"]
+    assert drain(queue) == ["hb"]
+
+def test_heartbeat_merge_records_ids(clock):
+    queue = PriorityMessageQueue()
+    queue.put_nowait(call("hb1", "Heartbeat"))
+    queue.put_nowait(call("hb2", "Heartbeat"))
+    assert queue.get_nowait()["merged_ids"] == ["hb2"]
+    queue.put_nowait(call("hb3", "Heartbeat"))  # 꺼낸 뒤에는 새로 들어감
+    assert "merged_ids" not in queue.get_nowait()
+
+def test_transaction_and_journaled_messages_never_merge(clock):
+    queue = PriorityMessageQueue()
+    queue.put_nowait(call("s1", "StatusNotification", evseId=1, connectorStatus="Occupied"))
+    queue.put_nowait(call("s2", "StatusNotification", evseId=1, connectorStatus="Available"))
+    queue.put_nowait({**meter("j1", 1, "T01"), "journaled": True})
+    queue.put_nowait({**meter("j2", 1, "T02"), "journaled": True})
+    assert drain(queue) == ["s1", "s2", "j1", "j2"]
+
+def test_full_lane_drops_oldest_coalescable(clock):
+    queue = PriorityMessageQueue(lane_limits={MessageLane.TELEMETRY: 2})
+    queue.put_nowait({**meter("j", 1, "T01"), "journaled": True})
+    queue.put_nowait(meter("m1", 1, "T01"))
+    queue.put_nowait(meter("m2", 2, "T02"))
+    assert queue.get_stats()["TELEMETRY"]["dropped"] == 1  # 저널 메시지는 남고 m1을 버림
+    queue.put_nowait(meter("m2b", 2, "T03"))
+    merged = queue.lanes[MessageLane.TELEMETRY][-1][1]
+    assert merged["merged_ids"] == ["m2b"]
+    assert drain(queue) == ["j", "m2"]
+
+def test_full_lane_rejects_unmergeable(clock):
+    queue = PriorityMessageQueue(lane_limits={MessageLane.TRANSACTION: 1})
+    queue.put_nowait(call("tx1", "TransactionEvent"))
+    with pytest.raises(asyncio.QueueFull):
+        queue.put_nowait(call("tx2", "TransactionEvent"))
+    queue.put_nowait(call("tx2", "TransactionEvent"), force=True)
+    assert drain(queue) == ["tx1", "tx2"]
+
+def test_put_waits_for_space():
+    async def scenario():
+        queue = PriorityMessageQueue(lane_limits={MessageLane.TRANSACTION: 1})
+        queue.put_nowait(call("tx1", "TransactionEvent"))
+        waiter = asyncio.create_task(queue.put(call("tx2", "TransactionEvent")))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert queue.get_nowait()["messageId"] == "tx1"
+        await asyncio.wait_for(waiter, 1.0)
+        return drain(queue)
+
+    assert asyncio.run(scenario()) == ["tx2"]
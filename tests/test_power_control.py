@@ -0,0 +1,131 @@
+"""
+OCPP 충전소 시뮬레이터 - 전력 제어 명령 채널 테스트
+"""
+
+import asyncio
+
+from power_control import PowerCommandChannel
+from serial_link import PowerAck
+
+class FakeArduino:
+    """보낸 명령을 기록하는 시리얼 쓰기 함수"""
+
+    def __init__(self):
+        self.written = []
+
+    def __call__(self, data: bytes):
+        self.written.append(data.decode("ascii"))
+
+    def last_seq(self) -> int:
+        return int(self.written[-1].split(",")[1])
+
+def ack(seq: int, relay_mask: int) -> PowerAck:
+    return PowerAck(0.0, seq, relay_mask)
+
+def run(scenario, ack_timeout: float = 0.02):
+    """이벤트 루프에서 scenario(channel, arduino)를 실행하고 결과와 보낸 명령을 반환"""
+    async def main():
+        arduino = FakeArduino()
+        channel = PowerCommandChannel(arduino, ack_timeout=ack_timeout, max_attempts=2, log=lambda message: None)
+        try:
+            return await scenario(channel, arduino), arduino.written, channel
+        finally:
+            channel.close()
+
+    return asyncio.run(main())
+
+def test_same_iteration_requests_share_one_command():
+    async def scenario(channel, arduino):
+        first, second = channel.set(1, True), channel.set(3, True)
+        await asyncio.sleep(0)
+        channel.handle_ack(ack(arduino.last_seq(), 0b101))
+        return await asyncio.gather(first, second)
+
+    results, written, channel = run(scenario)
+    assert results == [True, True]
+    assert written == ["S,0,1,1,3,1\n"]
+    assert channel.confirmed == {1: True, 3: True}
+
+def test_opposite_request_replaces_pending_one():
+    async def scenario(channel, arduino):
+        on, off = channel.set(2, True), channel.set(2, False)
+        await asyncio.sleep(0)
+        channel.handle_ack(ack(arduino.last_seq(), 0))
+        return await asyncio.gather(on, off)
+
+    results, written, channel = run(scenario)
+    assert results == [False, True]
+    assert written == ["S,0,2,0\n"]
+    assert channel.counters["coalesced"] == 1
+
+def test_ack_without_requested_state_fails():
+    """응답의 릴레이 상태에 요청한 전환이 반영되지 않으면 실패"""
+    async def scenario(channel, arduino):
+        result = channel.set(1, True)
+        await asyncio.sleep(0)
+        channel.handle_ack(ack(arduino.last_seq(), 0))
+        return await result
+
+    result, _, channel = run(scenario)
+    assert result is False
+    assert channel.confirmed == {1: False}
+
+def test_lost_ack_is_retried_then_fails():
+    async def scenario(channel, arduino):
+        warmup = channel.set(1, True)
+        await asyncio.sleep(0)
+        channel.handle_ack(ack(arduino.last_seq(), 0b1))
+        await warmup
+        retried, failed = channel.set(2, True), channel.set(3, True)
+        while len(arduino.written) < 3:  # 첫 전송 응답 유실 -> 재전송
+            await asyncio.sleep(0.005)
+        channel.handle_ack(ack(arduino.last_seq(), 0b011))
+        return await asyncio.gather(retried, failed)
+
+    results, written, channel = run(scenario, ack_timeout=0.1)
+    # 재전송 응답에 포트 2만 켜짐 (포트 3은 명령을 받고도 전환되지 않음)
+    assert results == [True, False]
+    assert written == ["S,0,1,1\n", "S,1,2,1,3,1\n", "S,2,2,1,3,1\n"]
+    assert channel.counters["retries"] == 1
+
+def test_gives_up_after_max_attempts():
+    async def scenario(channel, arduino):
+        warmup = channel.set(1, True)
+        await asyncio.sleep(0)
+        channel.handle_ack(ack(arduino.last_seq(), 0b1))
+        await warmup
+        return await asyncio.wait_for(channel.set(2, True), 1.0)
+
+    result, written, channel = run(scenario)
+    assert result is False
+    assert len(written) == 3  # 첫 명령 + 2번 시도
+    assert channel.counters["failed"] == 1
+    assert channel.ack_mode
+
+def test_falls_back_to_plain_commands_without_acks():
+    """응답을 한 번도 받지 못하면 기존 'P,포트,상태' 명령으로 전환"""
+    async def scenario(channel, arduino):
+        first = channel.set(1, True)
+        await asyncio.sleep(0)
+        second = channel.set(2, False)
+        result = await asyncio.wait_for(asyncio.gather(first, second), 1.0)
+        third = await channel.set(3, True)
+        return result + [third]
+
+    results, written, channel = run(scenario)
+    assert results == [True, True, True]
+    assert written[:2] == ["S,0,1,1\n", "S,1,2,0\n"]
+    assert sorted(written[2].splitlines()) == ["P,1,1", "P,2,0"]
+    assert written[3:] == ["P,3,1\n"]
+    assert not channel.ack_mode
+
+def test_close_fails_waiting_requests():
+    async def scenario(channel, arduino):
+        result = channel.set(1, True)
+        await asyncio.sleep(0)
+        channel.close()
+        return await result
+
+    result, _, channel = run(scenario)
+    assert result is False
+    assert not channel.in_flight
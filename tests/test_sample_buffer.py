@@ -0,0 +1,75 @@
+"""
+OCPP 충전소 시뮬레이터 - 측정값 링 버퍼 테스트
+"""
+
+import pytest
+
+from sample_buffer import SampleRing, StationHistory
+
+def fill(ring: SampleRing, count: int, start: int = 0):
+    """timestamp=n, 전압=220, 전류=n/10, 전력=n*22 샘플 추가"""
+    for n in range(start, start + count):
+        ring.append(float(n), 220.0, n / 10, n * 22.0)
+
+def test_append_and_latest():
+    ring = SampleRing(4)
+    assert len(ring) == 0 and ring.latest() is None
+    fill(ring, 3)
+    assert len(ring) == 3
+    assert ring.latest() == (2.0, 220.0, 0.2, 44.0)
+    assert list(ring.values("timestamp")) == [0.0, 1.0, 2.0]
+
+def test_wraparound_keeps_newest_in_order():
+    ring = SampleRing(4)
+    fill(ring, 10)
+    assert len(ring) == 4
+    assert ring.segments() == [(2, 4), (0, 2)]
+    assert list(ring.values("timestamp")) == [6.0, 7.0, 8.0, 9.0]
+    assert list(ring.values("timestamp", 3)) == [7.0, 8.0, 9.0]
+    assert list(ring.values("timestamp", 99)) == [6.0, 7.0, 8.0, 9.0]
+    assert ring.latest()[0] == 9.0
+
+def test_views_are_zero_copy():
+    ring = SampleRing(4)
+    fill(ring, 6)
+    segments = ring.view("power")
+    assert [len(segment) for segment in segments] == [2, 2]
+    assert all(segment.obj is ring.columns["power"] for segment in segments)
+    ring.columns["power"][2] = -1.0  # 버퍼를 고치면 보기에도 바로 보임
+    assert segments[0][0] == -1.0
+
+@pytest.mark.parametrize("total", [3, 4, 7, 9])
+def test_count_since_across_wrap(total):
+    ring = SampleRing(4)
+    fill(ring, total)
+    oldest = total - len(ring)
+    for since in range(-1, total + 2):
+        expected = len([n for n in range(oldest, total) if n >= since])
+        assert ring.count_since(float(since)) == expected
+
+def test_window_selects_recent_seconds():
+    history = StationHistory(2, 8)
+    fill(history[2], 20)
+    window = history.window(2, "timestamp", 3.0, now=19.0)
+    assert [value for segment in window for value in segment] == [16.0, 17.0, 18.0, 19.0]
+    assert history.window(1, "timestamp", 3.0, now=19.0) == []
+
+def test_session_summary():
+    history = StationHistory(1, 8)
+    for t, power in [(0.0, 0.0), (10.0, 1000.0), (11.0, 2000.0), (12.0, 2000.0), (14.0, 0.0)]:
+        history.append(1, t, 220.0, power / 220.0, power)
+    summary = history.summary(1, since=10.0)
+    assert summary.count == 4
+    assert summary.duration == 4.0
+    assert summary.peak_power == 2000.0
+    assert summary.energy_wh == pytest.approx((1500 + 2000 + 2000) / 3600)
+    assert summary.avg_power == pytest.approx(5500 / 4)
+    assert history.summary(1, since=15.0) is None
+
+def test_session_summary_after_wrap():
+    history = StationHistory(1, 4)
+    for t in range(10):
+        history.append(1, float(t), 220.0, 1.0, 220.0)
+    summary = history.summary(1, since=0.0)  # 남아 있는 샘플만
+    assert summary.count == 4 and summary.duration == 3.0
+    assert summary.energy_wh == pytest.approx(220 * 3 / 3600)
@@ -0,0 +1,113 @@
+"""
+OCPP 충전소 시뮬레이터 - 예정 작업 스케줄러 테스트
+"""
+
+import asyncio
+
+from scheduler import TimerScheduler
+
+class FakeClock:
+    """수동으로 진행하는 단조 시계"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def make_scheduler():
+    clock = FakeClock()
+    wakeups = []
+    scheduler = TimerScheduler(clock, notify=lambda: wakeups.append(clock.now))
+    return scheduler, clock, wakeups
+
+def run_due(scheduler: TimerScheduler) -> int:
+    return asyncio.run(scheduler.run_due())
+
+def test_runs_in_deadline_then_schedule_order():
+    scheduler, clock, _ = make_scheduler()
+    ran = []
+    scheduler.schedule("c", 2.0, ran.append, "c")
+    scheduler.schedule("a", 1.0, ran.append, "a")
+    scheduler.schedule("b", 1.0, ran.append, "b")  # 같은 시각이면 예약 순서
+    scheduler.schedule("d", 5.0, ran.append, "d")
+
+    assert run_due(scheduler) == 0
+    clock.now += 2.0
+    assert run_due(scheduler) == 3
+    assert ran == ["a", "b", "c"]
+    assert list(scheduler.timers) == ["d"]
+    assert scheduler.next_delay() == 3.0
+
+def test_reschedule_replaces_previous():
+    scheduler, clock, _ = make_scheduler()
+    ran = []
+    scheduler.schedule("meter", 1.0, ran.append, 1)
+    scheduler.schedule("meter", 3.0, ran.append, 2)
+    assert len(scheduler) == 1
+    assert scheduler.deadline("meter") == 103.0
+
+    clock.now += 1.5
+    assert run_due(scheduler) == 0  # 이전 예약은 무효
+    assert scheduler.next_delay() == 1.5
+    clock.now += 1.5
+    assert run_due(scheduler) == 1
+    assert ran == [2]
+
+def test_cancel():
+    scheduler, clock, _ = make_scheduler()
+    scheduler.schedule("timeout", 1.0)
+    assert "timeout" in scheduler
+    assert scheduler.cancel("timeout")
+    assert not scheduler.cancel("timeout")
+    assert scheduler.deadline("timeout") is None
+    assert scheduler.next_delay() is None
+    clock.now += 5.0
+    assert run_due(scheduler) == 0
+
+def test_cancel_and_reschedule_during_run():
+    """실행 중 취소된 작업은 건너뛰고, 실행 중 다시 예약한 작업은 다음 호출에서 실행"""
+    scheduler, clock, _ = make_scheduler()
+    ran = []
+
+    def first():
+        ran.append("first")
+        scheduler.cancel("second")
+        scheduler.schedule("first", 0.0, ran.append, "again")
+
+    scheduler.schedule("first", 1.0, first)
+    scheduler.schedule("second", 1.0, ran.append, "second")
+    clock.now += 1.0
+    assert run_due(scheduler) == 1
+    assert ran == ["first"]
+    assert scheduler.next_delay() == 0.0
+    assert run_due(scheduler) == 1
+    assert ran == ["first", "again"]
+
+def test_awaits_coroutine_callbacks():
+    scheduler, clock, _ = make_scheduler()
+    ran = []
+
+    async def send(name):
+        await asyncio.sleep(0)
+        ran.append(name)
+
+    scheduler.schedule("heartbeat", 0.5, send, "heartbeat")
+    clock.now += 1.0
+    assert run_due(scheduler) == 1
+    assert ran == ["heartbeat"]
+
+def test_notify_only_when_earliest_deadline_moves_earlier():
+    scheduler, clock, wakeups = make_scheduler()
+    scheduler.schedule("heartbeat", 10.0)
+    scheduler.schedule("meter", 20.0)
+    scheduler.schedule("timeout", 5.0)
+    assert len(wakeups) == 2  # heartbeat, timeout만 맨 앞이 됨
+
+def test_stale_entries_are_compacted():
+    scheduler, _, _ = make_scheduler()
+    for i in range(1000):
+        scheduler.schedule("meter", float(i))
+    assert len(scheduler.heap) <= 2 * len(scheduler.timers) + 65
+    assert scheduler.deadline("meter") == 1099.0
+    assert scheduler.next_delay() == 999.0
@@ -0,0 +1,98 @@
+"""
+OCPP 충전소 시뮬레이터 - 시리얼 캡처/재생 테스트
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from serial_capture import CaptureWriter, ReplaySerial, read_capture
+from serial_link import SerialReader
+
+class FakeClock:
+    def __init__(self):
+        self.now = 50.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def capture(tmp_path):
+    """0초, 0.5초, 2초에 받은 바이트를 기록한 캡처 파일 경로"""
+    path = str(tmp_path / "serial.cap")
+    clock = FakeClock()
+    writer = CaptureWriter(path, clock)
+    for offset, data in ((0.0, b"!220.00 1.00@"), (0.5, b"!221.00 "), (2.0, b"2.00@")):
+        writer.write(data, clock.now + offset)
+    writer.close()
+    return path
+
+def read_all(serial: ReplaySerial) -> list:
+    """EOFError까지 읽은 (바이트, 재생 시계 경과 시간) 목록"""
+    chunks = []
+    while True:
+        try:
+            data = serial.read(serial.in_waiting or 1)
+        except EOFError:
+            return chunks
+        if data:
+            chunks.append((data, serial.now() - serial.base))
+
+def test_capture_records_offsets(capture):
+    started, records = read_capture(capture)
+    assert started == pytest.approx(time.time(), abs=60)
+    assert list(records) == [(0.0, b"!220.00 1.00@"), (0.5, b"!221.00 "), (2.0, b"2.00@")]
+
+def test_not_a_capture_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"!220.00 1.00@" * 4)
+    with pytest.raises(ValueError):
+        read_capture(str(path))
+
+def test_replay_port_name(capture):
+    assert ReplaySerial.from_port(f"replay:{capture}").speed == 1.0
+    assert ReplaySerial.from_port(f"replay:{capture},0").speed == 0.0
+
+def test_max_speed_replay_keeps_capture_clock_then_ends(capture):
+    serial = ReplaySerial(capture, speed=0)
+    assert read_all(serial) == [(b"!220.00 1.00@", 0.0), (b"!221.00 ", 0.5), (b"2.00@", 2.0)]
+    with pytest.raises(EOFError):
+        serial.read()  # 끝난 뒤에도 계속 EOFError
+    assert serial.in_waiting == 0
+    serial.close()
+    assert not serial.is_open
+
+def test_partial_reads_keep_record_time(capture):
+    serial = ReplaySerial(capture, speed=0)
+    assert serial.read(4) == b"!220"
+    assert serial.in_waiting == len(b".00 1.00@")
+    assert serial.read(100) == b".00 1.00@"
+    assert serial.read(100) == b"!221.00 "
+    assert serial.now() - serial.base == 0.5
+
+def test_fast_replay_paces_records(capture):
+    """10배속이면 캡처 2초 분량이 약 0.2초에 끝남"""
+    serial = ReplaySerial(capture, speed=10, timeout=0.05)
+    started = time.monotonic()
+    chunks = read_all(serial)
+    elapsed = time.monotonic() - started
+    assert b"".join(data for data, _ in chunks) == b"!220.00 1.00@!221.00 2.00@"
+    assert 0.15 <= elapsed < 1.0
+    assert chunks[-1][1] >= 2.0  # 재생 시계는 캡처 당시 간격을 따름
+
+def test_reader_stops_at_end_of_capture(capture):
+    """SerialReader는 캡처가 끝나면 모든 프레임을 넘긴 뒤 EOFError로 멈춤"""
+    async def scenario():
+        serial = ReplaySerial(capture, speed=0)
+        reader = SerialReader(serial, asyncio.get_running_loop(), clock=serial.now)
+        reader.start()
+        while reader.is_alive():
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0)
+        return serial, reader, reader.drain()
+
+    serial, reader, frames = asyncio.run(scenario())
+    assert isinstance(reader.error, EOFError)
+    assert [frame.values for frame in frames] == [[220.0, 1.0], [221.0, 2.0]]
+    assert [frame.received_at - serial.base for frame in frames] == [0.0, 2.0]
@@ -0,0 +1,150 @@
+"""
+OCPP 충전소 시뮬레이터 - 시리얼 프레임 파서 테스트
+"""
+
+import pytest
+
+from serial_link import FrameParser, crc16, encode_binary_frame, encode_power_ack
+
+VALUES = [220.0, 13.5, 0.0, 0.0, 219.5, 0.25]  # float32로 정확히 표현되는 값
+
+def feed_bytewise(parser: FrameParser, data: bytes):
+    """한 바이트씩 넣으며 완성된 프레임을 모두 모음"""
+    frames = []
+    for i in range(len(data)):
+        frames += parser.feed(data[i:i + 1], float(i))
+    return frames
+
+def parsed_seqs(data: bytes):
+    """새 파서로 해석한 프레임 순번 목록"""
+    return [frame.seq for frame in FrameParser().feed(data)]
+
+def test_crc16_ccitt_false_check_value():
+    """CRC-16/CCITT-FALSE 표준 검사값"""
+    assert crc16(b"123456789") == 0x29B1
+
+def test_ascii_frame():
+    parser = FrameParser()
+    frames = parser.feed(b"!220.00 13.50 0.00 0.00@", 1.0)
+    assert [frame.values for frame in frames] == [[220.0, 13.5, 0.0, 0.0]]
+    assert frames[0].received_at == 1.0
+    assert frames[0].seq is None
+    assert parser.format == "ascii"
+
+def test_ascii_invalid_token_keeps_position():
+    """잘못된 값은 None으로 위치 유지"""
+    frames = FrameParser().feed(b"!220.00 1.2.3 5.00@")
+    assert frames[0].values[0] == 220.0
+    assert frames[0].values[1] is None
+    assert frames[0].values[2] == 5.0
+
+def test_ascii_torn_frame():
+    """여러 번에 나뉘어 들어온 ASCII 프레임"""
+    parser = FrameParser()
+    frames = feed_bytewise(parser, b"!220.00 13.50@!219.00 0.00@")
+    assert [frame.values for frame in frames] == [[220.0, 13.5], [219.0, 0.0]]
+    assert parser.buffer == b""
+
+def test_binary_frame():
+    parser = FrameParser()
+    frames = parser.feed(encode_binary_frame(7, VALUES), 2.0)
+    assert len(frames) == 1
+    assert frames[0].values == pytest.approx(VALUES)
+    assert frames[0].seq == 7
+    assert parser.format == "binary"
+    assert parser.crc_errors == 0
+
+def test_binary_torn_frame():
+    """바이트 단위로 나뉘어 들어온 바이너리 프레임"""
+    parser = FrameParser()
+    data = encode_binary_frame(1, VALUES) + encode_binary_frame(2, VALUES)
+    frames = feed_bytewise(parser, data)
+    assert [frame.seq for frame in frames] == [1, 2]
+    assert parser.frames_lost == 0
+    assert parser.buffer == b""
+
+def test_binary_bad_crc_resyncs_to_next_frame():
+    """CRC가 틀린 프레임은 버리고 다음 프레임부터 다시 맞춤"""
+    parser = FrameParser()
+    bad = bytearray(encode_binary_frame(1, VALUES))
+    bad[6] ^= 0xFF  # 값 영역 손상
+    frames = parser.feed(bytes(bad) + encode_binary_frame(2, VALUES))
+    assert [frame.seq for frame in frames] == [2]
+    assert parser.crc_errors == 1
+
+def test_binary_garbage_before_sync():
+    """SYNC 앞의 잡음은 버림 (SYNC 첫 바이트와 같은 잡음 포함)"""
+    parser = FrameParser()
+    garbage = b"\x00\xff\xa5junk\xa5"
+    frames = parser.feed(garbage + encode_binary_frame(3, VALUES))
+    assert [frame.seq for frame in frames] == [3]
+    assert parser.bytes_discarded >= len(garbage) - 1
+
+def test_sync_byte_split_across_reads():
+    """SYNC 첫 바이트만 먼저 들어와도 버리지 않음"""
+    parser = FrameParser()
+    data = encode_binary_frame(4, VALUES)
+    assert parser.feed(b"noise" + data[:1]) == []
+    frames = parser.feed(data[1:])
+    assert [frame.seq for frame in frames] == [4]
+
+def test_lost_frames_counted_by_seq():
+    parser = FrameParser()
+    parser.feed(encode_binary_frame(254, VALUES) + encode_binary_frame(1, VALUES))  # 255, 0 누락
+    assert parser.frames_lost == 2
+
+def test_switch_from_ascii_to_binary():
+    """ASCII로 시작했다가 바이너리로 바뀌면 이후 ASCII 프레임은 무시"""
+    parser = FrameParser()
+    frames = parser.feed(b"!220.00 13.50@")
+    assert parser.format == "ascii"
+    frames += parser.feed(encode_binary_frame(1, VALUES))
+    assert parser.format == "binary"
+    frames += parser.feed(b"!219.00 0.00@" + encode_binary_frame(2, VALUES))
+    assert [frame.seq for frame in frames] == [None, 1, 2]
+
+def test_unfinished_ascii_before_binary_is_skipped():
+    """끝나지 않은 ASCII 프레임 뒤에 바이너리 프레임이 오면 ASCII 조각은 건너뜀"""
+    parser = FrameParser()
+    frames = parser.feed(b"!220.00 13" + encode_binary_frame(5, VALUES))
+    assert [frame.seq for frame in frames] == [5]
+
+def test_binary_payload_containing_frame_chars():
+    """바이너리 값 안에 '!'/'@' 바이트가 있어도 ASCII 프레임으로 해석하지 않음"""
+    values = [1.0, 2.0]
+    data = encode_binary_frame(6, values)
+    assert parsed_seqs(b"!" + data + b"@") == [6]
+
+def test_reset_to_ascii_after_format_reset():
+    """형식을 다시 판별하도록 초기화하면 ASCII 프레임을 다시 받음"""
+    parser = FrameParser()
+    parser.feed(encode_binary_frame(1, VALUES))
+    parser.format = None
+    parser.last_seq = None
+    frames = parser.feed(b"!220.00 0.00@")
+    assert [frame.values for frame in frames] == [[220.0, 0.0]]
+
+def test_ack_between_frames():
+    """전력 제어 응답은 어느 형식의 프레임 사이에도 섞여 올 수 있음"""
+    parser = FrameParser()
+    data = b"!220.00 13.50@" + encode_power_ack(9, 0b101) + b"!219.00 0.00@"
+    frames = parser.feed(data, 3.0)
+    assert len(frames) == 2
+    assert [(ack.seq, ack.relay_mask, ack.received_at) for ack in parser.acks] == [(9, 0b101, 3.0)]
+
+def test_ack_torn_and_bad_crc():
+    parser = FrameParser()
+    ack = encode_power_ack(10, 1)
+    bad = bytearray(encode_power_ack(11, 1))
+    bad[-1] ^= 0xFF
+    feed_bytewise(parser, bytes(bad) + ack + encode_binary_frame(1, VALUES))
+    assert [a.seq for a in parser.acks] == [10]
+    assert parser.crc_errors == 1
+    assert parser.acks_parsed == 1
+
+def test_long_garbage_without_end_is_discarded():
+    """끝 문자 없는 긴 잡음은 버퍼에 쌓아 두지 않음"""
+    parser = FrameParser()
+    parser.feed(b"!" + b"1" * 5000)
+    assert len(parser.buffer) == 0
+    assert parser.feed(b"!220.00 0.00@")[0].values == [220.0, 0.0]
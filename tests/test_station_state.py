@@ -0,0 +1,71 @@
+"""
+OCPP 충전소 시뮬레이터 - EVSE별 상태 열 / 전력 계산 테스트
+"""
+
+import random
+from array import array
+
+import pytest
+
+import station_state
+from station_state import MAX_EVSE, StationState, configured_num_evse, scan_power_python
+
+MIN_POWER = 100
+
+SCANS = [
+    pytest.param(scan_power_python, id="python"),
+    pytest.param(getattr(station_state, "scan_power_numpy", None), id="numpy",
+                 marks=pytest.mark.skipif(station_state.np is None, reason="numpy 없음")),
+]
+
+def test_voltage_current_are_views_of_frame_columns():
+    station = StationState(3)
+    station.load3_mv[:] = array("d", [220.0, 1.0, 221.0, 2.0, 222.0, 3.0])
+    assert list(station.voltage) == [220.0, 221.0, 222.0]
+    assert list(station.current) == [1.0, 2.0, 3.0]
+    station.current[1] = 5.0
+    assert station.load3_mv[3] == 5.0
+
+def test_indices_lists_set_flags():
+    station = StationState(6)
+    for i in (0, 3, 5):
+        station.charging_active[i] = True
+    assert list(station.indices(station.charging_active)) == [0, 3, 5]
+    assert list(station.indices(station.powered)) == []
+
+@pytest.mark.parametrize("config, expected", [
+    ({}, 3), ({"num_evse": 8}, 8), ({"num_evse": "2"}, 2), ({"num_evse": 0}, 1),
+    ({"num_evse": 999}, MAX_EVSE), ({"num_evse": "many"}, 3), ({"num_evse": None}, 3),
+])
+def test_configured_num_evse(config, expected):
+    assert configured_num_evse(config) == expected
+
+@pytest.mark.parametrize("scan", SCANS)
+def test_scan_edges_follow_powered_flag(scan):
+    station = StationState(4)
+    station.voltage[:] = array("d", [220.0] * 4)
+    station.current[0] = 10.0  # 충전 중, 새로 전력 발생
+    station.current[1] = 10.0  # 충전 중, 계속 전력 있음
+    station.current[2] = 0.3  # 최소 전력 미만 -> 0, 전력 소멸
+    station.current[3] = 10.0  # 충전이 활성화되지 않음
+    station.charging_active[:] = bytes([1, 1, 1, 0])
+    station.powered[:] = bytes([0, 1, 1, 1])
+    station.prev_power_data[2] = 0.0  # prev_power_data는 판단에 쓰지 않음
+    result = scan(station, MIN_POWER)
+    assert result.power == [2200, 2200, 0, 0]
+    assert result.started == [0]
+    assert result.ended == [2, 3]
+    assert all(type(value) is int for value in result.power + result.started + result.ended)
+
+@pytest.mark.skipif(station_state.np is None, reason="numpy 없음")
+@pytest.mark.parametrize("seed", range(20))
+def test_numpy_scan_matches_python(seed):
+    rng = random.Random(seed)
+    station = StationState(rng.randint(1, MAX_EVSE))
+    for i in range(station.num_evse):
+        station.voltage[i] = rng.choice([0.0, 219.5, 220.0, 230.7])
+        station.current[i] = rng.choice([0.0, 0.2, 0.4545, 13.6, rng.uniform(0, 32)])
+        station.charging_active[i] = rng.random() < 0.6
+        station.powered[i] = rng.random() < 0.5
+        station.prev_power_data[i] = rng.choice([0.0, 3000.0])
+    assert station_state.scan_power_numpy(station, MIN_POWER) == scan_power_python(station, MIN_POWER)